@@ -1,12 +1,39 @@
 # Standard library imports
+import os
+from contextlib import asynccontextmanager
 
 # Third-party imports
+from anyio import to_thread
 from fastapi import FastAPI 
 from starlette.middleware.cors import CORSMiddleware
 
 # Local application imports
+from helpers import job_runner, task_views, user_search_index
+
+from routes import bug_router, app_router, user_router, project_router, project_user_router, requirements_router, epic_router, userStorie_router, users_search_router, tasks_router, sprints_router, sprint_details_router, permissions_router, teams_router, user_roles_router, event_router, roadmap_router, search_router, cascade_router, jobs_router # , email_router  #<-- Futuras rutas de la API
+
+# Las rutas son síncronas (el SDK de Firestore bloquea), FastAPI las ejecuta en el
+# threadpool de anyio. Este valor acota cuántas peticiones pueden estar esperando
+# RPCs de Firestore al mismo tiempo por worker.
+API_THREADPOOL_SIZE = int(os.getenv("API_THREADPOOL_SIZE", "64"))
+
+# Las rutas de calendario (eventos) están apagadas por defecto; con este flag se
+# registran, incluida la ventana GET /projects/{project_id}/events?start=&end=
+EVENT_ROUTES_ENABLED = os.getenv("EVENT_ROUTES_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+    # Índice de búsqueda de usuarios: una lectura de la colección users al arrancar
+    await to_thread.run_sync(user_search_index.ensure_built)
+    # Cola de jobs en segundo plano (?async=true)
+    job_runner.start()
+    yield
+    # Cerrar los listeners de on_snapshot de las vistas de tareas en vivo
+    task_views.close_all()
+    job_runner.shutdown()
 
-from routes import bug_router, app_router, user_router, project_router, project_user_router, requirements_router, epic_router, userStorie_router, users_search_router, tasks_router, sprints_router, sprint_details_router, permissions_router, teams_router, user_roles_router, roadmap_router # , email_router  #<-- Futuras rutas de la API
 
 def create_app() -> FastAPI:
     """
@@ -17,7 +44,7 @@ def create_app() -> FastAPI:
     """
     print("Creando la aplicación FastAPI...")
 
-    app = FastAPI(title="RAICES API", version="1.0.0")
+    app = FastAPI(title="RAICES API", version="1.0.0", lifespan=lifespan)
     
     # Configuración del middleware CORS
     app.add_middleware(
@@ -26,6 +53,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],  # Permite todos los métodos, especificar si es necesario -> ["GET", "POST", "PUT", "DELETE"]
         allow_headers=["*"],  # Permite todos los headers, especificar si fuere el caso -> ["X-Custom-Header"]
+        expose_headers=["X-Next-Cursor"],  # Cursor de la siguiente página en los listados paginados
     )
     
     app.include_router(app_router)
@@ -44,8 +72,12 @@ def create_app() -> FastAPI:
     app.include_router(bug_router)
     app.include_router(teams_router)
     app.include_router(user_roles_router)
-    # app.include_router(event_router)
+    if EVENT_ROUTES_ENABLED:
+        app.include_router(event_router)
     app.include_router(roadmap_router)
+    app.include_router(search_router)
+    app.include_router(cascade_router)
+    app.include_router(jobs_router)
     # app.include_router(email_router)
 
     #app.include_router(name.router)<-- Cambiar name por el nombre de la ruta.py
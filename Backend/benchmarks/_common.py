@@ -0,0 +1,76 @@
+"""
+Utilidades compartidas por los benchmarks: fuerzan el backend en memoria y
+generan datos sintéticos de un proyecto.
+
+Los benchmarks se corren desde Backend/, por ejemplo:
+    python benchmarks/concurrency_benchmark.py
+"""
+import os
+import sys
+from datetime import datetime
+
+os.environ.setdefault("FIRESTORE_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firebase import db  # noqa: E402
+
+STATUSES = ["Backlog", "To Do", "In Progress", "In Review", "Done"]
+
+
+def seed_project(project_id: str = "bench-project", members: int = 10, tasks: int = 1000,
+                 teams: int = 3) -> str:
+    """Crea un proyecto con usuarios, relaciones, una user story, tareas y equipos."""
+    users = {
+        f"user-{i}": {"name": f"User {i}", "email": f"user{i}@example.com", "role": "user", "picture": None}
+        for i in range(members)
+    }
+    data = {
+        "projects": {project_id: {
+            "title": "Benchmark", "description": "Synthetic project", "status": "Active",
+            "priority": "High", "progress": 0, "startDate": "2025-01-01T00:00:00Z",
+            "endDate": "2025-12-31T00:00:00Z", "invitationCode": "BENCH", "tasksCompleted": 0,
+            "totalTasks": tasks, "team": "Bench", "teamSize": members,
+        }},
+        "users": users,
+        "project_users": {
+            f"{project_id}-{uid}": {
+                "userRef": {"__ref__": f"users/{uid}"},
+                "projectRef": {"__ref__": f"projects/{project_id}"},
+                "role": "developer", "joinedAt": "2025-01-01T00:00:00",
+            }
+            for uid in users
+        },
+        "userStories": {f"{project_id}-us": {
+            "uuid": f"{project_id}-us", "idTitle": "US-001", "title": "Story", "status": "active",
+            "projectRef": project_id, "description": "Synthetic story",
+        }},
+        "tasks": {
+            f"{project_id}-task-{i}": {
+                "title": f"Task {i}", "description": "Lorem ipsum " * 20,
+                "user_story_id": f"{project_id}-us", "user_story_title": "Story",
+                "assignee": [{"id": f"user-{i % members}", "name": f"User {i % members}"}],
+                "status_khanban": STATUSES[i % len(STATUSES)], "priority": "Medium",
+                "story_points": i % 8, "project_id": project_id,
+                "comments": [
+                    {"id": f"c{i}-{j}", "user_id": "user-0", "user_name": "User 0",
+                     "text": "comment " * 10, "timestamp": "2025-01-01T00:00:00"}
+                    for j in range(3)
+                ],
+                "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-01T00:00:00",
+            }
+            for i in range(tasks)
+        },
+        "teams": {
+            f"{project_id}-team-{t}": {
+                "name": f"Team {t}", "description": "Synthetic team", "projectId": project_id,
+                "members": [{"id": uid, "name": u["name"], "role": "Member", "tasksCompleted": 0,
+                             "currentTasks": 0, "availability": 80} for uid, u in users.items()],
+                "createdAt": datetime(2025, 1, 1),
+                "updatedAt": datetime(2025, 1, 1),
+                "isInitial": t == 0,
+            }
+            for t in range(teams)
+        },
+    }
+    db.load(data)
+    return project_id
@@ -0,0 +1,95 @@
+"""
+Mide el throughput de una importación grande con el BulkWriter: N tareas
+escritas en batches de hasta 500, con distinto paralelismo, y luego la misma
+importación por POST /projects/{id}/tasks/batch. --fail-rate hace fallar esa
+fracción de commits con ServiceUnavailable para ver el costo de los reintentos.
+
+Antes todas las escrituras iban en un solo db.batch(): con más de 500 el commit
+fallaba y la importación no se hacía.
+
+    python benchmarks/bulk_write_benchmark.py --items 10000 --latency-ms 50
+"""
+import argparse
+import random
+import time
+
+from _common import db, seed_project
+
+from fastapi.testclient import TestClient
+from google.api_core.exceptions import ServiceUnavailable
+
+from app import create_app
+from firebase import tasks_ref
+from helpers.bulk_write_helper import BulkWriter
+
+
+def inject_failures(rate: float):
+    """Hace que una fracción de los commits del backend en memoria falle como error transitorio."""
+    if not rate:
+        return
+    rng = random.Random(11)
+    make_batch = db.batch
+
+    def batch():
+        write_batch = make_batch()
+        commit = write_batch.commit
+
+        def flaky_commit(**kwargs):
+            if rng.random() < rate:
+                db._rpc()
+                raise ServiceUnavailable("injected")
+            return commit(**kwargs)
+
+        write_batch.commit = flaky_commit
+        return write_batch
+
+    db.batch = batch
+
+
+def task_payload(i: int, story_id: str) -> dict:
+    return {
+        "id": f"import-{i}", "title": f"Imported task {i}", "description": "Generated " * 10,
+        "user_story_id": story_id, "status_khanban": "To Do", "priority": "Medium",
+        "story_points": i % 8, "assignee": [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    project_id = seed_project(members=3, tasks=0, teams=1)
+    story_id = f"{project_id}-us"
+    db.latency_ms = args.latency_ms
+    inject_failures(args.fail_rate)
+
+    for workers in args.workers:
+        writer = BulkWriter(max_workers=workers, backoff_seconds=0.05)
+        for i in range(args.items):
+            writer.set(tasks_ref.document(f"bulk-{workers}-{i}"), task_payload(i, story_id))
+        started = time.perf_counter()
+        report = writer.commit().to_dict()
+        elapsed = time.perf_counter() - started
+        print(
+            f"BulkWriter workers={workers:>2}: {report['succeeded']}/{report['total']} en {elapsed:.2f}s "
+            f"-> {report['total'] / elapsed:,.0f} escrituras/s ({report['chunks']} batches, {report['retries']} reintentos)"
+        )
+
+    client = TestClient(create_app())
+    payload = [task_payload(i, story_id) for i in range(args.items)]
+    started = time.perf_counter()
+    response = client.post(f"/projects/{project_id}/tasks/batch", params={"report": True}, json=payload)
+    elapsed = time.perf_counter() - started
+    report = response.json()["report"]
+    print(
+        f"POST tasks/batch: HTTP {response.status_code}, {report['succeeded']}/{report['total']} en {elapsed:.2f}s "
+        f"-> {report['total'] / elapsed:,.0f} tareas/s (commit {report['elapsed_ms'] / 1000:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
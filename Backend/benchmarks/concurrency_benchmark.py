@@ -0,0 +1,67 @@
+"""
+Compara el throughput de un endpoint cuando el handler bloquea el event loop
+(`async def` con llamadas síncronas a Firestore, como estaban antes las rutas de
+teams/roadmap/sprint details/user roles/events) contra el handler síncrono
+que FastAPI descarga al threadpool acotado.
+
+    python benchmarks/concurrency_benchmark.py --requests 100 --concurrency 50 --latency-ms 10
+"""
+import argparse
+import asyncio
+import time
+
+from _common import db, seed_project
+
+import httpx
+from fastapi import FastAPI
+
+from app import create_app
+from routes.teams_routes import get_all_teams
+
+
+def build_blocking_app() -> FastAPI:
+    """Misma ruta, pero declarada `async def` como antes: bloquea el event loop."""
+    app = FastAPI()
+
+    @app.get("/projects/{project_id}/teams")
+    async def blocking_get_all_teams(project_id: str):
+        return get_all_teams(project_id)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def one():
+                async with semaphore:
+                    response = await client.get(path)
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--tasks", type=int, default=30)
+    args = parser.parse_args()
+
+    project_id = seed_project(members=3, tasks=args.tasks, teams=2)
+    db.latency_ms = args.latency_ms
+    path = f"/projects/{project_id}/teams"
+
+    for name, app in (("async def bloqueante", build_blocking_app()), ("def + threadpool", create_app())):
+        elapsed = asyncio.run(run(app, path, args.requests, args.concurrency))
+        print(f"{name:>22}: {args.requests} req en {elapsed:.2f}s -> {args.requests / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
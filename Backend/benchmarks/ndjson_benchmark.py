@@ -0,0 +1,90 @@
+"""
+Compara GET /projects/{id}/tasks en JSON (lista completa de modelos serializada
+de una vez) contra Accept: application/x-ndjson (un documento por línea a medida
+que llegan de query.stream()) sobre un proyecto sintético.
+
+Mide el tiempo hasta el primer byte, el tiempo total y el pico de memoria de
+Python (tracemalloc) de cada modo. Cada corrida empieza con la caché de tareas vacía.
+
+    python benchmarks/ndjson_benchmark.py --tasks 50000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from _common import seed_project
+
+from app import create_app
+from helpers import project_tasks_cache
+
+MODES = (("JSON", "application/json"), ("NDJSON", "application/x-ndjson"))
+
+
+async def request(app, path: str, accept: str) -> dict:
+    """Llama a la app ASGI directamente para ver cuándo sale cada fragmento del cuerpo."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        "headers": [(b"host", b"bench"), (b"accept", accept.encode())],
+    }
+    delivered = False
+    result = {"status": None, "first_byte": None, "bytes": 0}
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if result["first_byte"] is None:
+                result["first_byte"] = time.perf_counter()
+            result["bytes"] += len(message["body"])
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    result["ttfb"] = result["first_byte"] - started
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def run(app, path: str, accept: str, trace: bool) -> dict:
+    project_tasks_cache.clear()
+    if trace:
+        tracemalloc.start()
+    result = asyncio.run(request(app, path, accept))
+    if trace:
+        result["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if result["status"] != 200:
+        raise SystemExit(f"{path} respondió {result['status']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50000)
+    args = parser.parse_args()
+
+    project_id = seed_project(members=10, tasks=args.tasks, teams=1)
+    app = create_app()
+    path = f"/projects/{project_id}/tasks"
+
+    print(f"{args.tasks} tareas")
+    for name, accept in MODES:
+        timing = run(app, path, accept, trace=False)
+        memory = run(app, path, accept, trace=True)
+        print(
+            f"{name:>7}: primer byte {timing['ttfb'] * 1000:8.1f} ms | total {timing['total']:.2f}s"
+            f" | {timing['bytes'] / 1e6:.1f} MB | pico tracemalloc {memory['peak'] / 1e6:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
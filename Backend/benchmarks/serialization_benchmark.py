@@ -0,0 +1,70 @@
+"""
+Compara las peticiones por segundo de GET /projects/{id}/tasks con el camino
+validado (TaskResponse + validación contra response_model) y con la lectura de
+confianza (dicts + orjson) sobre un proyecto de 5k tareas. La caché de tareas
+queda caliente, así que se mide sobre todo la construcción y serialización.
+
+Cada modo corre en su propio proceso porque TRUSTED_READS se lee al importar.
+
+    python benchmarks/serialization_benchmark.py --tasks 5000 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+MODES = (("validado", "false"), ("confianza + orjson", "true"))
+
+
+def child(tasks: int, requests: int) -> float:
+    from _common import seed_project
+
+    import httpx
+    from app import create_app
+
+    project_id = seed_project(members=10, tasks=tasks, teams=1)
+    app = create_app()
+    path = f"/projects/{project_id}/tasks"
+
+    async def run() -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.get(path)).raise_for_status()  # calienta la caché
+            started = time.perf_counter()
+            for _ in range(requests):
+                (await client.get(path)).raise_for_status()
+            return time.perf_counter() - started
+
+    return requests / asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(child(args.tasks, args.requests))
+        return
+
+    print(f"{args.tasks} tareas, {args.requests} peticiones por modo")
+    results = {}
+    for name, trusted in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "--tasks", str(args.tasks), "--requests", str(args.requests)],
+            env={**os.environ, "TRUSTED_READS": trusted},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results[name] = float(output.strip().splitlines()[-1])
+        print(f"{name:>20}: {results[name]:.1f} req/s")
+
+    baseline, fast = (results[name] for name, _ in MODES)
+    print(f"{'mejora':>20}: x{fast / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Mide el índice de búsqueda de usuarios: tiempo de construcción y latencia por
+búsqueda (prefijos frecuentes, subcadena, prefijo de correo y aproximada con
+errores de tipeo) sobre N usuarios sintéticos, sin Firestore de por medio.
+
+    python benchmarks/user_search_benchmark.py --users 100000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+import _common  # noqa: F401  (backend en memoria y sys.path)
+from helpers.user_search_helper import UserSearchIndex
+
+FIRST = ["Ana", "José", "Luis", "María", "Carlos", "Sofía", "Diego", "Lucía", "Jorge", "Valeria",
+         "Miguel", "Camila", "Andrés", "Paula", "Fernando", "Daniela", "Ricardo", "Gabriela"]
+LAST = ["García", "Hernández", "López", "Martínez", "González", "Pérez", "Rodríguez", "Sánchez",
+        "Ramírez", "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Reyes", "Cruz", "Morales"]
+DOMAINS = ["gmail.com", "outlook.com", "tec.mx", "example.com"]
+
+
+def synthetic_users(count: int):
+    rng = random.Random(7)
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        handle = "".join(rng.choices(string.ascii_lowercase, k=5))
+        yield f"user-{i}", {
+            "name": f"{first} {last} {handle.capitalize()}",
+            "email": f"{handle}{i}@{rng.choice(DOMAINS)}",
+            "role": "user",
+            "picture": None,
+        }
+
+
+def time_queries(index: UserSearchIndex, queries, repeat: int):
+    samples = []
+    for query in queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(query, limit=20)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    users = list(synthetic_users(args.users))
+    index = UserSearchIndex()
+    started = time.perf_counter()
+    index.build(users)
+    print(f"{args.users} usuarios indexados en {time.perf_counter() - started:.2f} s")
+
+    rng = random.Random(11)
+    sample = [data for _, data in rng.sample(users, 50)]
+    handles = [data["name"].split()[-1].lower() for data in sample]
+    suites = {
+        "prefijo frecuente": ["ma", "jo", "garc", "lucia", "gmail"],
+        "subcadena (handle)": [handle[1:] for handle in handles],
+        "prefijo de correo": [data["email"][:6] for data in sample],
+        "aproximada": [handle[:2] + handle[3:] + "x" for handle in handles],
+    }
+    for name, queries in suites.items():
+        median, p95 = time_queries(index, queries, args.repeat)
+        print(f"{name:>20}: mediana {median:.3f} ms, p95 {p95:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
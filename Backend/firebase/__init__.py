@@ -1,41 +1,68 @@
 # firebase_config.py
 #from dotenv import load_dotenv
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
 
 from dotenv import load_dotenv
 print("load_dotenv imported correctly")
 
 load_dotenv()
-# Obtener las credenciales de Firebase desde el entorno
-cred_dict= {
-    "type": os.getenv("TYPE"),
-    "project_id": os.getenv("PROJECT_ID"),
-    "private_key_id": os.getenv("PRIVATE_KEY_ID"),
-    "private_key": os.getenv("PRIVATE_KEY").replace("\\n", "\n"),  
-    "client_email": os.getenv("CLIENT_EMAIL"),
-    "client_id": os.getenv("CLIENT_ID"),
-    "auth_uri": os.getenv("AUTH_URI"),
-    "token_uri": os.getenv("TOKEN_URI"),
-    "auth_provider_x509_cert_url": os.getenv("AUTH_PROVIDER_CERT_URL"),
-    "client_x509_cert_url": os.getenv("CLIENT_CERT_URL")
-}
-
-
-if cred_dict:
-    
+
+# Backend de datos: "firestore" (por defecto) o "memory" para correr sin credenciales
+FIRESTORE_BACKEND = os.getenv("FIRESTORE_BACKEND", "firestore").lower()
+
+
+def _create_firestore_client():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    # Obtener las credenciales de Firebase desde el entorno
+    private_key = os.getenv("PRIVATE_KEY")
+    if not private_key:
+        raise ValueError("No se encontraron credenciales de Firebase en las variables de entorno")
+
+    cred_dict= {
+        "type": os.getenv("TYPE"),
+        "project_id": os.getenv("PROJECT_ID"),
+        "private_key_id": os.getenv("PRIVATE_KEY_ID"),
+        "private_key": private_key.replace("\\n", "\n"),
+        "client_email": os.getenv("CLIENT_EMAIL"),
+        "client_id": os.getenv("CLIENT_ID"),
+        "auth_uri": os.getenv("AUTH_URI"),
+        "token_uri": os.getenv("TOKEN_URI"),
+        "auth_provider_x509_cert_url": os.getenv("AUTH_PROVIDER_CERT_URL"),
+        "client_x509_cert_url": os.getenv("CLIENT_CERT_URL")
+    }
+
     cred = credentials.Certificate(cred_dict)
-    
+
     # Verificar si ya está inicializado, si no, inicializar solo una vez
     if not firebase_admin._apps:
         firebase_admin.initialize_app(cred)
-else:
-    raise ValueError("No se encontraron credenciales de Firebase en las variables de entorno")
 
+    return firestore.client()
+
+
+def _create_memory_client():
+    from .memory import MemoryClient
 
-db = firestore.client()
+    client = MemoryClient(latency_ms=float(os.getenv("FIRESTORE_MEMORY_LATENCY_MS", "0")))
+    seed_path = os.getenv("FIRESTORE_MEMORY_SEED")
+    if seed_path:
+        client.load_json(seed_path)
+    return client
+
+
+if FIRESTORE_BACKEND == "memory":
+    db = _create_memory_client()
+elif FIRESTORE_BACKEND == "firestore":
+    db = _create_firestore_client()
+else:
+    raise ValueError(f"FIRESTORE_BACKEND desconocido: {FIRESTORE_BACKEND}")
 
+# Estos handles (y db) son la capa de acceso que comparten todas las rutas: el
+# backend se elige aquí y las rutas no cambian. No hay una capa de repositorios
+# aparte; cambiar de almacenamiento es implementar la interfaz de cliente que
+# usa firebase/memory.py.
 users_ref = db.collection("users")
 projects_ref = db.collection("projects")
 project_users_ref = db.collection("project_users")
@@ -48,5 +75,12 @@ permissions_ref = db.collection("permissions")
 bugs_ref = db.collection("bugs")
 teams_ref = db.collection('teams')
 team_members_ref = db.collection('team_members')
-user_roles_ref = db.collection('user_roles')  
-roadmap_ref = db.collection('roadmap')
\ No newline at end of file
+user_roles_ref = db.collection('user_roles')
+roadmap_ref = db.collection('roadmap')
+events_ref = db.collection('events')
+sprint_stats_ref = db.collection('sprint_stats')
+burndown_snapshots_ref = db.collection('burndown_snapshots')
+user_story_points_ref = db.collection('user_story_points')
+role_index_ref = db.collection('role_index')
+cascade_deletes_ref = db.collection('cascade_deletes')
+jobs_ref = db.collection('jobs')
@@ -0,0 +1,606 @@
+# memory.py
+"""
+Backend en memoria compatible con el subconjunto de la API de Firestore que usan
+las rutas (collection / document / where / order_by / limit / select / stream /
+batch / get_all). Sirve para correr la API sin credenciales ni red, por ejemplo
+para pruebas de carga o perfilado local.
+
+Se activa con FIRESTORE_BACKEND=memory. FIRESTORE_MEMORY_LATENCY_MS agrega una
+latencia artificial por cada RPC simulado para aproximar el costo de red.
+"""
+# Standard library imports
+import copy
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Third-party imports
+try:
+    from google.cloud.firestore_v1 import transforms as _transforms
+except ImportError:  # pragma: no cover - el paquete viene con firebase-admin
+    _transforms = None
+
+
+DOCUMENT_ID = "__name__"
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+_MISSING = object()
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class MemoryDocumentChange:
+    def __init__(self, type: ChangeType, document, old_index: int = -1, new_index: int = -1):
+        self.type = type
+        self.document = document
+        self.old_index = old_index
+        self.new_index = new_index
+
+
+class MemoryWatch:
+    """Equivalente a google.cloud.firestore_v1.watch.Watch para el backend en memoria."""
+
+    def __init__(self, client: "MemoryClient", query: "MemoryQuery", callback):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        self._closed = False
+
+    def unsubscribe(self) -> None:
+        self._closed = True
+        with self._client._lock:
+            if self in self._client._watches:
+                self._client._watches.remove(self)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_field(data: Dict[str, Any], path: str, default=_MISSING):
+    value = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _set_field(data: Dict[str, Any], path: str, value) -> None:
+    parts = path.split(".")
+    target = data
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    target[parts[-1]] = value
+
+
+def _delete_field(data: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    target = data
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+def _as_utc(value):
+    """Firestore guarda los datetime sin zona como UTC; se comparan igual aquí."""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _sort_key(value):
+    """Orden estable entre tipos mezclados, similar al orden de tipos de Firestore."""
+    if value is None or value is _MISSING:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, MemoryDocumentReference):
+        return (5, value.path)
+    return (6, repr(value))
+
+
+def _apply_value(current, value, now: datetime):
+    """Resuelve los sentinels de Firestore (SERVER_TIMESTAMP, ArrayUnion, ...)."""
+    if _transforms is None:
+        return value
+    if value is _transforms.SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, _transforms.ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(copy.deepcopy(item))
+        return result
+    if isinstance(value, _transforms.ArrayRemove):
+        result = list(current) if isinstance(current, list) else []
+        return [item for item in result if item not in value.values]
+    if isinstance(value, _transforms.Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, dict):
+        return {
+            k: _apply_value(current.get(k) if isinstance(current, dict) else None, v, now)
+            for k, v in value.items()
+        }
+    return copy.deepcopy(value)
+
+
+def _is_delete(value) -> bool:
+    return _transforms is not None and value is _transforms.DELETE_FIELD
+
+
+class MemoryDocumentSnapshot:
+    # Los datos guardados nunca se modifican en sitio (cada escritura crea un dict
+    # nuevo), así que el snapshot los comparte y solo copia al entregarlos.
+    def __init__(self, reference, data: Optional[Dict[str, Any]], create_time=None, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = _now()
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        if self._data is None:
+            return None
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str):
+        if self._data is None:
+            return None
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference:
+    def __init__(self, client: "MemoryClient", collection: str, doc_id: str):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection}/{self.id}"
+
+    @property
+    def parent(self) -> "MemoryCollectionReference":
+        return self._client.collection(self._collection)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self) -> str:
+        return f"<MemoryDocumentReference {self.path}>"
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, **_) -> MemoryDocumentSnapshot:
+        self._client._rpc()
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False, **_):
+        self._client._rpc()
+        self._client._write([("set", self, document_data, merge)])
+
+    def create(self, document_data: Dict[str, Any], **_):
+        self._client._rpc()
+        self._client._write([("create", self, document_data, False)])
+
+    def update(self, field_updates: Dict[str, Any], **_):
+        self._client._rpc()
+        self._client._write([("update", self, field_updates, False)])
+
+    def delete(self, **_):
+        self._client._rpc()
+        self._client._write([("delete", self, None, False)])
+
+
+class MemoryQuery:
+    def __init__(self, client: "MemoryClient", collection: str, filters=None, orders=None,
+                 limit: Optional[int] = None, projection=None, start_after=None):
+        self._client = client
+        self._collection = collection
+        self._filters: List[Tuple[str, str, Any]] = filters or []
+        self._orders: List[Tuple[str, str]] = orders or []
+        self._limit = limit
+        self._projection = projection
+        self._start_after = start_after
+
+    def _copy(self, **changes) -> "MemoryQuery":
+        params = {
+            "filters": list(self._filters),
+            "orders": list(self._orders),
+            "limit": self._limit,
+            "projection": self._projection,
+            "start_after": self._start_after,
+        }
+        params.update(changes)
+        return MemoryQuery(self._client, self._collection, **params)
+
+    def where(self, field_path: str = None, op_string: str = None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Operador no soportado: {op_string}")
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING"):
+        return self._copy(orders=self._orders + [(field_path, direction)])
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def select(self, field_paths: Iterable[str]):
+        return self._copy(projection=list(field_paths))
+
+    def start_after(self, document_fields):
+        return self._copy(start_after=document_fields)
+
+    def _matches(self, ref: MemoryDocumentReference, data: Dict[str, Any]) -> bool:
+        for field_path, op_string, expected in self._filters:
+            if field_path == DOCUMENT_ID:
+                actual = ref
+            else:
+                actual = _get_field(data, field_path)
+                if actual is _MISSING:
+                    return False
+            try:
+                if not _OPERATORS[op_string](_as_utc(actual), _as_utc(expected)):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def _order_values(self, ref, data) -> List[Any]:
+        values = []
+        for field_path, _ in self._orders:
+            if field_path == DOCUMENT_ID:
+                values.append(ref.id)
+            else:
+                values.append(_get_field(data, field_path, None))
+        return values
+
+    def _cursor_values(self) -> Optional[List[Any]]:
+        cursor = self._start_after
+        if cursor is None:
+            return None
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            return self._order_values(cursor.reference, cursor._data or {})
+        if isinstance(cursor, dict):
+            values = []
+            for field_path, _ in self._orders:
+                value = cursor.get(field_path, None)
+                if isinstance(value, MemoryDocumentReference):
+                    value = value.id
+                values.append(value)
+            return values
+        return list(cursor)
+
+    def _run(self) -> List[MemoryDocumentSnapshot]:
+        entries = self._client._matching(self)
+        if self._orders:
+            # Orden por cada campo de derecha a izquierda para respetar la prioridad
+            for index in range(len(self._orders) - 1, -1, -1):
+                descending = self._orders[index][1].upper().startswith("DESC")
+                entries.sort(
+                    key=lambda e: _sort_key(self._order_values(e[0], e[1])[index]),
+                    reverse=descending,
+                )
+        cursor = self._cursor_values()
+        if cursor is not None:
+            cursor_key = [_sort_key(v) for v in cursor]
+            descending = self._orders[0][1].upper().startswith("DESC") if self._orders else False
+            kept = []
+            for ref, data, created, updated in entries:
+                key = [_sort_key(v) for v in self._order_values(ref, data)][: len(cursor_key)]
+                if (key < cursor_key) if descending else (key > cursor_key):
+                    kept.append((ref, data, created, updated))
+            entries = kept
+        if self._limit is not None:
+            entries = entries[: self._limit]
+        snapshots = []
+        for ref, data, created, updated in entries:
+            if self._projection is not None:
+                projected: Dict[str, Any] = {}
+                for field_path in self._projection:
+                    value = _get_field(data, field_path)
+                    if value is not _MISSING:
+                        _set_field(projected, field_path, value)
+                data = projected
+            snapshots.append(MemoryDocumentSnapshot(ref, data, created, updated))
+        return snapshots
+
+    def stream(self, **_):
+        self._client._rpc()
+        return iter(self._run())
+
+    def get(self, **_) -> List[MemoryDocumentSnapshot]:
+        self._client._rpc()
+        return self._run()
+
+    def on_snapshot(self, callback) -> MemoryWatch:
+        """
+        Igual que Query.on_snapshot: callback(docs, changes, read_time). La primera
+        llamada trae todos los documentos como ADDED; después se notifica cada
+        escritura que afecte a la consulta, en el mismo hilo que escribe.
+        """
+        watch = MemoryWatch(self._client, self, callback)
+        with self._client._lock:
+            docs = self._run()
+            self._client._watches.append(watch)
+        changes = [MemoryDocumentChange(ChangeType.ADDED, doc, -1, i) for i, doc in enumerate(docs)]
+        callback(docs, changes, _now())
+        return watch
+
+
+class MemoryCollectionReference(MemoryQuery):
+    def __init__(self, client: "MemoryClient", collection: str):
+        super().__init__(client, collection)
+        self.id = collection
+
+    def document(self, document_id: Optional[str] = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self._client, self._collection, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.set(document_data)
+        return _now(), ref
+
+    def list_documents(self, **_):
+        self._client._rpc()
+        with self._client._lock:
+            ids = list(self._client._store.get(self._collection, {}))
+        return [self.document(doc_id) for doc_id in ids]
+
+
+class MemoryWriteBatch:
+    MAX_WRITES = 500
+
+    def __init__(self, client: "MemoryClient"):
+        self._client = client
+        self._writes = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference, document_data, merge: bool = False):
+        self._writes.append(("set", reference, document_data, merge))
+        return self
+
+    def create(self, reference, document_data):
+        self._writes.append(("create", reference, document_data, False))
+        return self
+
+    def update(self, reference, field_updates):
+        self._writes.append(("update", reference, field_updates, False))
+        return self
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+        return self
+
+    def commit(self, **_):
+        if len(self._writes) > self.MAX_WRITES:
+            raise ValueError(f"Un batch no puede tener más de {self.MAX_WRITES} escrituras")
+        self._client._rpc()
+        self._client._write(self._writes)
+        writes, self._writes = self._writes, []
+        return [None] * len(writes)
+
+
+class MemoryClient:
+    """Cliente Firestore en memoria, seguro para uso concurrente entre hilos."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.rpc_count = 0
+        self._lock = threading.RLock()
+        # colección -> id -> (data, create_time, update_time)
+        self._store: Dict[str, Dict[str, Tuple[Dict[str, Any], datetime, datetime]]] = {}
+        self._watches: List[MemoryWatch] = []
+
+    def _rpc(self) -> None:
+        with self._lock:
+            self.rpc_count += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def collection(self, collection_path: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, collection_path)
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def get_all(self, references: Iterable[MemoryDocumentReference], field_paths=None, **_):
+        self._rpc()
+        seen = set()
+        for ref in references:
+            if ref.path in seen:
+                continue
+            seen.add(ref.path)
+            yield self._snapshot(ref, field_paths)
+
+    def _snapshot(self, ref: MemoryDocumentReference, field_paths=None) -> MemoryDocumentSnapshot:
+        with self._lock:
+            entry = self._store.get(ref._collection, {}).get(ref.id)
+            if entry is None:
+                return MemoryDocumentSnapshot(ref, None)
+            data, created, updated = entry
+            if field_paths is not None:
+                projected: Dict[str, Any] = {}
+                for field_path in field_paths:
+                    value = _get_field(data, field_path)
+                    if value is not _MISSING:
+                        _set_field(projected, field_path, value)
+                data = projected
+            return MemoryDocumentSnapshot(ref, data, created, updated)
+
+    def _matching(self, query: MemoryQuery):
+        with self._lock:
+            documents = self._store.get(query._collection, {})
+            return [
+                (self.collection(query._collection).document(doc_id), data, created, updated)
+                for doc_id, (data, created, updated) in documents.items()
+                if query._matches(self.collection(query._collection).document(doc_id), data)
+            ]
+
+    def _write(self, writes) -> None:
+        """Aplica las escrituras de forma atómica: o todas o ninguna."""
+        now = _now()
+        with self._lock:
+            staged = {}
+            for kind, ref, payload, merge in writes:
+                key = (ref._collection, ref.id)
+                current = staged[key] if key in staged else self._store.get(ref._collection, {}).get(ref.id)
+                if kind == "delete":
+                    staged[key] = None
+                    continue
+                if kind == "create" and current is not None:
+                    raise ValueError(f"El documento {ref.path} ya existe")
+                if kind == "update" and current is None:
+                    raise ValueError(f"No existe el documento {ref.path}")
+
+                created = current[1] if current else now
+                if kind == "update" or (kind == "set" and merge):
+                    data = copy.deepcopy(current[0]) if current else {}
+                    items = payload.items()
+                    if kind == "set":
+                        items = self._flatten(payload)
+                    for field_path, value in items:
+                        if _is_delete(value):
+                            _delete_field(data, field_path)
+                        else:
+                            existing = _get_field(data, field_path, None)
+                            _set_field(data, field_path, _apply_value(existing, value, now))
+                else:
+                    data = {
+                        k: _apply_value(None, v, now)
+                        for k, v in payload.items() if not _is_delete(v)
+                    }
+                staged[key] = (data, created, now)
+
+            previous = {}
+            for (collection, doc_id), entry in staged.items():
+                documents = self._store.setdefault(collection, {})
+                previous[(collection, doc_id)] = documents.get(doc_id)
+                if entry is None:
+                    documents.pop(doc_id, None)
+                else:
+                    documents[doc_id] = entry
+
+            notifications = self._pending_notifications(staged, previous, now) if self._watches else []
+
+        for watch, docs, changes in notifications:
+            if not watch._closed:
+                watch._callback(docs, changes, now)
+
+    def _pending_notifications(self, staged, previous, now):
+        """Calcula, para cada listener, los cambios producidos por una escritura."""
+        notifications = []
+        for watch in list(self._watches):
+            query = watch._query
+            changes = []
+            for (collection, doc_id), entry in staged.items():
+                if collection != query._collection:
+                    continue
+                ref = self.collection(collection).document(doc_id)
+                before = previous[(collection, doc_id)]
+                was_match = before is not None and query._matches(ref, before[0])
+                is_match = entry is not None and query._matches(ref, entry[0])
+                if is_match:
+                    data, created, updated = entry
+                    snapshot = MemoryDocumentSnapshot(ref, data, created, updated)
+                    change_type = ChangeType.MODIFIED if was_match else ChangeType.ADDED
+                    changes.append(MemoryDocumentChange(change_type, snapshot))
+                elif was_match:
+                    data, created, updated = before
+                    snapshot = MemoryDocumentSnapshot(ref, data, created, updated)
+                    changes.append(MemoryDocumentChange(ChangeType.REMOVED, snapshot))
+            if changes:
+                notifications.append((watch, query._run(), changes))
+        return notifications
+
+    @staticmethod
+    def _flatten(payload: Dict[str, Any], prefix: str = ""):
+        """Para set(merge=True): los dicts anidados se fusionan campo por campo."""
+        items = []
+        for key, value in payload.items():
+            path = f"{prefix}{key}"
+            if isinstance(value, dict) and value:
+                items.extend(MemoryClient._flatten(value, path + "."))
+            else:
+                items.append((path, value))
+        return items
+
+    def _resolve_refs(self, value):
+        # {"__ref__": "users/abc"} representa un DocumentReference en los fixtures JSON
+        if isinstance(value, dict):
+            if set(value) == {"__ref__"}:
+                collection, doc_id = value["__ref__"].split("/", 1)
+                return self.collection(collection).document(doc_id)
+            return {k: self._resolve_refs(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve_refs(v) for v in value]
+        return value
+
+    def load(self, data: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        """Carga datos iniciales con la forma {coleccion: {doc_id: campos}}."""
+        writes = [
+            ("set", self.collection(name).document(doc_id), self._resolve_refs(fields), False)
+            for name, documents in data.items()
+            for doc_id, fields in documents.items()
+        ]
+        self._write(writes)
+
+    def load_json(self, path: str) -> None:
+        with open(path, encoding="utf-8") as fh:
+            self.load(json.load(fh))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self.rpc_count = 0
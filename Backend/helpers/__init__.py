@@ -1,2 +1,24 @@
 from .sprint_helper import sync_task_in_sprint
-from .user_story_helper import add_task_to_user_story,remove_task_from_user_story,delete_user_story_and_related
\ No newline at end of file
+from .sprint_stats_helper import get_project_sprint_stats,rebuild_sprint_stats,delete_sprint_stats,parse_firestore_date
+from .burndown_helper import completed_per_day,cumulative,get_burndown_snapshots,recorded_remaining,record_burndown_snapshots
+from .story_points_helper import backfill_story_points,get_user_story_points,story_points_drift
+from .calendar_helper import EVENT_WINDOW_MAX_DAYS,as_utc,expand_occurrences,get_window_events
+from .role_index_helper import index_roles,lookup_role_bitmask,rebuild_role_index,role_bitmask_cache
+from .permission_helper import ENFORCE_PROJECT_PERMISSIONS,get_project_membership,has_permission,invalidate_permissions,permission_cache,role_bitmask
+from .auth_helper import ensure_user_provisioned,forget_provisioned_user,verified_tokens,verify_id_token_cached
+from .user_search_helper import get_project_members,invalidate_project_members,user_search_index
+from .velocity_helper import add_rolling_series,get_project_velocity,invalidate_velocity,velocity_cache
+from .search_helper import SEARCH_ENTITIES,get_project_search_index,index_search_document,project_search_indexes
+from .bulk_write_helper import BulkWriter,BulkWriteReport,bulk_write_response
+from .task_events_helper import record_task_change,record_task_changes,record_bug_change,record_bug_changes
+from .job_helper import AsyncQuery,JobCancelled,get_job,job_accepted,job_runner
+from .cascade_helper import CascadeError,cascade_pending,get_cascade_state,project_cascade,run_cascade,user_cascade,user_story_cascade
+from .user_story_helper import add_task_to_user_story,remove_task_from_user_story,delete_user_story_and_related
+from .loader_helper import DocumentLoader,ref_id
+from .task_cache_helper import get_project_task_docs,get_project_tasks_snapshot,peek_project_tasks_snapshot,get_sprint_task_docs,invalidate_project_tasks,project_tasks_cache,project_tasks_etag
+from .task_view_helper import task_views
+from .fields_helper import parse_fields,sparse_response
+from .pagination_helper import NEXT_CURSOR_HEADER,PageParams
+from .ndjson_helper import ndjson_response,wants_ndjson
+from .etag_helper import not_modified,query_versions,request_variant,versions_etag
+from .serialization_helper import TRUSTED_READS,fast_json_response,trusted_dict
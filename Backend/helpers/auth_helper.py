@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+import time
+from firebase_admin import auth
+from firebase import users_ref
+from .cache_helper import TTLCache
+from .user_search_helper import user_search_index
+
+# Tokens ya verificados, por hash (el token en claro nunca se guarda). La firma
+# y la expiración no cambian, así que solo la revocación se vuelve a consultar
+# cada TOKEN_REVOCATION_CHECK_SECONDS.
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "900"))
+TOKEN_REVOCATION_CHECK_SECONDS = float(os.getenv("TOKEN_REVOCATION_CHECK_SECONDS", "300"))
+TOKEN_CLOCK_SKEW_SECONDS = 60
+verified_tokens = TTLCache(int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000")), TOKEN_CACHE_TTL_SECONDS)
+
+# Usuarios que ya se sabe que existen en Firestore (por proceso)
+_provisioned_uids = set()
+_provisioned_lock = threading.Lock()
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _verify(token: str) -> dict:
+    return auth.verify_id_token(token, check_revoked=True, clock_skew_seconds=TOKEN_CLOCK_SKEW_SECONDS)
+
+def verify_id_token_cached(token: str) -> dict:
+    """
+    verify_id_token(check_revoked=True) con caché: un token conocido y vigente
+    no se vuelve a verificar, salvo la revocación una vez por intervalo. Los
+    errores de auth se propagan igual que sin caché.
+    """
+    key = token_key(token)
+    now = time.time()
+    entry = verified_tokens.get(key)
+
+    if entry is not None and now >= entry["expires_at"] + TOKEN_CLOCK_SKEW_SECONDS:
+        verified_tokens.invalidate(key)
+        entry = None
+
+    if entry is not None and now - entry["checked_at"] < TOKEN_REVOCATION_CHECK_SECONDS:
+        return entry["decoded"]
+
+    try:
+        decoded = _verify(token)
+    except Exception:
+        # Solo hay algo que descartar si el token estaba en caché (p. ej. revocado)
+        if entry is not None:
+            verified_tokens.invalidate(key)
+        raise
+
+    verified_tokens.set(key, {
+        "decoded": decoded,
+        "expires_at": decoded.get("exp", now),
+        "checked_at": now,
+    })
+    return decoded
+
+def ensure_user_provisioned(decoded_token: dict):
+    """Crea el documento del usuario si no existe; la lectura se hace una vez por usuario y proceso."""
+    uid = decoded_token.get("uid")
+    if not uid or uid in _provisioned_uids:
+        return
+
+    user_doc = users_ref.document(uid).get()
+    if not user_doc.exists:
+        # Si no existe, lo creamos con rol "user" por defecto
+        user_data = {
+            "name": decoded_token.get("name"),
+            "email": decoded_token.get("email"),
+            "role": "user",  # Rol por defecto
+            "picture": decoded_token.get("picture")
+        }
+        users_ref.document(uid).set(user_data)
+        user_search_index.upsert(uid, user_data)
+
+    with _provisioned_lock:
+        _provisioned_uids.add(uid)
+
+def forget_provisioned_user(uid: str):
+    """Al borrar un usuario, la siguiente petición con su token lo vuelve a crear."""
+    with _provisioned_lock:
+        _provisioned_uids.discard(uid)
@@ -0,0 +1,194 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from firebase import db
+
+try:
+    from google.api_core import exceptions as _api_exceptions
+    TRANSIENT_ERRORS = (
+        _api_exceptions.Aborted,
+        _api_exceptions.DeadlineExceeded,
+        _api_exceptions.InternalServerError,
+        _api_exceptions.ResourceExhausted,
+        _api_exceptions.ServiceUnavailable,
+        ConnectionError,
+        TimeoutError,
+    )
+except ImportError:  # pragma: no cover - el paquete viene con firebase-admin
+    TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+
+# Firestore acepta hasta 500 escrituras por batch; se deja margen
+BULK_WRITE_CHUNK_SIZE = min(int(os.getenv("BULK_WRITE_CHUNK_SIZE", "400")), 500)
+BULK_WRITE_MAX_WORKERS = int(os.getenv("BULK_WRITE_MAX_WORKERS", "8"))
+BULK_WRITE_MAX_RETRIES = int(os.getenv("BULK_WRITE_MAX_RETRIES", "4"))
+BULK_WRITE_BACKOFF_SECONDS = float(os.getenv("BULK_WRITE_BACKOFF_SECONDS", "0.2"))
+BULK_WRITE_BACKOFF_MAX_SECONDS = 5.0
+
+
+class BulkWriteReport:
+    """Resultado por escritura, en el orden en que se agregaron al BulkWriter."""
+
+    def __init__(self, items: List[dict], chunks: int, retries: int, elapsed_ms: float):
+        self.items = items
+        self.chunks = chunks
+        self.retries = retries
+        self.elapsed_ms = elapsed_ms
+        self._failed = {item["key"] for item in items if item["status"] != "ok"}
+
+    @property
+    def failed(self) -> List[dict]:
+        return [item for item in self.items if item["status"] != "ok"]
+
+    def ok(self, key: Hashable) -> bool:
+        return key not in self._failed
+
+    def to_dict(self, failed_only: bool = False) -> dict:
+        return {
+            "total": len(self.items),
+            "succeeded": len(self.items) - len(self._failed),
+            "failed": len(self._failed),
+            "chunks": self.chunks,
+            "retries": self.retries,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "items": self.failed if failed_only else self.items,
+        }
+
+
+class BulkWriter:
+    """
+    Acumula escrituras y las confirma en batches de hasta BULK_WRITE_CHUNK_SIZE,
+    varios a la vez. Un batch que falla por un error transitorio se reintenta
+    con backoff exponencial; si falla por otra causa (p. ej. update sobre un
+    documento que no existe) se divide a la mitad para aislar las escrituras
+    culpables y el resto se confirma igual. Cada batch es atómico, pero el
+    conjunto no: el reporte dice qué escrituras quedaron aplicadas.
+
+    `key` identifica la escritura en el reporte (por defecto, el id del documento).
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = BULK_WRITE_CHUNK_SIZE,
+        max_workers: int = BULK_WRITE_MAX_WORKERS,
+        max_retries: int = BULK_WRITE_MAX_RETRIES,
+        backoff_seconds: float = BULK_WRITE_BACKOFF_SECONDS
+    ):
+        self.chunk_size = max(1, min(chunk_size, 500))
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._writes: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference, data: Dict[str, Any], merge: bool = False, key: Optional[Hashable] = None):
+        self._writes.append(("set", reference, data, merge, key))
+        return self
+
+    def update(self, reference, data: Dict[str, Any], key: Optional[Hashable] = None):
+        self._writes.append(("update", reference, data, False, key))
+        return self
+
+    def delete(self, reference, key: Optional[Hashable] = None):
+        self._writes.append(("delete", reference, None, False, key))
+        return self
+
+    def commit(self) -> BulkWriteReport:
+        started = time.perf_counter()
+        writes, self._writes = self._writes, []
+        outcomes: List[Optional[dict]] = [None] * len(writes)
+        chunks = [list(range(i, min(i + self.chunk_size, len(writes)))) for i in range(0, len(writes), self.chunk_size)]
+        retries = [0]
+
+        def run(indexes: List[int]):
+            self._commit_chunk(writes, indexes, outcomes, retries)
+
+        if len(chunks) == 1:
+            run(chunks[0])
+        elif chunks:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                for future in [pool.submit(run, chunk) for chunk in chunks]:
+                    future.result()
+
+        items = [
+            {
+                "key": write[4] if write[4] is not None else write[1].id,
+                "id": write[1].id,
+                "op": write[0],
+                **outcome,
+            }
+            for write, outcome in zip(writes, outcomes)
+        ]
+        return BulkWriteReport(items, len(chunks), retries[0], (time.perf_counter() - started) * 1000)
+
+    def _commit_chunk(self, writes: List[tuple], indexes: List[int], outcomes: List[Optional[dict]], retries: List[int]):
+        attempt = 0
+        while True:
+            attempt += 1
+            batch = db.batch()
+            for index in indexes:
+                kind, reference, data, merge, _ = writes[index]
+                if kind == "set":
+                    batch.set(reference, data, merge=merge)
+                elif kind == "update":
+                    batch.update(reference, data)
+                else:
+                    batch.delete(reference)
+            try:
+                batch.commit()
+            except TRANSIENT_ERRORS as err:
+                if attempt <= self.max_retries:
+                    retries[0] += 1
+                    self._sleep(attempt)
+                    continue
+                # Dividir no ayuda si Firestore no responde: todo el batch queda fallido
+                split = False
+                error = err
+            except Exception as err:
+                split = True
+                error = err
+            else:
+                for index in indexes:
+                    outcomes[index] = {"status": "ok", "attempts": attempt}
+                return
+
+            if len(indexes) == 1 or not split:
+                for index in indexes:
+                    outcomes[index] = {"status": "failed", "attempts": attempt, "error": f"{type(error).__name__}: {error}"}
+                return
+            middle = len(indexes) // 2
+            self._commit_chunk(writes, indexes[:middle], outcomes, retries)
+            self._commit_chunk(writes, indexes[middle:], outcomes, retries)
+            return
+
+    def _sleep(self, attempt: int):
+        # Backoff exponencial con jitter para que los batches en paralelo no reintenten a la vez
+        delay = min(self.backoff_seconds * 2 ** (attempt - 1), BULK_WRITE_BACKOFF_MAX_SECONDS)
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def bulk_write_response(results: List[Any], report: BulkWriteReport, include_report: bool = False):
+    """
+    Respuesta común de los endpoints /batch. `results` solo debe traer lo que
+    quedó escrito. Con include_report se devuelve {results, report} (207 si
+    hubo fallos); sin él, un fallo parcial es un 500 con las escrituras fallidas
+    en detail.
+    """
+    if include_report:
+        content = jsonable_encoder({"results": results, "report": report.to_dict()})
+        return JSONResponse(content, status_code=207 if report.failed else 200)
+    if report.failed:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": f"{len(report.failed)} of {len(report.items)} writes failed",
+                "report": report.to_dict(failed_only=True),
+            }
+        )
+    return results
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+from firebase_admin import firestore
+from firebase import db, sprint_stats_ref, burndown_snapshots_ref
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+def record_burndown_snapshots(project_id: str, sprint_ids: Iterable[str]):
+    """
+    Guarda el SP restante de hoy para cada sprint (un documento por sprint y día,
+    sobrescrito en cada escritura del día). Se toma de sprint_stats, así que solo
+    se registran sprints con estadísticas completas.
+    """
+    refs = [sprint_stats_ref.document(sprint_id) for sprint_id in sprint_ids]
+    if not refs:
+        return
+    today = _today()
+    batch = db.batch()
+    writes = 0
+    fields = ["initialized", "total_story_points", "completed_story_points"]
+    for doc in db.get_all(refs, field_paths=fields):
+        stats = doc.to_dict() or {}
+        if not doc.exists or not stats.get("initialized"):
+            continue
+        total = stats.get("total_story_points", 0)
+        completed = stats.get("completed_story_points", 0)
+        batch.set(burndown_snapshots_ref.document(f"{doc.id}_{today}"), {
+            "sprint_id": doc.id,
+            "project_id": project_id,
+            "date": today,
+            "total_story_points": total,
+            "completed_story_points": completed,
+            "remaining": max(total - completed, 0),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        })
+        writes += 1
+    if writes:
+        batch.commit()
+
+def get_burndown_snapshots(sprint_id: str) -> Dict[date, int]:
+    """SP restante registrado por día para un sprint."""
+    snapshots = {}
+    query = burndown_snapshots_ref.where("sprint_id", "==", sprint_id).select(["date", "remaining"])
+    for doc in query.stream():
+        data = doc.to_dict() or {}
+        try:
+            snapshots[date.fromisoformat(data["date"])] = data.get("remaining", 0)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return snapshots
+
+def completed_per_day(start: date, days: int, completions: Iterable[Tuple[date, int]]) -> List[int]:
+    """
+    SP completados por día del sprint en una sola pasada: cada tarea cae en la
+    cubeta de su día (índice = días desde el inicio). O(días + tareas).
+    """
+    buckets = [0] * days
+    for completed_on, points in completions:
+        index = (completed_on - start).days
+        if 0 <= index < days:
+            buckets[index] += points
+    return buckets
+
+def cumulative(values: List[int]) -> List[int]:
+    return list(accumulate(values))
+
+def recorded_remaining(start: date, days: int, today: date, snapshots: Dict[date, int]) -> List[Optional[int]]:
+    """
+    SP restante registrado para cada día hasta hoy; los días sin escrituras
+    arrastran el último valor registrado. None antes del primer registro y
+    después de hoy.
+    """
+    values: List[Optional[int]] = []
+    last = None
+    for day in range(days):
+        current = start + timedelta(days=day)
+        if current > today:
+            values.append(None)
+            continue
+        if current in snapshots:
+            last = snapshots[current]
+        values.append(last)
+    return values
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+class TTLCache:
+    """
+    Caché en proceso con expiración (TTL) y desalojo LRU. Es segura entre hilos
+    y lleva contadores de aciertos/fallos para poder exponerlos.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Una invalidación (o clear) durante una carga evita guardar datos viejos.
+        # Solo se llevan versiones de las llaves con cargas en curso.
+        self._generation = 0
+        self._versions: Dict[Hashable, int] = {}
+        self._loading: Dict[Hashable, int] = {}
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                version = (self._generation, self._versions.get(key, 0))
+                self._loading[key] = self._loading.get(key, 0) + 1
+            try:
+                value = loader()
+                with self._lock:
+                    if (self._generation, self._versions.get(key, 0)) == version:
+                        self.set(key, value)
+            finally:
+                with self._lock:
+                    self._loading[key] -= 1
+                    if not self._loading[key]:
+                        del self._loading[key]
+                        self._versions.pop(key, None)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            if key in self._loading:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+_MISSING = object()
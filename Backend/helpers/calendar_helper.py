@@ -0,0 +1,136 @@
+import calendar
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from firebase import events_ref
+
+# Límite de la ventana pedida: acota cuántas ocurrencias puede generar una serie
+EVENT_WINDOW_MAX_DAYS = int(os.getenv("EVENT_WINDOW_MAX_DAYS", "366"))
+
+_FIXED_STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "biweekly": timedelta(weeks=2),
+}
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Firestore devuelve datetime con zona; los sin zona se toman como UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _frequency(recurrence: dict) -> Optional[str]:
+    frequency = recurrence.get("frequency")
+    # Los Enum de pydantic se guardan como su valor, pero se aceptan ambos
+    return getattr(frequency, "value", frequency)
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    # 31 de enero + 1 mes -> último día de febrero
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+def _series_starts(start: datetime, frequency: str, window_start: datetime) -> Iterator[datetime]:
+    """
+    Inicios de la serie a partir del primero que todavía puede tocar la ventana.
+    Salta directo a esa posición en lugar de recorrer la serie desde su inicio.
+    """
+    if frequency in _FIXED_STEPS:
+        step = _FIXED_STEPS[frequency]
+        index = max(0, (window_start - start) // step)
+        while True:
+            yield start + step * index
+            index += 1
+    elif frequency == "monthly":
+        index = max(0, (window_start.year - start.year) * 12 + window_start.month - start.month - 1)
+        while True:
+            yield _add_months(start, index)
+            index += 1
+    else:
+        yield start
+
+def expand_occurrences(
+    event: dict,
+    window_start: datetime,
+    window_end: datetime
+) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    (inicio, fin) de cada ocurrencia del evento que empieza dentro de
+    [window_start, window_end). Un evento sin recurrencia tiene una sola.
+    """
+    start = as_utc(event.get("start_date"))
+    if start is None:
+        return
+    end = as_utc(event.get("end_date")) or start
+    duration = end - start
+
+    recurrence = event.get("recurrence") or {}
+    frequency = _frequency(recurrence) if event.get("is_recurring") else None
+    if not frequency:
+        if window_start <= start < window_end:
+            yield start, end
+        return
+
+    until = as_utc(recurrence.get("end_date"))
+    excluded = {as_utc(value).date() for value in recurrence.get("excluded_dates") or [] if value}
+
+    for occurrence in _series_starts(start, frequency, window_start):
+        if occurrence >= window_end or (until and occurrence.date() > until.date()):
+            return
+        if occurrence < window_start or occurrence.date() in excluded:
+            continue
+        yield occurrence, occurrence + duration
+
+def get_window_events(project_id: str, window_start: datetime, window_end: datetime) -> List[Dict]:
+    """
+    Ocurrencias del proyecto que empiezan en [window_start, window_end), ordenadas.
+
+    Tres consultas acotadas por project_id: los eventos simples que empiezan
+    en la ventana (índice project_id + start_date), las series cuyo
+    recurrence.end_date no terminó antes del día de window_start (índice
+    project_id + is_recurring + recurrence.end_date) y las series sin fin que
+    empezaron antes de que termine la ventana (índice project_id +
+    is_recurring + recurrence.end_date + start_date). Así no se leen las
+    series ya terminadas. Las series se expanden solo dentro de la ventana.
+    """
+    window_start, window_end = as_utc(window_start), as_utc(window_end)
+    by_project = events_ref.where("project_id", "==", project_id)
+    series = by_project.where("is_recurring", "==", True)
+    # expand_occurrences compara recurrence.end_date por fecha: una serie que
+    # termina el día de window_start todavía puede tener ocurrencias en la ventana
+    first_day = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    single = (
+        by_project
+        .where("start_date", ">=", window_start)
+        .where("start_date", "<", window_end)
+    )
+    bounded_series = series.where("recurrence.end_date", ">=", first_day)
+    open_series = (
+        series
+        .where("recurrence.end_date", "==", None)
+        .where("start_date", "<", window_end)
+    )
+
+    occurrences = []
+    seen = set()
+    for query in (single, bounded_series, open_series):
+        for doc in query.stream():
+            if doc.id in seen:
+                continue
+            seen.add(doc.id)
+            data = doc.to_dict() or {}
+            for start, end in expand_occurrences(data, window_start, window_end):
+                occurrences.append({
+                    **data,
+                    "id": doc.id,
+                    "start_date": start,
+                    "end_date": end,
+                    "series_start_date": as_utc(data.get("start_date")) if data.get("is_recurring") else None,
+                })
+
+    occurrences.sort(key=lambda occurrence: occurrence["start_date"])
+    return occurrences
@@ -0,0 +1,301 @@
+import os
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Iterable, List, NamedTuple, Optional
+from firebase import (
+    db, bugs_ref, burndown_snapshots_ref, cascade_deletes_ref, epics_ref, events_ref,
+    project_users_ref, projects_ref, req_ref, roadmap_ref, sprint_stats_ref, sprints_ref,
+    tasks_ref, teams_ref, user_roles_ref, user_story_points_ref, users_ref, userstories_ref
+)
+from .bulk_write_helper import BulkWriteReport, BulkWriter
+from .task_cache_helper import invalidate_project_tasks
+from .task_events_helper import record_bug_changes, record_task_changes
+from .story_points_helper import apply_story_point_changes
+from .velocity_helper import invalidate_velocity
+from .search_helper import index_search_document, project_search_indexes
+from .permission_helper import invalidate_permissions
+from .user_search_helper import invalidate_project_members, user_search_index
+from .auth_helper import forget_provisioned_user
+from .role_index_helper import index_roles
+
+# Dependientes leídos y escritos por página; el progreso se guarda al final de cada una
+CASCADE_PAGE_SIZE = int(os.getenv("CASCADE_PAGE_SIZE", "1000"))
+
+Progress = Callable[[dict], None]
+
+
+class CascadeStep(NamedTuple):
+    """
+    Un paso del borrado: `load` devuelve los dependientes que quedan, `apply`
+    agrega sus escrituras (borrar o desvincular) y `after` recibe la página ya
+    confirmada para mantener lo derivado. Los pasos vuelven a consultar lo que
+    queda, así que repetir uno después de una caída es seguro.
+    """
+    name: str
+    load: Callable[[], Iterable]
+    apply: Callable[[BulkWriter, object], None]
+    after: Optional[Callable[[List[object], BulkWriteReport], None]] = None
+
+
+class CascadeError(Exception):
+    def __init__(self, state: dict):
+        super().__init__(state.get("error") or "Cascade delete failed")
+        self.state = state
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _delete(writer: BulkWriter, doc):
+    writer.delete(doc.reference)
+
+def _succeeded(docs: List[object], report: BulkWriteReport) -> List[object]:
+    return [doc for doc in docs if report.ok(doc.id)]
+
+def cascade_job_id(kind: str, root_id: str) -> str:
+    return f"{kind}:{root_id}"
+
+def get_cascade_state(kind: str, root_id: str) -> Optional[dict]:
+    doc = cascade_deletes_ref.document(cascade_job_id(kind, root_id)).get()
+    return {"id": doc.id, **doc.to_dict()} if doc.exists else None
+
+def cascade_pending(kind: str, root_id: str) -> bool:
+    """Hay un borrado empezado y sin terminar (p. ej. el proceso cayó a la mitad)."""
+    state = get_cascade_state(kind, root_id)
+    return bool(state) and state.get("status") != "done"
+
+def run_cascade(kind: str, root_id: str, steps: List[CascadeStep], progress: Optional[Progress] = None) -> dict:
+    """
+    Ejecuta los pasos en orden con escrituras en bloque y guarda el avance en
+    cascade_deletes/{kind}:{root_id}. Si un borrado anterior del mismo
+    documento quedó a medias, retoma desde el primer paso no terminado. El
+    documento raíz va siempre en el último paso, así que mientras exista el
+    borrado se puede volver a pedir.
+    """
+    job_ref = cascade_deletes_ref.document(cascade_job_id(kind, root_id))
+    previous = job_ref.get()
+    state = previous.to_dict() if previous.exists else {}
+    if state.get("status") == "done":
+        state = {}
+
+    state = {
+        "kind": kind,
+        "root_id": root_id,
+        "status": "running",
+        "steps": [step.name for step in steps],
+        "completed_steps": state.get("completed_steps", []),
+        "current_step": None,
+        "processed": state.get("processed", {}),
+        "failed": state.get("failed", {}),
+        "attempts": state.get("attempts", 0) + 1,
+        "started_at": state.get("started_at") or _now(),
+        "updated_at": _now(),
+        "finished_at": None,
+        "error": None,
+    }
+
+    def save():
+        state["updated_at"] = _now()
+        job_ref.set(state)
+        if progress is not None:
+            progress(dict(state))
+
+    save()
+    for step in steps:
+        if step.name in state["completed_steps"]:
+            continue
+        state["current_step"] = step.name
+        docs = iter(step.load())
+        while True:
+            page = list(islice(docs, CASCADE_PAGE_SIZE))
+            if not page:
+                break
+            writer = BulkWriter()
+            for doc in page:
+                step.apply(writer, doc)
+            report = writer.commit()
+            if step.after is not None:
+                step.after(page, report)
+
+            state["processed"][step.name] = state["processed"].get(step.name, 0) + len(report.items) - len(report.failed)
+            if report.failed:
+                state["failed"][step.name] = state["failed"].get(step.name, 0) + len(report.failed)
+                state["status"] = "failed"
+                state["error"] = f"{step.name}: {report.failed[0].get('error')}"
+                save()
+                raise CascadeError(dict(state))
+            save()
+        state["completed_steps"].append(step.name)
+
+    state["status"] = "done"
+    state["current_step"] = None
+    state["finished_at"] = _now()
+    save()
+    return dict(state)
+
+
+# ---------------------------------------------------------------------------
+# Grafo de entidades
+# ---------------------------------------------------------------------------
+
+# colección -> campo con el id del proyecto (las colecciones usan nombres distintos)
+PROJECT_DEPENDENTS = [
+    ("bugs", bugs_ref, "projectId"),
+    ("userStories", userstories_ref, "projectRef"),
+    ("sprints", sprints_ref, "project_id"),
+    ("sprint_stats", sprint_stats_ref, "project_id"),
+    ("burndown_snapshots", burndown_snapshots_ref, "project_id"),
+    ("epics", epics_ref, "projectRef"),
+    ("requirements", req_ref, "projectRef"),
+    ("teams", teams_ref, "projectId"),
+    ("roadmap", roadmap_ref, "projectId"),
+    ("events", events_ref, "project_id"),
+]
+
+def project_cascade(project_id: str) -> List[CascadeStep]:
+    """
+    Borra todo lo del proyecto. Las tareas van primero para descontar sus
+    story points del libro de cada usuario; las estadísticas de sprint no se
+    actualizan porque se borran después junto con los sprints.
+    """
+    project_ref = projects_ref.document(project_id)
+
+    def tasks_deleted(docs, report):
+        apply_story_point_changes(project_id, [(doc.to_dict(), None) for doc in _succeeded(docs, report)])
+
+    def project_deleted(docs, report):
+        invalidate_project_tasks(project_id)
+        invalidate_velocity(project_id)
+        invalidate_project_members(project_id)
+        invalidate_permissions()
+        project_search_indexes.invalidate(project_id)
+
+    steps = [CascadeStep("tasks", lambda: tasks_ref.where("project_id", "==", project_id).stream(), _delete, tasks_deleted)]
+    for name, collection, field in PROJECT_DEPENDENTS:
+        steps.append(CascadeStep(
+            name,
+            lambda collection=collection, field=field: collection.where(field, "==", project_id).select([]).stream(),
+            _delete
+        ))
+    def project_and_members():
+        # Las relaciones se borran junto con el proyecto: DELETE exige ser
+        # miembro con permiso, así que quitarlas antes impediría retomar
+        project = [doc for doc in [project_ref.get()] if doc.exists]
+        return project + list(project_users_ref.where("projectRef", "==", project_ref).select([]).stream())
+
+    steps.append(CascadeStep("project", project_and_members, _delete, project_deleted))
+    return steps
+
+def user_story_cascade(project_id: str, story_id: str) -> List[CascadeStep]:
+    """
+    Borra las tareas y bugs de la historia y la quita de los sprints. Las
+    tareas pasan por record_task_changes para mantener sprint_stats, burndown
+    y story points del proyecto, que sigue existiendo.
+    """
+    story_ref = userstories_ref.document(story_id)
+    story = story_ref.get().to_dict() or {}
+    story_uuid = story.get("uuid")
+
+    def story_tasks():
+        # Las de task_list más las que apuntan a la historia pero no quedaron en la lista
+        found = {}
+        if story_uuid:
+            for doc in tasks_ref.where("project_id", "==", project_id).where("user_story_id", "==", story_uuid).stream():
+                found[doc.id] = doc
+        missing = [tasks_ref.document(task_id) for task_id in story.get("task_list") or [] if task_id not in found]
+        if missing:
+            for doc in db.get_all(missing):
+                if doc.exists:
+                    found[doc.id] = doc
+        return list(found.values())
+
+    def tasks_deleted(docs, report):
+        record_task_changes(project_id, [(doc.id, doc.to_dict(), None) for doc in _succeeded(docs, report)])
+
+    def story_bugs():
+        if not story_uuid:
+            return []
+        return bugs_ref.where("userStoryRelated", "==", story_uuid).where("projectId", "==", project_id).stream()
+
+    def bugs_deleted(docs, report):
+        record_bug_changes([(doc.id, doc.to_dict(), None) for doc in _succeeded(docs, report)])
+
+    def sprints_with_story():
+        query = sprints_ref.where("project_id", "==", project_id).select(["user_stories"]).stream()
+        return [
+            doc for doc in query
+            if any(us.get("id") == story_uuid for us in (doc.to_dict() or {}).get("user_stories") or [])
+        ]
+
+    def detach_story(writer, doc):
+        user_stories = (doc.to_dict() or {}).get("user_stories") or []
+        writer.update(doc.reference, {"user_stories": [us for us in user_stories if us.get("id") != story_uuid]})
+
+    def story_deleted(docs, report):
+        for doc in _succeeded(docs, report):
+            index_search_document(project_id, "userstory", doc.id, None)
+
+    return [
+        CascadeStep("tasks", story_tasks, _delete, tasks_deleted),
+        CascadeStep("bugs", story_bugs, _delete, bugs_deleted),
+        CascadeStep("sprints", sprints_with_story, detach_story),
+        CascadeStep("userStory", lambda: [doc for doc in [story_ref.get()] if doc.exists], _delete, story_deleted),
+    ]
+
+def user_cascade(uid: str) -> List[CascadeStep]:
+    """
+    Quita al usuario de los equipos de sus proyectos y borra sus relaciones,
+    roles y libro de story points. Los equipos van antes que project_users
+    porque de ahí salen los proyectos a revisar.
+    """
+    user_ref = users_ref.document(uid)
+
+    def user_projects() -> List[str]:
+        query = project_users_ref.where("userRef", "==", user_ref).select(["projectRef"]).stream()
+        return sorted({
+            getattr(project, "id", project)
+            for project in ((doc.to_dict() or {}).get("projectRef") for doc in query)
+            if project
+        })
+
+    def teams_with_user():
+        project_ids = user_projects()
+        teams = []
+        for i in range(0, len(project_ids), 30):  # límite del operador "in"
+            query = teams_ref.where("projectId", "in", project_ids[i:i + 30]).select(["members"])
+            teams += [
+                doc for doc in query.stream()
+                if any(_member_id(member) == uid for member in (doc.to_dict() or {}).get("members") or [])
+            ]
+        return teams
+
+    def detach_member(writer, doc):
+        members = (doc.to_dict() or {}).get("members") or []
+        writer.update(doc.reference, {"members": [member for member in members if _member_id(member) != uid]})
+
+    def relations_deleted(docs, report):
+        for doc in _succeeded(docs, report):
+            project_id = getattr((doc.to_dict() or {}).get("projectRef"), "id", None)
+            invalidate_project_members(project_id)
+
+    def roles_deleted(docs, report):
+        # Retirar al documento como fuente de sus roles en el índice
+        for doc in _succeeded(docs, report):
+            index_roles(doc.id, [], previous=(doc.to_dict() or {}).get("roles") or [])
+
+    def user_deleted(docs, report):
+        if _succeeded(docs, report):
+            forget_provisioned_user(uid)
+            user_search_index.remove(uid)
+            invalidate_permissions()
+
+    return [
+        CascadeStep("teams", teams_with_user, detach_member),
+        CascadeStep("project_users", lambda: project_users_ref.where("userRef", "==", user_ref).select(["projectRef"]).stream(), _delete, relations_deleted),
+        CascadeStep("user_roles", lambda: user_roles_ref.where("userRef", "==", uid).select(["roles"]).stream(), _delete, roles_deleted),
+        CascadeStep("user_story_points", lambda: [doc for doc in [user_story_points_ref.document(uid).get()] if doc.exists], _delete),
+        CascadeStep("user", lambda: [doc for doc in [user_ref.get()] if doc.exists], _delete, user_deleted),
+    ]
+
+def _member_id(member) -> Optional[str]:
+    return member.get("id") if isinstance(member, dict) else member
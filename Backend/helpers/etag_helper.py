@@ -0,0 +1,39 @@
+import hashlib
+from typing import Any, Iterable, List, Optional, Tuple
+from fastapi import Request, Response
+
+def query_versions(query) -> List[Tuple[str, Any]]:
+    """
+    Pares (id, update_time) de los documentos de la consulta. select([]) pide
+    solo las llaves: no se descarga ni se deserializa ningún campo.
+    """
+    return [(doc.id, doc.update_time) for doc in query.select([]).stream()]
+
+def versions_etag(versions: Iterable[Tuple[str, Any]], variant: str = "") -> str:
+    """
+    ETag débil de una vista de colección: número de documentos más un hash de
+    cada (id, update_time). Cambia con cualquier alta, baja o modificación.
+    """
+    digest = hashlib.sha1(variant.encode())
+    count = 0
+    for doc_id, update_time in sorted(versions, key=lambda v: v[0]):
+        digest.update(f"{doc_id}@{update_time}\n".encode())
+        count += 1
+    return f'W/"{count}-{digest.hexdigest()[:20]}"'
+
+def request_variant(request: Request) -> str:
+    """Query string y Accept cambian la representación (fields, páginas, NDJSON)."""
+    return f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Respuesta 304 si If-None-Match coincide con el ETag actual."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Comparación débil: W/"x" y "x" son equivalentes
+    normalized = {tag[2:] if tag.startswith("W/") else tag for tag in candidates}
+    current = etag[2:] if etag.startswith("W/") else etag
+    if "*" in normalized or current in normalized:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
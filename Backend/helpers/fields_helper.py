@@ -0,0 +1,26 @@
+from typing import List, Mapping, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """
+    Convierte ?fields=title,status_khanban en una lista de campos válidos del
+    modelo de respuesta. Devuelve None cuando el cliente no pidió un subconjunto.
+    """
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in model.model_fields]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+    return [f for f in dict.fromkeys(requested) if f != "id"]
+
+def sparse_response(items: List[BaseModel], fields: List[str], headers: Optional[Mapping[str, str]] = None) -> JSONResponse:
+    """Respuesta con solo 'id' y los campos pedidos de cada elemento."""
+    include = set(fields) | {"id"}
+    return JSONResponse(
+        jsonable_encoder([item.model_dump(include=include) for item in items]),
+        headers=dict(headers) if headers else None
+    )
@@ -0,0 +1,260 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Annotated, Any, Callable, Dict, Optional, Set
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from firebase import jobs_ref
+
+# Jobs a la vez por proceso; el resto espera en la cola
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+# El progreso se persiste como mucho una vez por intervalo (los estados finales siempre)
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "1"))
+
+JOB_FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+# Parámetro ?async=true de los endpoints pesados ("async" es palabra reservada en Python)
+AsyncQuery = Annotated[bool, Query(alias="async", description="Ejecutar en segundo plano: responde 202 con el id del job")]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Lo que recibe la función de un job: reportar progreso y enterarse de la cancelación."""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self.job_id = job_id
+        self._runner = runner
+        self._last_saved = 0.0
+        self._last_checked = time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Cancelado en este proceso, o en el registro (POST /jobs/{id}/cancel
+        atendido por otro proceso). El registro se lee como mucho una vez por
+        JOB_PROGRESS_INTERVAL_SECONDS.
+        """
+        if self.job_id in self._runner._cancel_requested:
+            return True
+        now = time.monotonic()
+        if now - self._last_checked >= JOB_PROGRESS_INTERVAL_SECONDS:
+            self._last_checked = now
+            job = get_job(self.job_id)
+            if job is None or job.get("cancel_requested") or job["status"] in JOB_FINAL_STATUSES:
+                self._runner._cancel_requested.add(self.job_id)
+                return True
+        return False
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, progress: Dict[str, Any]):
+        """Guarda el progreso (limitado por intervalo) y corta el job si se pidió cancelarlo."""
+        self.check_cancelled()
+        now = time.monotonic()
+        if now - self._last_saved >= JOB_PROGRESS_INTERVAL_SECONDS:
+            self._last_saved = now
+            self._runner._save(self.job_id, {"progress": jsonable_encoder(progress)})
+
+
+class JobRunner:
+    """
+    Cola de jobs en proceso: un event loop propio (en su hilo) con
+    JOB_MAX_WORKERS corrutinas que toman jobs de una asyncio.Queue y corren la
+    función, que es síncrona como el SDK de Firestore, en un pool del mismo
+    tamaño. El registro de cada job vive en la colección jobs, así que
+    GET /jobs/{id} responde desde cualquier proceso; la ejecución es del
+    proceso que lo recibió, que lee cancel_requested del registro para
+    enterarse de las cancelaciones hechas desde otro.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._functions: Dict[str, Callable[[JobContext], Any]] = {}
+        self._running: Set[str] = set()
+        # Solo ids de jobs de este proceso (en cola o en ejecución)
+        self._cancel_requested: Set[str] = set()
+
+    def start(self):
+        """Arranca el loop de jobs; submit lo llama solo si el lifespan no lo hizo."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._thread = threading.Thread(target=self._serve, args=(ready,), name="job-runner", daemon=True)
+            self._thread.start()
+            ready.wait()
+        # Jobs que una ejecución anterior con el mismo worker_id (p. ej. el mismo
+        # contenedor reiniciado) dejó sin terminar: nadie los va a correr
+        self._abandon(self._stored_unfinished(), "Worker restarted before the job finished")
+
+    def _serve(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        workers = [loop.create_task(self._worker()) for _ in range(self.max_workers)]
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            loop.close()
+
+    def shutdown(self):
+        """
+        Detiene el loop (al cerrar la app). Los jobs en cola y los que siguen
+        corriendo se marcan como fallidos en el registro; los que corren se
+        cortan en su siguiente reporte de progreso.
+        """
+        with self._lock:
+            thread, loop, executor = self._thread, self._loop, self._executor
+            self._thread = self._loop = self._queue = self._executor = None
+        if thread is None:
+            return
+        unfinished = set(self._functions) | self._running
+        self._cancel_requested.update(unfinished)
+        self._functions.clear()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        executor.shutdown(wait=False)
+        self._abandon(unfinished, "Worker shut down before the job finished")
+
+    def _stored_unfinished(self) -> Set[str]:
+        # Solo se filtra por status (índice de un campo, sin índice compuesto con
+        # worker); los jobs sin terminar son pocos y el worker se compara aquí
+        query = jobs_ref.where("status", "in", ["queued", "running"]).select(["worker"])
+        return {doc.id for doc in query.stream() if (doc.to_dict() or {}).get("worker") == self.worker_id}
+
+    def _abandon(self, job_ids: Set[str], reason: str):
+        for job_id in job_ids:
+            job = get_job(job_id)
+            if job is not None and job["status"] not in JOB_FINAL_STATUSES:
+                self._save(job_id, {
+                    "status": "failed",
+                    "error": {"status_code": 503, "detail": reason},
+                    "finished_at": _now(),
+                })
+
+    def submit(self, job_type: str, function: Callable[[JobContext], Any], params: Optional[dict] = None) -> dict:
+        """Registra el job como queued y lo encola. `function(job)` corre en segundo plano."""
+        self.start()
+        job_id = uuid.uuid4().hex
+        record = {
+            "type": job_type,
+            "params": jsonable_encoder(params or {}),
+            "status": "queued",
+            "progress": None,
+            "result": None,
+            "error": None,
+            "worker": self.worker_id,
+            "cancel_requested": False,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        jobs_ref.document(job_id).set(record)
+        self._functions[job_id] = function
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+        return {"id": job_id, **record}
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Un job en cola se cancela al momento; uno en ejecución se detiene en su
+        siguiente reporte de progreso. Devuelve el registro, o None si no existe.
+        """
+        job = get_job(job_id)
+        if job is None or job["status"] in JOB_FINAL_STATUSES:
+            return job
+        if job_id in self._functions or job_id in self._running:
+            self._cancel_requested.add(job_id)
+        update = {"cancel_requested": True}
+        if job["status"] == "queued":
+            update.update({"status": "cancelled", "finished_at": _now()})
+        self._save(job_id, update)
+        return {**job, **update}
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        function = self._functions.pop(job_id, None)
+        if function is None:
+            return
+        # El registro se lee y escribe con to_thread: el SDK es bloqueante y no debe
+        # frenar el loop. Otro proceso pudo cancelarlo mientras esperaba en la cola
+        job = await asyncio.to_thread(get_job, job_id)
+        if job_id in self._cancel_requested or job is None or job["status"] != "queued" or job.get("cancel_requested"):
+            self._cancel_requested.discard(job_id)
+            if job is not None and job["status"] not in JOB_FINAL_STATUSES:
+                await asyncio.to_thread(self._save, job_id, {"status": "cancelled", "finished_at": _now()})
+            return
+
+        self._running.add(job_id)
+        await asyncio.to_thread(self._save, job_id, {"status": "running", "started_at": _now()})
+        context = JobContext(self, job_id)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, function, context)
+            update = {"status": "succeeded", "result": jsonable_encoder(result)}
+        except JobCancelled:
+            update = {"status": "cancelled"}
+        except HTTPException as err:
+            update = {"status": "failed", "error": {"status_code": err.status_code, "detail": jsonable_encoder(err.detail)}}
+        except Exception as err:
+            update = {"status": "failed", "error": {"status_code": 500, "detail": f"{type(err).__name__}: {err}"}}
+        finally:
+            self._running.discard(job_id)
+            self._cancel_requested.discard(job_id)
+        # No pisar un estado final puesto desde fuera (p. ej. shutdown)
+        job = await asyncio.to_thread(get_job, job_id)
+        if job is not None and job["status"] not in JOB_FINAL_STATUSES:
+            update["finished_at"] = _now()
+            await asyncio.to_thread(self._save, job_id, update)
+
+    def _save(self, job_id: str, fields: dict):
+        # update reemplaza progress/result completos (set con merge mezclaría los mapas)
+        jobs_ref.document(job_id).update(fields)
+
+
+job_runner = JobRunner()
+
+def get_job(job_id: str) -> Optional[dict]:
+    doc = jobs_ref.document(job_id).get()
+    return {"id": doc.id, **doc.to_dict()} if doc.exists else None
+
+def job_accepted(job: dict) -> JSONResponse:
+    """Respuesta de ?async=true: 202 con el id del job y dónde consultarlo."""
+    location = f"/jobs/{job['id']}"
+    return JSONResponse(
+        {"job_id": job["id"], "type": job["type"], "status": job["status"], "status_url": location},
+        status_code=202,
+        headers={"Location": location}
+    )
@@ -0,0 +1,44 @@
+from typing import Dict, Iterable, Optional
+from firebase import db
+
+# Cantidad de referencias por llamada a db.get_all
+GET_ALL_CHUNK_SIZE = 100
+
+class DocumentLoader:
+    """
+    Cargador de documentos por ID con alcance de una petición: junta los IDs
+    referenciados, los trae con db.get_all() en bloques y no repite lecturas.
+    Los documentos inexistentes quedan como None.
+    """
+
+    def __init__(self, collection_ref, chunk_size: int = GET_ALL_CHUNK_SIZE):
+        self._collection_ref = collection_ref
+        self._chunk_size = chunk_size
+        self._cache: Dict[str, Optional[dict]] = {}
+
+    def load_many(self, ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+        wanted = list(dict.fromkeys(doc_id for doc_id in ids if doc_id))
+        missing = [doc_id for doc_id in wanted if doc_id not in self._cache]
+
+        for start in range(0, len(missing), self._chunk_size):
+            chunk = missing[start:start + self._chunk_size]
+            refs = [self._collection_ref.document(doc_id) for doc_id in chunk]
+            for snap in db.get_all(refs):
+                self._cache[snap.id] = snap.to_dict() if snap.exists else None
+            # get_all no devuelve nada para referencias inválidas, se marcan como faltantes
+            for doc_id in chunk:
+                self._cache.setdefault(doc_id, None)
+
+        return {doc_id: self._cache[doc_id] for doc_id in wanted}
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        return self.load_many([doc_id]).get(doc_id)
+
+
+def ref_id(value) -> Optional[str]:
+    """ID de un DocumentReference guardado en Firestore (o del string si ya es un ID)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.rsplit("/", 1)[-1]
+    return getattr(value, "id", None)
@@ -0,0 +1,46 @@
+from typing import Iterable, Iterator, Mapping, Optional, Set, Union
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from .serialization_helper import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Documentos por fragmento: cada next() del generador se ejecuta en el threadpool
+NDJSON_CHUNK_DOCS = 100
+
+def wants_ndjson(request: Request) -> bool:
+    """El cliente pidió Accept: application/x-ndjson."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _ndjson_line(item: Union[BaseModel, dict], include: Optional[Set[str]]) -> bytes:
+    if isinstance(item, BaseModel):
+        return item.model_dump_json(include=include).encode()
+    if include is not None:
+        item = {key: value for key, value in item.items() if key in include}
+    return dumps(item)
+
+def _ndjson_lines(items: Iterable[Union[BaseModel, dict]], include: Optional[Set[str]]) -> Iterator[bytes]:
+    lines = []
+    for item in items:
+        lines.append(_ndjson_line(item, include))
+        if len(lines) >= NDJSON_CHUNK_DOCS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+def ndjson_response(
+    items: Iterable[Union[BaseModel, dict]],
+    fields: Optional[Iterable[str]] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> StreamingResponse:
+    """
+    Envía un documento por línea a medida que se generan. `items` debe ser un
+    generador sobre query.stream() para no tener la lista completa en memoria.
+    """
+    include = set(fields) | {"id"} if fields is not None else None
+    return StreamingResponse(
+        _ndjson_lines(items, include),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=dict(headers) if headers else None
+    )
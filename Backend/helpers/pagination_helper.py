@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+import os
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Query, Response
+
+# Tamaño máximo de página que acepta ?limit=
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Equivale a FieldPath.document_id(): ordenar por id del documento
+DOCUMENT_ID = "__name__"
+
+def encode_cursor(doc_id: str) -> str:
+    raw = json.dumps({"after": doc_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        doc_id = json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(doc_id, str) or not doc_id:
+        raise HTTPException(400, "Invalid cursor")
+    return doc_id
+
+
+class PageParams:
+    """
+    Parámetros ?cursor= y ?limit= de los listados. Si no se envía ninguno el
+    listado devuelve la colección completa como antes.
+
+    Las páginas se ordenan por id de documento: el id no cambia con las
+    escrituras, así que un cursor nunca repite ni salta documentos existentes.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor"),
+        limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT, description="Tamaño de página"),
+    ):
+        self.enabled = cursor is not None or limit is not None
+        self.after_id = decode_cursor(cursor) if cursor else None
+        self.limit = limit or PAGE_MAX_LIMIT
+
+    def fetch(self, query, response: Response) -> list:
+        """Ejecuta una página de la consulta de Firestore (order_by id + start_after)."""
+        query = query.order_by(DOCUMENT_ID)
+        if self.after_id is not None:
+            query = query.start_after({DOCUMENT_ID: self.after_id})
+        # Se pide un documento de más para saber si hay otra página
+        docs = list(query.limit(self.limit + 1).stream())
+        return self._finish(docs, [doc.id for doc in docs], response)
+
+    def slice(self, docs: List[Tuple[str, dict]], response: Response) -> List[Tuple[str, dict]]:
+        """Misma página sobre pares (id, datos) que ya están en memoria."""
+        ordered = sorted(docs, key=lambda item: item[0])
+        ids = [doc_id for doc_id, _ in ordered]
+        start = bisect_right(ids, self.after_id) if self.after_id is not None else 0
+        page = ordered[start:start + self.limit + 1]
+        return self._finish(page, ids[start:start + self.limit + 1], response)
+
+    def _finish(self, page: list, ids: List[str], response: Response) -> list:
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ids[self.limit - 1])
+        return page
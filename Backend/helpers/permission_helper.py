@@ -0,0 +1,65 @@
+import os
+from typing import Optional
+from firebase import project_users_ref, projects_ref, user_roles_ref, users_ref
+from models.user_roles import DEFAULT_ROLES
+from .cache_helper import TTLCache
+
+# (user_id, project_id) -> {"role", "bitmask"}; None si el usuario no es miembro.
+# TTL corto: los cambios de rol de este proceso invalidan al momento y los de
+# otros procesos se ven a más tardar al expirar.
+PERMISSION_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "60"))
+# Las rutas protegidas exigen token y permiso solo con este flag: sin él siguen
+# abiertas como antes, porque los clientes actuales no envían Authorization
+ENFORCE_PROJECT_PERMISSIONS = os.getenv("ENFORCE_PROJECT_PERMISSIONS", "false").lower() in ("1", "true", "yes")
+permission_cache = TTLCache(4096, PERMISSION_CACHE_TTL_SECONDS)
+
+def role_bitmask(role: Optional[str], user_id: Optional[str] = None) -> int:
+    """
+    Bitmask de un rol por idRole o nombre: primero los roles por defecto, luego
+    la definición del documento user_roles del propio usuario. No se usa el
+    índice global role_index: ahí gana la última escritura si dos documentos
+    definen el mismo nombre con distinto bitmask. Un rol sin definición no da
+    permisos.
+    """
+    if not role:
+        return 0
+    for default in DEFAULT_ROLES:
+        if role.lower() in (default["idRole"].lower(), default["name"].lower()):
+            return default["bitmask"]
+    if not user_id:
+        return 0
+    for doc in user_roles_ref.where("userRef", "==", user_id).select(["roles"]).limit(1).stream():
+        for definition in (doc.to_dict() or {}).get("roles") or []:
+            if role in (definition.get("idRole"), definition.get("name")):
+                return definition.get("bitmask", 0)
+    return 0
+
+def _load_membership(user_id: str, project_id: str) -> Optional[dict]:
+    docs = list(
+        project_users_ref
+        .where("userRef", "==", users_ref.document(user_id))
+        .where("projectRef", "==", projects_ref.document(project_id))
+        .limit(1)
+        .stream()
+    )
+    if not docs:
+        return None
+    role = (docs[0].to_dict() or {}).get("role")
+    return {"role": role, "bitmask": role_bitmask(role, user_id)}
+
+def get_project_membership(user_id: str, project_id: str) -> Optional[dict]:
+    """Rol y bitmask efectivos del usuario en el proyecto, o None si no es miembro."""
+    return permission_cache.get_or_load(
+        (user_id, project_id),
+        lambda: _load_membership(user_id, project_id)
+    )
+
+def has_permission(bitmask: int, bit: int) -> bool:
+    return bool(bitmask & (1 << bit))
+
+def invalidate_permissions(user_id: Optional[str] = None, project_id: Optional[str] = None):
+    """Con ambos ids invalida una entrada; sin ellos (p. ej. al cambiar definiciones de roles) todo."""
+    if user_id and project_id:
+        permission_cache.invalidate((user_id, project_id))
+    else:
+        permission_cache.clear()
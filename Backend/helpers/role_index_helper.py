@@ -0,0 +1,78 @@
+import os
+from typing import Iterable, Optional
+from urllib.parse import quote
+from firebase_admin import firestore
+from firebase import db, role_index_ref, user_roles_ref
+from .cache_helper import TTLCache
+
+# Índice idRole/nombre -> bitmask en la colección role_index, más una caché en
+# proceso. Cada documento del índice recuerda qué documentos de user_roles
+# definen ese rol, para poder retirarlo cuando ya nadie lo tiene.
+ROLE_INDEX_TTL_SECONDS = float(os.getenv("ROLE_INDEX_TTL_SECONDS", "300"))
+role_bitmask_cache = TTLCache(2048, ROLE_INDEX_TTL_SECONDS)
+
+_META_DOC = "_meta"
+
+def _index_doc_id(key: str) -> str:
+    # Los nombres de rol pueden traer "/" u otros caracteres no válidos en un id
+    return "role:" + quote(key, safe="")
+
+def _role_keys(role: dict) -> set:
+    return {key for key in (role.get("idRole"), role.get("name")) if key}
+
+def index_roles(document_id: str, roles: Iterable[dict], previous: Iterable[dict] = ()):
+    """
+    Registra los roles de un documento de user_roles en el índice y retira los
+    que el documento tenía antes y ya no define.
+    """
+    bitmasks = {}
+    batch = db.batch()
+    for role in roles:
+        bitmask = role.get("bitmask", 0)
+        for key in _role_keys(role):
+            bitmasks[key] = bitmask
+            batch.set(role_index_ref.document(_index_doc_id(key)), {
+                "key": key,
+                "bitmask": bitmask,
+                "sources": firestore.ArrayUnion([document_id]),
+                "updatedAt": firestore.SERVER_TIMESTAMP,
+            }, merge=True)
+
+    removed_keys = {key for role in previous for key in _role_keys(role)} - set(bitmasks)
+    for key in removed_keys:
+        batch.set(role_index_ref.document(_index_doc_id(key)), {
+            "sources": firestore.ArrayRemove([document_id]),
+        }, merge=True)
+    batch.commit()
+
+    # La invalidación descarta cargas en curso que leyeron el índice anterior
+    for key in removed_keys:
+        role_bitmask_cache.invalidate(key)
+    for key, bitmask in bitmasks.items():
+        role_bitmask_cache.invalidate(key)
+        role_bitmask_cache.set(key, bitmask)
+
+def rebuild_role_index() -> int:
+    """Indexa todos los documentos de user_roles (una sola pasada). Devuelve cuántos leyó."""
+    count = 0
+    for doc in user_roles_ref.select(["roles"]).stream():
+        index_roles(doc.id, (doc.to_dict() or {}).get("roles") or [])
+        count += 1
+    role_index_ref.document(_META_DOC).set({"built": True, "updatedAt": firestore.SERVER_TIMESTAMP})
+    return count
+
+def _load_role_bitmask(key: str) -> Optional[int]:
+    doc = role_index_ref.document(_index_doc_id(key)).get()
+    if not doc.exists and not role_index_ref.document(_META_DOC).get().exists:
+        # Primer uso sobre datos previos al índice: se construye una vez
+        rebuild_role_index()
+        doc = role_index_ref.document(_index_doc_id(key)).get()
+
+    data = doc.to_dict() or {}
+    if not data.get("sources"):
+        return None
+    return data.get("bitmask", 0)
+
+def lookup_role_bitmask(key: str) -> Optional[int]:
+    """Bitmask del rol por idRole o nombre, o None si ningún usuario lo define."""
+    return role_bitmask_cache.get_or_load(key, lambda: _load_role_bitmask(key))
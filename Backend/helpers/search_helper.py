@@ -0,0 +1,203 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from firebase import bugs_ref, epics_ref, req_ref, tasks_ref, userstories_ref
+from .cache_helper import TTLCache
+from .user_search_helper import normalize
+
+# Índices BM25 por proyecto en memoria. Las rutas de escritura de este proceso
+# los actualizan al momento; el TTL acota cuánto tardan en verse las escrituras
+# hechas por otros procesos.
+SEARCH_INDEX_TTL_SECONDS = float(os.getenv("SEARCH_INDEX_TTL_SECONDS", "600"))
+SEARCH_INDEX_MAX_PROJECTS = int(os.getenv("SEARCH_INDEX_MAX_PROJECTS", "64"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# entidad -> (colección, campo con el id del proyecto, campo de estado para la faceta)
+SEARCH_ENTITIES = {
+    "task": (tasks_ref, "project_id", "status_khanban"),
+    "bug": (bugs_ref, "projectId", "status_khanban"),
+    "userstory": (userstories_ref, "projectRef", "status_khanban"),
+    "epic": (epics_ref, "projectRef", None),
+    "requirement": (req_ref, "projectRef", None),
+}
+# Peso de cada campo: un término en idTitle o en el título cuenta más que en la descripción
+FIELD_WEIGHTS = {"idTitle": 3, "title": 2, "tags": 2, "description": 1, "comments": 1}
+_STORED_FIELDS = [*FIELD_WEIGHTS, "status", "status_khanban"]
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+_STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los para por que se un una y "
+    "an and are as at be by for from in is it of on or the to with".split()
+)
+
+Key = Tuple[str, str]
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [
+        token for token in _TOKEN.findall(normalize(text))
+        if token not in _STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+def _field_text(value) -> str:
+    """Comentarios como su texto; listas (tags) unidas; el resto como string."""
+    if isinstance(value, list):
+        return " ".join(
+            item.get("text") or "" if isinstance(item, dict) else str(item)
+            for item in value
+        )
+    return value if isinstance(value, str) else ""
+
+
+class ProjectSearchIndex:
+    """Índice invertido de un proyecto: término -> {(entidad, id): frecuencia ponderada}."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: Dict[Key, dict] = {}
+        self._postings: Dict[str, Dict[Key, int]] = {}
+        self._total_length = 0
+
+    def upsert(self, entity: str, doc_id: str, data: dict, merge: bool = False):
+        """Indexa un documento; con merge, `data` es parcial y se combina con lo ya indexado."""
+        key = (entity, doc_id)
+        with self._lock:
+            stored = dict(self._docs[key]["fields"]) if merge and key in self._docs else {}
+            stored.update({field: data[field] for field in _STORED_FIELDS if field in data})
+            self._remove(key)
+            # Lo archivado por los endpoints batch no aparece en la búsqueda
+            if stored.get("status") == "archived":
+                return
+
+            frequencies = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(_field_text(stored.get(field))):
+                    frequencies[token] += weight
+            status_field = SEARCH_ENTITIES[entity][2]
+
+            self._docs[key] = {
+                "fields": stored,
+                "status": stored.get(status_field) if status_field else None,
+                "length": sum(frequencies.values()),
+                "terms": list(frequencies),
+            }
+            self._total_length += self._docs[key]["length"]
+            for token, frequency in frequencies.items():
+                self._postings.setdefault(token, {})[key] = frequency
+
+    def remove(self, entity: str, doc_id: str):
+        with self._lock:
+            self._remove((entity, doc_id))
+
+    def _remove(self, key: Key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for token in doc["terms"]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        types: Optional[Iterable[str]] = None,
+        statuses: Optional[Iterable[str]] = None
+    ) -> dict:
+        """
+        Resultados BM25 para los términos de la búsqueda (OR entre términos).
+        Las facetas cuentan todos los documentos que coinciden, antes de filtrar
+        por tipo o estado, para que el cliente pueda mostrar cuántos hay de cada uno.
+        """
+        tokens = set(tokenize(query))
+        types = set(types) if types else None
+        statuses = set(statuses) if statuses else None
+
+        with self._lock:
+            count = len(self._docs)
+            if not tokens or not count:
+                return {"total": 0, "results": [], "facets": {"type": {}, "status": {}}}
+            average_length = self._total_length / count or 1
+
+            scores: Dict[Key, float] = Counter()
+            for token in tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    length = self._docs[key]["length"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[key] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            type_facet, status_facet = Counter(), Counter()
+            matches = []
+            for key, score in scores.items():
+                doc = self._docs[key]
+                type_facet[key[0]] += 1
+                if doc["status"]:
+                    status_facet[doc["status"]] += 1
+                if types is not None and key[0] not in types:
+                    continue
+                if statuses is not None and doc["status"] not in statuses:
+                    continue
+                matches.append((score, key))
+
+            matches.sort(key=lambda match: (-match[0], match[1]))
+            results = [
+                {
+                    "type": entity,
+                    "id": doc_id,
+                    "idTitle": self._docs[(entity, doc_id)]["fields"].get("idTitle"),
+                    "title": self._docs[(entity, doc_id)]["fields"].get("title"),
+                    "status": self._docs[(entity, doc_id)]["status"],
+                    "score": round(score, 4),
+                }
+                for score, (entity, doc_id) in matches[:limit]
+            ]
+            return {
+                "total": len(matches),
+                "results": results,
+                "facets": {"type": dict(type_facet), "status": dict(status_facet)},
+            }
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+project_search_indexes = TTLCache(SEARCH_INDEX_MAX_PROJECTS, SEARCH_INDEX_TTL_SECONDS)
+
+def _build_project_index(project_id: str) -> ProjectSearchIndex:
+    index = ProjectSearchIndex()
+    for entity, (collection, project_field, _) in SEARCH_ENTITIES.items():
+        query = collection.where(project_field, "==", project_id).select(_STORED_FIELDS)
+        for doc in query.stream():
+            index.upsert(entity, doc.id, doc.to_dict() or {})
+    return index
+
+def get_project_search_index(project_id: str) -> ProjectSearchIndex:
+    """Se construye en la primera búsqueda del proyecto: una consulta proyectada por entidad."""
+    return project_search_indexes.get_or_load(project_id, lambda: _build_project_index(project_id))
+
+def index_search_document(project_id: Optional[str], entity: str, doc_id: str, data: Optional[dict], merge: bool = False):
+    """
+    Refleja una escritura en el índice del proyecto si está cargado; `data=None`
+    es un borrado. Si no está cargado se descarta cualquier construcción en
+    curso, que podría haber leído el documento antes de la escritura.
+    """
+    if not project_id or not doc_id:
+        return
+    index = project_search_indexes.get(project_id)
+    if index is None:
+        project_search_indexes.invalidate(project_id)
+    elif data is None:
+        index.remove(entity, doc_id)
+    else:
+        index.upsert(entity, doc_id, data, merge=merge)
@@ -0,0 +1,69 @@
+import json
+import os
+from typing import Any, Iterable, List, Mapping, Optional, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la librería estándar
+    orjson = None
+
+# Lecturas de confianza: los datos de Firestore los escribió la propia API, así que
+# los listados arman dicts directamente en lugar de validar cada modelo dos veces
+# (al construirlo y otra vez contra response_model). TRUSTED_READS=false vuelve
+# al camino validado.
+TRUSTED_READS = os.getenv("TRUSTED_READS", "true").lower() in ("1", "true", "yes")
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def trusted_dict(model: Type[BaseModel], data: Mapping[str, Any], **overrides) -> dict:
+    """
+    Dict con la forma de `model` a partir de datos ya válidos: toma cada campo del
+    modelo o su valor por defecto, sin ejecutar validadores.
+    """
+    result = {}
+    for name, field in model.model_fields.items():
+        if name in overrides:
+            result[name] = overrides[name]
+        elif name in data:
+            result[name] = data[name]
+        else:
+            result[name] = field.get_default(call_default_factory=True)
+    return result
+
+def select_keys(items: Iterable[dict], fields: Optional[Iterable[str]]) -> Iterable[dict]:
+    """Deja solo 'id' y los campos pedidos (sparse fieldsets) de cada dict."""
+    if fields is None:
+        return items
+    keys = ["id", *fields]
+    return ({key: item[key] for key in keys if key in item} for item in items)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson cuando está instalado."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json_response(
+    items: Iterable[dict],
+    fields: Optional[List[str]] = None,
+    headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    return FastJSONResponse(
+        list(select_keys(items, fields)),
+        headers=dict(headers) if headers else None
+    )
@@ -0,0 +1,162 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from firebase_admin import firestore
+from firebase import db, sprints_ref, bugs_ref, sprint_stats_ref
+from .task_cache_helper import get_sprint_task_docs
+
+# Un cambio es (antes, después); None en un lado significa alta o baja
+Change = Tuple[Optional[dict], Optional[dict]]
+
+def parse_firestore_date(date_value):
+    if isinstance(date_value, str):
+        try:
+            date_value = date_value.replace("Z", "+00:00")
+            dt = datetime.fromisoformat(date_value)
+        except Exception:
+            return None
+    elif isinstance(date_value, datetime):
+        dt = date_value
+    elif hasattr(date_value, "timestamp"):
+        dt = datetime.fromtimestamp(date_value.timestamp())
+    elif hasattr(date_value, "seconds") and hasattr(date_value, "nanos"):
+        dt = datetime.fromtimestamp(date_value.seconds + date_value.nanos / 1e9)
+    else:
+        return None
+
+    # Asegurar que el datetime tenga zona horaria UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+
+    return dt
+
+def task_contribution(task: dict, sprint_start: Optional[datetime]) -> Counter:
+    """Lo que una tarea suma a las estadísticas de su sprint."""
+    points = task.get("story_points") or 0
+    created_at = parse_firestore_date(task.get("created_at"))
+    return Counter({
+        "task_count": 1,
+        "total_story_points": points,
+        "completed_story_points": points if task.get("status_khanban") == "Done" else 0,
+        # Cambio de scope: la tarea se creó después de iniciado el sprint
+        "scope_changes": 1 if created_at and sprint_start and created_at > sprint_start else 0,
+    })
+
+def bug_contribution(bug: dict) -> Counter:
+    severity = bug.get("severity") or "Unspecified"
+    return Counter({"bugs_total": 1, f"bugs_by_severity.{severity}": 1})
+
+def _sprint_starts(sprint_ids: Iterable[str]) -> Dict[str, Optional[datetime]]:
+    """Fecha de inicio de cada sprint existente (una sola lectura get_all)."""
+    refs = [sprints_ref.document(sprint_id) for sprint_id in sprint_ids]
+    if not refs:
+        return {}
+    return {
+        doc.id: parse_firestore_date((doc.to_dict() or {}).get("start_date"))
+        for doc in db.get_all(refs, field_paths=["start_date", "project_id"])
+        if doc.exists
+    }
+
+def _apply_deltas(deltas: Dict[str, Counter], project_ids: Dict[str, str]):
+    batch = db.batch()
+    writes = 0
+    for sprint_id, delta in deltas.items():
+        fields: Dict[str, dict] = {}
+        for key, value in delta.items():
+            if not value:
+                continue
+            # "bugs_by_severity.Major" -> {"bugs_by_severity": {"Major": Increment}}
+            target = fields
+            *parents, leaf = key.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = firestore.Increment(value)
+        if not fields:
+            continue
+        batch.set(sprint_stats_ref.document(sprint_id), {
+            "sprint_id": sprint_id,
+            "project_id": project_ids.get(sprint_id),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+            **fields,
+        }, merge=True)
+        writes += 1
+        if writes % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    if writes % 500:
+        batch.commit()
+
+def apply_task_changes(project_id: str, changes: List[Change]) -> List[str]:
+    """
+    Suma o resta incrementalmente la contribución de cada tarea a sprint_stats.
+    Devuelve los sprints afectados.
+    """
+    sprint_ids = {
+        task.get("sprint_id")
+        for change in changes for task in change
+        if task and task.get("sprint_id")
+    }
+    starts = _sprint_starts(sprint_ids)
+
+    deltas: Dict[str, Counter] = defaultdict(Counter)
+    for old, new in changes:
+        for task, sign in ((old, -1), (new, 1)):
+            sprint_id = task.get("sprint_id") if task else None
+            if sprint_id not in starts:
+                continue
+            for key, value in task_contribution(task, starts[sprint_id]).items():
+                deltas[sprint_id][key] += sign * value
+
+    _apply_deltas(deltas, {sprint_id: project_id for sprint_id in deltas})
+    return [sprint_id for sprint_id, delta in deltas.items() if any(delta.values())]
+
+def apply_bug_changes(changes: List[Change]):
+    deltas: Dict[str, Counter] = defaultdict(Counter)
+    project_ids: Dict[str, str] = {}
+    for old, new in changes:
+        for bug, sign in ((old, -1), (new, 1)):
+            sprint_id = bug.get("sprintId") if bug else None
+            if not sprint_id:
+                continue
+            project_ids[sprint_id] = bug.get("projectId")
+            for key, value in bug_contribution(bug).items():
+                deltas[sprint_id][key] += sign * value
+
+    _apply_deltas(deltas, project_ids)
+
+def rebuild_sprint_stats(project_id: str, sprint_id: str, sprint_start: Optional[datetime]) -> dict:
+    """Recalcula desde cero las estadísticas de un sprint y las guarda completas."""
+    totals = Counter()
+    for _, task in get_sprint_task_docs(project_id, sprint_id):
+        totals.update(task_contribution(task, sprint_start))
+
+    severities = Counter()
+    for bug in bugs_ref.where("sprintId", "==", sprint_id).select(["severity"]).stream():
+        severities[(bug.to_dict() or {}).get("severity") or "Unspecified"] += 1
+
+    stats = {
+        "sprint_id": sprint_id,
+        "project_id": project_id,
+        "task_count": totals["task_count"],
+        "total_story_points": totals["total_story_points"],
+        "completed_story_points": totals["completed_story_points"],
+        "scope_changes": totals["scope_changes"],
+        "bugs_total": sum(severities.values()),
+        "bugs_by_severity": dict(severities),
+        # Solo un documento reconstruido es completo; los incrementos sobre uno
+        # inexistente crean un parcial que se reconstruye en la siguiente lectura
+        "initialized": True,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+    sprint_stats_ref.document(sprint_id).set(stats)
+    return stats
+
+def get_project_sprint_stats(project_id: str) -> Dict[str, dict]:
+    """Estadísticas de todos los sprints del proyecto en una sola consulta."""
+    return {
+        doc.id: doc.to_dict() or {}
+        for doc in sprint_stats_ref.where("project_id", "==", project_id).stream()
+    }
+
+def delete_sprint_stats(sprint_id: str):
+    sprint_stats_ref.document(sprint_id).delete()
@@ -0,0 +1,157 @@
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+from firebase_admin import firestore
+from firebase import db, tasks_ref, user_story_points_ref
+from .sprint_stats_helper import Change
+
+# Libro de story points completados por usuario: un documento por usuario con
+# el total global y el desglose por proyecto, mantenido por incrementos desde
+# el despachador de escrituras de tareas.
+
+_META_DOC = "_meta"
+_ledger_built = False
+_ledger_lock = threading.Lock()
+
+def task_assignee_ids(task: dict) -> List[str]:
+    """Ids de los asignados en cualquiera de los formatos guardados de assignee."""
+    assignee = task.get("assignee")
+    if isinstance(assignee, str):
+        return [assignee] if assignee else []
+    ids = []
+    for user in assignee or []:
+        if isinstance(user, dict):
+            user_id = user.get("id")
+        elif isinstance(user, (list, tuple)) and user:
+            user_id = user[0]
+        else:
+            user_id = None
+        if user_id and user_id not in ids:
+            ids.append(user_id)
+    return ids
+
+def story_points_contribution(task: Optional[dict]) -> Counter:
+    """Lo que una tarea suma a cada asignado: sus puntos si está en Done."""
+    if not task or task.get("status_khanban") != "Done":
+        return Counter()
+    points = task.get("story_points") or 0
+    return Counter({user_id: points for user_id in task_assignee_ids(task)})
+
+def apply_story_point_changes(project_id: str, changes: List[Change]):
+    deltas = Counter()
+    for old, new in changes:
+        deltas.update(story_points_contribution(new))
+        deltas.subtract(story_points_contribution(old))
+
+    batch = db.batch()
+    writes = 0
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        batch.set(user_story_points_ref.document(user_id), {
+            "user_id": user_id,
+            "story_points": firestore.Increment(delta),
+            "projects": {project_id: firestore.Increment(delta)},
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+        writes += 1
+        if writes % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    if writes % 500:
+        batch.commit()
+
+def ensure_story_points_ledger():
+    """
+    Primer uso sobre datos previos al libro: se reconstruye una vez desde las
+    tareas en Done y queda la marca _meta. Después solo se lee la marca una
+    vez por proceso.
+    """
+    global _ledger_built
+    if _ledger_built:
+        return
+    with _ledger_lock:
+        if not _ledger_built and not user_story_points_ref.document(_META_DOC).get().exists:
+            backfill_story_points()
+        _ledger_built = True
+
+def get_user_story_points(user_id: str) -> dict:
+    """Lectura del libro: un solo get de documento."""
+    ensure_story_points_ledger()
+    data = user_story_points_ref.document(user_id).get().to_dict() or {}
+    return {
+        "story_points": data.get("story_points", 0),
+        "projects": {pid: points for pid, points in (data.get("projects") or {}).items() if points},
+    }
+
+def compute_story_points(tasks: Iterable[dict]) -> Dict[str, dict]:
+    """Totales recalculados desde las tareas: user_id -> {story_points, projects}."""
+    totals: Dict[str, dict] = defaultdict(lambda: {"story_points": 0, "projects": Counter()})
+    for task in tasks:
+        for user_id, points in story_points_contribution(task).items():
+            totals[user_id]["story_points"] += points
+            totals[user_id]["projects"][task.get("project_id")] += points
+    return totals
+
+def _done_tasks() -> Iterable[dict]:
+    query = tasks_ref.where("status_khanban", "==", "Done").select(
+        ["project_id", "status_khanban", "story_points", "assignee"]
+    )
+    return (doc.to_dict() or {} for doc in query.stream())
+
+def backfill_story_points() -> int:
+    """
+    Reescribe el libro completo desde las tareas en Done. Los usuarios que ya no
+    tienen puntos quedan en cero. Devuelve la cantidad de documentos escritos.
+    """
+    totals = compute_story_points(_done_tasks())
+    user_ids = set(totals) | {doc.id for doc in user_story_points_ref.select([]).stream() if doc.id != _META_DOC}
+
+    batch = db.batch()
+    writes = 0
+    for user_id in user_ids:
+        entry = totals.get(user_id) or {"story_points": 0, "projects": {}}
+        batch.set(user_story_points_ref.document(user_id), {
+            "user_id": user_id,
+            "story_points": entry["story_points"],
+            "projects": {pid: points for pid, points in entry["projects"].items() if points},
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        })
+        writes += 1
+        if writes % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    if writes % 500:
+        batch.commit()
+    user_story_points_ref.document(_META_DOC).set({"built": True, "updated_at": firestore.SERVER_TIMESTAMP})
+    return writes
+
+def story_points_drift(user_id: str, repair: bool = False) -> dict:
+    """Compara el libro de un usuario con el recálculo desde las tareas en Done."""
+    ledger = get_user_story_points(user_id)
+    actual = compute_story_points(_done_tasks()).get(user_id) or {"story_points": 0, "projects": {}}
+    actual_projects = {pid: points for pid, points in actual["projects"].items() if points}
+
+    drift = {
+        pid: ledger["projects"].get(pid, 0) - actual_projects.get(pid, 0)
+        for pid in set(ledger["projects"]) | set(actual_projects)
+    }
+    drift = {pid: diff for pid, diff in drift.items() if diff}
+    in_sync = not drift and ledger["story_points"] == actual["story_points"]
+
+    if repair and not in_sync:
+        user_story_points_ref.document(user_id).set({
+            "user_id": user_id,
+            "story_points": actual["story_points"],
+            "projects": actual_projects,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        })
+
+    return {
+        "user_id": user_id,
+        "ledger": ledger,
+        "actual": {"story_points": actual["story_points"], "projects": actual_projects},
+        "drift": drift,
+        "in_sync": in_sync,
+        "repaired": repair and not in_sync,
+    }
@@ -0,0 +1,72 @@
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from firebase import tasks_ref
+from .cache_helper import TTLCache
+from .etag_helper import versions_etag
+from .task_view_helper import TASKS_LIVE_VIEW, task_views
+
+TASKS_CACHE_TTL_SECONDS = float(os.getenv("TASKS_CACHE_TTL_SECONDS", "30"))
+TASKS_CACHE_MAX_PROJECTS = int(os.getenv("TASKS_CACHE_MAX_PROJECTS", "256"))
+
+
+class TaskSnapshot(NamedTuple):
+    """Tareas de un proyecto y sus (id, update_time), leídas juntas."""
+    docs: List[Tuple[str, Dict]]
+    versions: List[Tuple[str, Any]]
+
+
+# project_id -> TaskSnapshot tal como vino de Firestore
+project_tasks_cache = TTLCache(TASKS_CACHE_MAX_PROJECTS, TASKS_CACHE_TTL_SECONDS)
+
+def _load_snapshot(project_id: str) -> TaskSnapshot:
+    docs = list(tasks_ref.where("project_id", "==", project_id).stream())
+    return TaskSnapshot(
+        [(doc.id, doc.to_dict() or {}) for doc in docs],
+        [(doc.id, doc.update_time) for doc in docs]
+    )
+
+def peek_project_tasks_snapshot(project_id: str) -> Optional[TaskSnapshot]:
+    """Tareas ya materializadas en memoria (vista en vivo o caché), sin leer Firestore."""
+    if TASKS_LIVE_VIEW:
+        view = task_views.get(project_id)
+        if view is not None:
+            return TaskSnapshot(*view.snapshot())
+    return project_tasks_cache.get(project_id)
+
+def get_project_tasks_snapshot(project_id: str) -> TaskSnapshot:
+    """
+    Tareas del proyecto desde la vista en vivo o la caché (Firestore solo en un
+    fallo). Los listados sacan el cuerpo y el ETag del mismo snapshot, así un
+    ETag nunca valida datos distintos de los que se enviaron.
+    """
+    snapshot = peek_project_tasks_snapshot(project_id)
+    if snapshot is not None:
+        return snapshot
+    return project_tasks_cache.get_or_load(project_id, lambda: _load_snapshot(project_id))
+
+def get_project_task_docs(project_id: str) -> List[Tuple[str, Dict]]:
+    """
+    Devuelve las tareas de un proyecto como pares (id, datos). Con TASKS_LIVE_VIEW
+    se sirven de la vista materializada por on_snapshot; si no, de la caché y solo
+    se lee Firestore en un fallo. Los datos son compartidos: no modificarlos.
+    """
+    return get_project_tasks_snapshot(project_id).docs
+
+def project_tasks_etag(snapshot: TaskSnapshot, variant: str = "") -> str:
+    """ETag de un snapshot de tareas: se calcula en memoria, sin otra consulta."""
+    return versions_etag(snapshot.versions, variant)
+
+def get_sprint_task_docs(project_id: str, sprint_id: str) -> List[Tuple[str, Dict]]:
+    return [
+        (task_id, data)
+        for task_id, data in get_project_task_docs(project_id)
+        if data.get("sprint_id") == sprint_id
+    ]
+
+def invalidate_project_tasks(project_id: str):
+    """
+    Se llama después de cualquier escritura sobre las tareas del proyecto. La vista
+    en vivo no lo necesita: se actualiza sola con los eventos de on_snapshot.
+    """
+    if project_id:
+        project_tasks_cache.invalidate(project_id)
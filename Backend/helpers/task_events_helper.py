@@ -0,0 +1,35 @@
+from typing import List, Optional, Tuple
+from .task_cache_helper import invalidate_project_tasks
+from .sprint_stats_helper import apply_bug_changes, apply_task_changes
+from .burndown_helper import record_burndown_snapshots
+from .velocity_helper import invalidate_velocity
+from .story_points_helper import apply_story_point_changes
+from .search_helper import index_search_document
+
+# Punto único que las rutas llaman después de escribir tareas o bugs. Cada
+# materialización derivada (caché, sprint_stats, búsqueda, ...) se mantiene desde aquí.
+
+# (id del documento, antes, después); None en antes/después es creación/borrado
+DocChange = Tuple[str, Optional[dict], Optional[dict]]
+
+def record_task_changes(project_id: str, changes: List[DocChange]):
+    pairs = [(old, new) for _, old, new in changes]
+    invalidate_project_tasks(project_id)
+    sprint_ids = apply_task_changes(project_id, pairs)
+    apply_story_point_changes(project_id, pairs)
+    for task_id, _, new in changes:
+        index_search_document(project_id, "task", task_id, new)
+    if sprint_ids:
+        record_burndown_snapshots(project_id, sprint_ids)
+        invalidate_velocity(project_id)
+
+def record_task_change(project_id: str, task_id: str, old: Optional[dict], new: Optional[dict]):
+    record_task_changes(project_id, [(task_id, old, new)])
+
+def record_bug_changes(changes: List[DocChange]):
+    apply_bug_changes([(old, new) for _, old, new in changes])
+    for bug_id, old, new in changes:
+        index_search_document((new or old or {}).get("projectId"), "bug", bug_id, new)
+
+def record_bug_change(bug_id: str, old: Optional[dict], new: Optional[dict]):
+    record_bug_changes([(bug_id, old, new)])
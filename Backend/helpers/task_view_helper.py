@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from firebase import tasks_ref
+
+# Modo opcional: mantener en memoria las tareas de los proyectos activos con on_snapshot
+TASKS_LIVE_VIEW = os.getenv("TASKS_LIVE_VIEW", "false").lower() in ("1", "true", "yes")
+TASKS_LIVE_VIEW_IDLE_SECONDS = float(os.getenv("TASKS_LIVE_VIEW_IDLE_SECONDS", "900"))
+TASKS_LIVE_VIEW_READY_TIMEOUT = float(os.getenv("TASKS_LIVE_VIEW_READY_TIMEOUT", "10"))
+
+class ProjectTaskView:
+    """
+    Vista materializada de las tareas de un proyecto. Se suscribe a
+    tasks where project_id == X y aplica cada cambio que envía Firestore.
+    """
+
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.last_access = time.monotonic()
+        self._docs: Dict[str, dict] = {}
+        self._versions: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = tasks_ref.where("project_id", "==", project_id).on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        with self._lock:
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    self._docs.pop(change.document.id, None)
+                    self._versions.pop(change.document.id, None)
+                else:
+                    self._docs[change.document.id] = change.document.to_dict() or {}
+                    self._versions[change.document.id] = change.document.update_time
+        self._ready.set()
+
+    def wait_ready(self, timeout: float) -> bool:
+        return self._ready.wait(timeout)
+
+    def items(self) -> List[Tuple[str, dict]]:
+        self.last_access = time.monotonic()
+        with self._lock:
+            return list(self._docs.items())
+
+    def snapshot(self) -> Tuple[List[Tuple[str, dict]], List[Tuple[str, object]]]:
+        """Documentos y pares (id, update_time) bajo el mismo lock, para que el ETag corresponda a los datos."""
+        self.last_access = time.monotonic()
+        with self._lock:
+            return list(self._docs.items()), list(self._versions.items())
+
+    def close(self):
+        self._watch.unsubscribe()
+
+
+class TaskViewRegistry:
+    """Vistas por proyecto; las que no se consultan en un tiempo se desuscriben."""
+
+    def __init__(self, idle_seconds: float):
+        self.idle_seconds = idle_seconds
+        self._views: Dict[str, ProjectTaskView] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self, project_id: str) -> Optional[ProjectTaskView]:
+        """Vista lista para leer, o None si el listener no respondió a tiempo."""
+        with self._lock:
+            view = self._views.get(project_id)
+            if view is None:
+                view = ProjectTaskView(project_id)
+                self._views[project_id] = view
+                self._start_sweeper()
+        if not view.wait_ready(TASKS_LIVE_VIEW_READY_TIMEOUT):
+            return None
+        return view
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [pid for pid, view in self._views.items() if view.last_access < cutoff]
+            evicted = [self._views.pop(pid) for pid in idle]
+        for view in evicted:
+            view.close()
+
+    def close_all(self):
+        self._stop.set()
+        with self._lock:
+            views, self._views = list(self._views.values()), {}
+        for view in views:
+            view.close()
+
+    def active_projects(self) -> List[str]:
+        with self._lock:
+            return list(self._views)
+
+    def _start_sweeper(self):
+        if self._sweeper is not None:
+            return
+        self._stop.clear()
+
+        def sweep():
+            while not self._stop.wait(max(self.idle_seconds / 4, 1)):
+                self.evict_idle()
+
+        self._sweeper = threading.Thread(target=sweep, name="task-view-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+task_views = TaskViewRegistry(TASKS_LIVE_VIEW_IDLE_SECONDS)
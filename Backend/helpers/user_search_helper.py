@@ -0,0 +1,334 @@
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from firebase import project_users_ref, projects_ref, users_ref
+from .cache_helper import TTLCache
+from .loader_helper import ref_id
+
+# Similitud mínima (trigramas compartidos / trigramas de la búsqueda) para un resultado aproximado
+USER_SEARCH_FUZZY_THRESHOLD = float(os.getenv("USER_SEARCH_FUZZY_THRESHOLD", "0.5"))
+# Trigramas más frecuentes que esto (p. ej. "com" de los correos) no aportan al fuzzy y lo vuelven lento
+USER_SEARCH_FUZZY_MAX_POSTING = int(os.getenv("USER_SEARCH_FUZZY_MAX_POSTING", "5000"))
+# Con pocos usuarios permitidos (miembros de un proyecto) conviene revisarlos directamente
+USER_SEARCH_SCAN_ALLOWED_MAX = 2000
+PROJECT_MEMBERS_TTL_SECONDS = float(os.getenv("PROJECT_MEMBERS_TTL_SECONDS", "300"))
+# Cada cuánto se reconstruye el índice desde users: recoge lo escrito por otros
+# workers o fuera de la API
+USER_SEARCH_INDEX_TTL_SECONDS = float(os.getenv("USER_SEARCH_INDEX_TTL_SECONDS", "300"))
+
+_SEARCH_FIELDS = ("name", "email")
+_WORD_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas y sin acentos: 'José' y 'jose' indexan igual."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _words(name: str, email: str) -> Set[str]:
+    """Palabras del nombre y partes del correo ("ana.lopez@tec.mx" -> ana, lopez, tec, mx)."""
+    words = set(name.split()) | set(_WORD_SEPARATORS.split(email))
+    if email:
+        words.add(email)
+    words.discard("")
+    return words
+
+def _prefix_range(entries: List[Tuple[str, int]], prefix: str) -> Iterator[int]:
+    """doc_ids de las entradas (texto, doc_id) ordenadas cuyo texto empieza con prefix, en orden."""
+    index = bisect_left(entries, (prefix,))
+    while index < len(entries) and entries[index][0].startswith(prefix):
+        yield entries[index][1]
+        index += 1
+
+
+class UserSearchIndex:
+    """
+    Índice de búsqueda de usuarios por name y email, sin distinguir mayúsculas
+    ni acentos. Guarda también el documento de cada usuario para responder sin
+    leer Firestore. Tiene tres niveles, del más al menos relevante:
+
+    - nombres ordenados: prefijo del nombre completo (bisect);
+    - palabras ordenadas: prefijo de una palabra del nombre o del correo;
+    - trigramas invertidos: cualquier subcadena, y similitud para aproximados.
+
+    Cada nivel se consulta solo si los anteriores no llenan el límite, así que
+    las búsquedas comunes no recorren todos los candidatos.
+
+    upsert/remove mantienen al día lo que escribe este proceso; lo demás (otros
+    workers, escrituras fuera de la API) entra con la reconstrucción periódica
+    cada USER_SEARCH_INDEX_TTL_SECONDS, que corre en segundo plano.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._refreshing = False
+        # uid -> datos (None si se borró) escritos mientras corre una reconstrucción
+        self._pending: Optional[Dict[str, Optional[dict]]] = None
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._built_at = 0.0
+        self._doc_ids: Dict[str, int] = {}
+        self._uids: Dict[int, str] = {}
+        self._users: Dict[int, dict] = {}
+        self._texts: Dict[int, Tuple[str, str]] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        # bigrama -> trigramas que lo contienen, para búsquedas de 2 caracteres
+        self._bigrams: Dict[str, Set[str]] = {}
+        self._next_id = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self, users: Iterable[Tuple[str, dict]]):
+        with self._lock:
+            self._reset()
+            for uid, data in users:
+                self._add(uid, data, keep_sorted=False)
+            self._names.sort()
+            self._words.sort()
+            self._built = True
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        """
+        Si el arranque no lo construyó (p. ej. sin lifespan), se construye en la
+        primera búsqueda. Si está vencido se sigue respondiendo con él mientras
+        se reconstruye en segundo plano.
+        """
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build((doc.id, doc.to_dict() or {}) for doc in users_ref.stream())
+            return
+        if time.monotonic() - self._built_at < USER_SEARCH_INDEX_TTL_SECONDS:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._pending = {}
+        threading.Thread(target=self._refresh, name="user-search-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            fresh = UserSearchIndex()
+            fresh.build((doc.id, doc.to_dict() or {}) for doc in users_ref.stream())
+            with self._lock:
+                # Lo escrito durante la lectura puede no estar en ella: se reaplica
+                for uid, data in self._pending.items():
+                    fresh._remove(uid)
+                    if data is not None:
+                        fresh._add(uid, data)
+                for name, value in vars(fresh).items():
+                    if name not in ("_lock", "_refreshing", "_pending"):
+                        setattr(self, name, value)
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._pending = None
+
+    def upsert(self, uid: str, data: dict):
+        with self._lock:
+            self._remove(uid)
+            self._add(uid, data)
+            if self._pending is not None:
+                self._pending[uid] = dict(data)
+
+    def remove(self, uid: str):
+        with self._lock:
+            self._remove(uid)
+            if self._pending is not None:
+                self._pending[uid] = None
+
+    def _add(self, uid: str, data: dict, keep_sorted: bool = True):
+        doc_id = self._next_id
+        self._next_id += 1
+        name, email = texts = tuple(normalize(data.get(field)) for field in _SEARCH_FIELDS)
+        self._doc_ids[uid] = doc_id
+        self._uids[doc_id] = uid
+        self._users[doc_id] = dict(data)
+        self._texts[doc_id] = texts
+
+        add = insort if keep_sorted else list.append
+        add(self._names, (name, doc_id))
+        for word in _words(name, email):
+            add(self._words, (word, doc_id))
+
+        for gram in trigrams(name) | trigrams(email):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = set()
+                self._bigrams.setdefault(gram[:2], set()).add(gram)
+                self._bigrams.setdefault(gram[1:], set()).add(gram)
+            postings.add(doc_id)
+
+    def _remove(self, uid: str):
+        doc_id = self._doc_ids.pop(uid, None)
+        if doc_id is None:
+            return
+        del self._uids[doc_id]
+        del self._users[doc_id]
+        name, email = self._texts.pop(doc_id)
+
+        for entries, text in [(self._names, name), *((self._words, word) for word in _words(name, email))]:
+            index = bisect_left(entries, (text, doc_id))
+            if index < len(entries) and entries[index] == (text, doc_id):
+                del entries[index]
+
+        for gram in trigrams(name) | trigrams(email):
+            postings = self._postings.get(gram)
+            if postings is None:
+                continue
+            postings.discard(doc_id)
+            if not postings:
+                del self._postings[gram]
+                for bigram in (gram[:2], gram[1:]):
+                    grams = self._bigrams.get(bigram)
+                    if grams is not None:
+                        grams.discard(gram)
+                        if not grams:
+                            del self._bigrams[bigram]
+
+    def _substring_candidates(self, query: str) -> Set[int]:
+        if len(query) < 3:
+            # Sin trigramas: los usuarios de cualquier trigrama que contenga el bigrama
+            candidates = set()
+            for gram in self._bigrams.get(query, ()):
+                candidates |= self._postings[gram]
+            return candidates
+        lists = sorted((self._postings.get(gram, set()) for gram in trigrams(query)), key=len)
+        if not lists or not lists[0]:
+            return set()
+        smallest, rest = lists[0], lists[1:]
+        return {doc_id for doc_id in smallest if all(doc_id in other for other in rest)}
+
+    def _score(self, query: str, doc_id: int) -> float:
+        name, email = self._texts[doc_id]
+        if name.startswith(query):
+            return 3.0
+        if any(word.startswith(query) for word in _words(name, email)):
+            return 2.0
+        if query in name or query in email:
+            return 1.0
+        return 0.0
+
+    def _fuzzy(self, query: str, limit: int, allowed_ids: Optional[Set[int]]) -> List[Tuple[int, float]]:
+        query_grams = trigrams(query)
+        if len(query_grams) < 2:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            postings = self._postings.get(gram, ())
+            if len(postings) <= USER_SEARCH_FUZZY_MAX_POSTING:
+                shared.update(postings)
+        scored = (
+            (doc_id, round(min(count / len(query_grams), 0.99), 4))
+            for doc_id, count in shared.items()
+            if count / len(query_grams) >= USER_SEARCH_FUZZY_THRESHOLD
+            and (allowed_ids is None or doc_id in allowed_ids)
+        )
+        return heapq.nsmallest(limit, scored, key=lambda item: (-item[1], self._texts[item[0]][0]))
+
+    def _ranked(self, query: str, limit: int, allowed_ids: Optional[Set[int]]) -> List[Tuple[int, float]]:
+        if allowed_ids is not None and len(allowed_ids) <= USER_SEARCH_SCAN_ALLOWED_MAX:
+            scored = ((doc_id, self._score(query, doc_id)) for doc_id in allowed_ids)
+            return heapq.nsmallest(
+                limit,
+                ((doc_id, score) for doc_id, score in scored if score),
+                key=lambda item: (-item[1], self._texts[item[0]][0])
+            )
+
+        results: List[Tuple[int, float]] = []
+        seen: Set[int] = set()
+
+        def take(doc_ids: Iterable[int], score: float):
+            for doc_id in doc_ids:
+                if len(results) >= limit:
+                    return
+                if doc_id in seen or (allowed_ids is not None and doc_id not in allowed_ids):
+                    continue
+                seen.add(doc_id)
+                results.append((doc_id, score))
+
+        # Los niveles ya vienen ordenados por texto; solo las subcadenas requieren ordenar
+        take(_prefix_range(self._names, query), 3.0)
+        take(_prefix_range(self._words, query), 2.0)
+        if len(results) < limit:
+            substring = (
+                doc_id for doc_id in self._substring_candidates(query)
+                if doc_id not in seen
+                and (allowed_ids is None or doc_id in allowed_ids)
+                and self._score(query, doc_id)
+            )
+            take(heapq.nsmallest(limit - len(results), substring, key=lambda doc_id: self._texts[doc_id][0]), 1.0)
+        return results
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        fuzzy: bool = True,
+        allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, dict, float]]:
+        """
+        (uid, usuario, score) ordenados por relevancia: 3 prefijo del nombre,
+        2 prefijo de una palabra del nombre o del correo, 1 subcadena. Si no hay
+        ninguna coincidencia se devuelven las aproximadas con su similitud de
+        trigramas (< 1). `allowed` restringe a esos uids (miembros de un proyecto).
+        """
+        self.ensure_built()
+        query = normalize(query).strip()
+        if not query:
+            return []
+
+        with self._lock:
+            allowed_ids = None
+            if allowed is not None:
+                allowed_ids = {self._doc_ids[uid] for uid in allowed if uid in self._doc_ids}
+
+            ranked = self._ranked(query, limit, allowed_ids)
+            # Aproximados solo si no hubo coincidencias: tolera errores de tipeo sin ensuciar los aciertos
+            if fuzzy and not ranked:
+                ranked = self._fuzzy(query, limit, allowed_ids)
+            return [(self._uids[doc_id], dict(self._users[doc_id]), score) for doc_id, score in ranked]
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+
+user_search_index = UserSearchIndex()
+
+# project_id -> {uid: rol}; se invalida cuando cambian las relaciones project_users
+project_members_cache = TTLCache(1024, PROJECT_MEMBERS_TTL_SECONDS)
+
+def _load_project_members(project_id: str) -> Dict[str, Optional[str]]:
+    query = (
+        project_users_ref
+        .where("projectRef", "==", projects_ref.document(project_id))
+        .select(["userRef", "role"])
+    )
+    members = {}
+    for doc in query.stream():
+        data = doc.to_dict() or {}
+        members[ref_id(data.get("userRef"))] = data.get("role")
+    return members
+
+def get_project_members(project_id: str) -> Dict[str, Optional[str]]:
+    return project_members_cache.get_or_load(project_id, lambda: _load_project_members(project_id))
+
+def invalidate_project_members(project_id: Optional[str]):
+    if project_id:
+        project_members_cache.invalidate(project_id)
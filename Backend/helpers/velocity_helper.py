@@ -0,0 +1,59 @@
+import os
+from statistics import mean, pstdev
+from typing import Dict, List
+from firebase import sprints_ref
+from .cache_helper import TTLCache
+from .sprint_stats_helper import get_project_sprint_stats, parse_firestore_date, rebuild_sprint_stats
+
+VELOCITY_CACHE_TTL_SECONDS = float(os.getenv("VELOCITY_CACHE_TTL_SECONDS", "300"))
+VELOCITY_ROLLING_WINDOW = int(os.getenv("VELOCITY_ROLLING_WINDOW", "3"))
+
+# project_id -> [sprint con fechas, Planned y Actual]; se invalida en cada escritura de tareas o sprints
+velocity_cache = TTLCache(256, VELOCITY_CACHE_TTL_SECONDS)
+
+def _load_project_velocity(project_id: str) -> List[Dict]:
+    """
+    Planned/Actual por sprint desde sprint_stats: una consulta de sprints (solo
+    nombre y fechas) y una de estadísticas, sin leer ninguna tarea.
+    """
+    stats_by_sprint = get_project_sprint_stats(project_id)
+    sprints = []
+    query = sprints_ref.where("project_id", "==", project_id).select(["name", "number", "start_date", "end_date"])
+    for snap in query.stream():
+        data = snap.to_dict() or {}
+        start_date = parse_firestore_date(data.get("start_date"))
+        end_date = parse_firestore_date(data.get("end_date"))
+        if not start_date or not end_date:
+            continue
+
+        stats = stats_by_sprint.get(snap.id)
+        if not stats or not stats.get("initialized"):
+            stats = rebuild_sprint_stats(project_id, snap.id, start_date)
+
+        sprints.append({
+            "id": snap.id,
+            "name": data.get("name"),
+            "number": data.get("number"),
+            "start_date": start_date,
+            "end_date": end_date,
+            "Planned": stats.get("total_story_points", 0),
+            "Actual": stats.get("completed_story_points", 0),
+        })
+    return sprints
+
+def get_project_velocity(project_id: str) -> List[Dict]:
+    """Datos compartidos de la caché: no modificarlos."""
+    return velocity_cache.get_or_load(project_id, lambda: _load_project_velocity(project_id))
+
+def invalidate_velocity(project_id: str):
+    if project_id:
+        velocity_cache.invalidate(project_id)
+
+def add_rolling_series(velocity_list: List[Dict], window: int = VELOCITY_ROLLING_WINDOW) -> List[Dict]:
+    """Agrega el promedio móvil y la desviación estándar de Actual en las últimas `window` entradas."""
+    actuals = [entry["Actual"] for entry in velocity_list]
+    for index, entry in enumerate(velocity_list):
+        recent = actuals[max(0, index - window + 1):index + 1]
+        entry["RollingAverage"] = round(float(mean(recent)), 2)
+        entry["RollingStdDev"] = round(pstdev(recent), 2)
+    return velocity_list
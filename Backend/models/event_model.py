@@ -60,3 +60,7 @@ class EventResponse(EventCreate):
     created_at: datetime
     updated_at: datetime
 
+class EventOccurrence(EventResponse):
+    # Para eventos recurrentes start_date/end_date son los de la ocurrencia y
+    # series_start_date el inicio original de la serie
+    series_start_date: Optional[datetime] = None
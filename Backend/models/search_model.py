@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class SearchHit(BaseModel):
+    type: str  # task, bug, userstory, epic, requirement
+    id: str
+    idTitle: Optional[str] = None
+    title: Optional[str] = None
+    status: Optional[str] = None
+    score: float
+
+class SearchResponse(BaseModel):
+    """Resultados ordenados por BM25 y facetas (conteos por tipo y estado de todas las coincidencias)"""
+    query: str
+    total: int
+    results: List[SearchHit] = Field(default_factory=list)
+    facets: Dict[str, Dict[str, int]] = Field(default_factory=dict)
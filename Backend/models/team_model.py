@@ -7,6 +7,8 @@ class TeamMember(BaseModel):
     role: str
     tasksCompleted: int
     currentTasks: int
+    storyPoints: int = 0
+    completedStoryPoints: int = 0
     availability: int
 
 class TeamBase(BaseModel):
@@ -1,6 +1,31 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
+# Default roles with their bitmasks
+DEFAULT_ROLES = [
+    {
+        "idRole": "owner",
+        "name": "Owner",
+        "description": "Full access to all project functions",
+        "bitmask": 1023,
+        "is_default": True
+    },
+    {
+        "idRole": "admin",
+        "name": "Admin",
+        "description": "General project administration without the ability to delete it",
+        "bitmask": 510,
+        "is_default": True
+    },
+    {
+        "idRole": "developer",
+        "name": "Developer",
+        "description": "Doesnt have access to project management functions",
+        "bitmask": 0,
+        "is_default": True
+    }
+]
+
 class RoleDefinition(BaseModel):
     idRole: str
     name: str
@@ -20,7 +20,10 @@ from .sprint_details_routes import router as sprint_details_router
 from .bug_routes import router as bug_router
 from .teams_routes import router as teams_router
 from .user_roles_routes import router as user_roles_router
-# from .event_routes import router as event_router
+from .event_routes import router as event_router
 from .roadmap_routes import router as roadmap_router
+from .search_routes import router as search_router
+from .cascade_routes import router as cascade_router
+from .jobs_routes import router as jobs_router
 #from .email_routes import router as emai_router
 
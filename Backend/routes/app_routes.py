@@ -1,6 +1,7 @@
 import firebase_admin
 from firebase_admin import auth
-from firebase import users_ref
+from helpers import ENFORCE_PROJECT_PERMISSIONS,get_project_membership,has_permission
+from helpers import ensure_user_provisioned,verify_id_token_cached
 from fastapi import APIRouter, HTTPException, Depends, Header
 from typing import Optional
 
@@ -21,25 +22,11 @@ def verify_token(authorization: Optional[str] = Header(None)) -> dict:
     token = token_parts[1]
     
     try:
-        print(f"Verificando token: {token}")
-        decoded_token = auth.verify_id_token(token, check_revoked=True, clock_skew_seconds=60)
-        print(f"Token verificado: {decoded_token}")
-
-        uid = decoded_token.get("uid")
-        name = decoded_token.get("name")
-        email = decoded_token.get("email")
-        picture = decoded_token.get("picture")
-
-        # Verificar si el usuario ya existe en Firestore
-        user_doc = users_ref.document(uid).get()
-        if not user_doc.exists:
-            # Si no existe, lo creamos con rol "user" por defecto
-            users_ref.document(uid).set({
-                "name": name,
-                "email": email,
-                "role": "user",  # Rol por defecto
-                "picture": picture
-            })
+        # Caché por hash del token; la revocación se revisa cada TOKEN_REVOCATION_CHECK_SECONDS
+        decoded_token = verify_id_token_cached(token)
+
+        # Verificar si el usuario ya existe en Firestore (una vez por usuario y proceso)
+        ensure_user_provisioned(decoded_token)
 
         return decoded_token
     except auth.ExpiredIdTokenError:
@@ -51,6 +38,27 @@ def verify_token(authorization: Optional[str] = Header(None)) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno al verificar el token: {str(e)}")
 
+def require_project_permission(bit: int):
+    """
+    Dependencia para rutas con {project_id}: exige que el usuario autenticado sea
+    miembro del proyecto y que su rol tenga el bit de permiso indicado. El rol se
+    resuelve con caché, así que en el caso común no hace lecturas a Firestore.
+    Se usa en DELETE /projects/{project_id}. Sin ENFORCE_PROJECT_PERMISSIONS no
+    exige nada.
+    """
+    if not ENFORCE_PROJECT_PERMISSIONS:
+        return lambda: None
+
+    def dependency(project_id: str, current_user: dict = Depends(verify_token)) -> dict:
+        membership = get_project_membership(current_user.get("uid"), project_id)
+        if membership is None:
+            raise HTTPException(status_code=403, detail="Not a member of this project")
+        if not has_permission(membership["bitmask"], bit):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return {**current_user, **membership}
+
+    return dependency
+
 @router.get("/token")
 async def get_profile(current_user: dict = Depends(verify_token)):
     return {"message": "User authenticated", "user": current_user}
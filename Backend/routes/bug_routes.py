@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from typing import List,Dict,Any,Tuple
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from typing import List,Dict,Any,Tuple,Optional
 from firebase import bugs_ref,projects_ref
 from models.bug_model import Bug,StatusUpdate,BugBase
 from firebase_admin import firestore
 from datetime import datetime
+from helpers import parse_fields,sparse_response,PageParams,ndjson_response,wants_ndjson
+from helpers import TRUSTED_READS,fast_json_response,trusted_dict
+from helpers import record_bug_change
 
 
 router = APIRouter(tags=["Bugs"])
@@ -27,31 +30,63 @@ def convert_assignee_format(data: Dict[str, Any]) -> List[Tuple[str, str]]:
     return assigned_users
 
 
+def _bug_from_doc(d) -> Bug:
+    data = d.to_dict() or {}
+    raw = dict(data)
+    
+    for key in ["id", "createdAt", "modifiedAt", "assignee"]:
+        raw.pop(key, None)
+
+    assigned = convert_assignee_format(data)
+
+    return Bug(
+        id=d.id,
+        assignees=[{"users": a} for a in assigned],
+        createdAt=safe_iso(data.get("createdAt")),
+        modifiedAt=safe_iso(data.get("modifiedAt")),
+        **raw
+    )
+
+def _bug_dict(d) -> Dict[str, Any]:
+    """Lectura de confianza: misma forma que _bug_from_doc(d).model_dump() sin validar."""
+    data = d.to_dict() or {}
+    return trusted_dict(
+        Bug, data,
+        id=d.id,
+        createdAt=safe_iso(data.get("createdAt")),
+        modifiedAt=safe_iso(data.get("modifiedAt")),
+        assignee=None
+    )
+
 # Obtener todos los bugs de un proyecto
 @router.get("/bugs/project/{project_id}", response_model=List[Bug])
-def get_bugs_by_project(project_id: str):
+def get_bugs_by_project(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma"),
+    page: PageParams = Depends()
+):
+    selected = parse_fields(fields, Bug)
+
     if not projects_ref.document(project_id).get().exists:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    docs = bugs_ref.where("projectId", "==", project_id).stream()
-    results = []
-
-    for d in docs:
-        raw = d.to_dict() or {}
-        
-        for key in ["id", "createdAt", "modifiedAt", "assignee"]:
-            raw.pop(key, None)
+    query = bugs_ref.where("projectId", "==", project_id)
+    if selected is not None:
+        query = query.select(selected)
+    docs = page.fetch(query, response) if page.enabled else query.stream()
+    build = _bug_dict if TRUSTED_READS else _bug_from_doc
 
-        assigned = convert_assignee_format(d.to_dict())
+    if wants_ndjson(request):
+        return ndjson_response((build(d) for d in docs), selected, response.headers)
+    if TRUSTED_READS:
+        return fast_json_response((build(d) for d in docs), selected, response.headers)
 
-        results.append(Bug(
-            id=d.id,
-            assignees=[{"users": a} for a in assigned],
-            createdAt=safe_iso(d.get("createdAt")),
-            modifiedAt=safe_iso(d.get("modifiedAt")),
-            **raw
-        ))
+    results = [_bug_from_doc(d) for d in docs]
 
+    if selected is not None:
+        return sparse_response(results, selected, response.headers)
     return results
 
 # Obtener un bug por ID
@@ -92,6 +127,7 @@ def create_bug(bug: Bug):
 
     ref.set(data)
     saved = ref.get().to_dict()
+    record_bug_change(bug.id, None, saved)
 
     saved["id"] = bug.id    
     saved["createdAt"] = saved["createdAt"].isoformat()
@@ -102,7 +138,8 @@ def create_bug(bug: Bug):
 @router.put("/bugs/{bug_id}", response_model=Bug)
 def update_bug(bug_id: str, bug: BugBase):
     ref = bugs_ref.document(bug_id)
-    if not ref.get().exists:
+    snap = ref.get()
+    if not snap.exists:
         raise HTTPException(status_code=404, detail="Bug not found")
 
     data = bug.dict(exclude_unset=True, exclude_none=True)
@@ -110,6 +147,7 @@ def update_bug(bug_id: str, bug: BugBase):
 
     ref.update(data)
     updated = ref.get().to_dict() or {}
+    record_bug_change(bug_id, snap.to_dict(), dict(updated))
     assigned = convert_assignee_format(updated)
     
     for key in ["id", "modifiedAt", "createdAt", "assignee"]:
@@ -127,10 +165,12 @@ def update_bug(bug_id: str, bug: BugBase):
 @router.delete("/bugs/{bug_id}")
 def delete_bug(bug_id: str):
     ref = bugs_ref.document(bug_id)
-    if not ref.get().exists:
+    snap = ref.get()
+    if not snap.exists:
         raise HTTPException(status_code=404, detail="Bug not found")
     
     ref.delete()
+    record_bug_change(bug_id, snap.to_dict(), None)
     return {"message": "Bug deleted successfully"}
 
 
@@ -145,8 +185,9 @@ def update_story_status(project_id: str, bug_id: str, payload: StatusUpdate):
     if not bug_doc.exists or bug_doc.get("projectId") != project_id:
         raise HTTPException(404, "Bug not found")
 
-    bugs_ref.document(bug_id).update({
-        "status_khanban": payload.status_khanban
-    })
+    update = {"status_khanban": payload.status_khanban}
+    bugs_ref.document(bug_id).update(update)
+    old = bug_doc.to_dict()
+    record_bug_change(bug_id, old, {**old, **update})
 
     return {"message": f"Story {bug_id} status updated to {payload.status_khanban}"}
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+from helpers import get_cascade_state
+
+router = APIRouter(tags=["Cascade Deletes"])
+
+CASCADE_KINDS = ("project", "userstory", "user")
+
+# Progreso de un borrado en cascada (DELETE de proyecto, user story o usuario)
+@router.get("/cascade-deletes/{kind}/{root_id}")
+def get_cascade_delete(kind: str, root_id: str):
+    if kind not in CASCADE_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {kind}")
+    state = get_cascade_state(kind, root_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Cascade delete not found")
+    return state
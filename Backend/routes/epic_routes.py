@@ -4,11 +4,28 @@ from typing import List, Optional
 from firebase import epics_ref, req_ref, projects_ref
 from firebase_admin import firestore
 from models.epic_models import Epic, EpicResponse
+from helpers import BulkWriter,bulk_write_response,index_search_document
+from helpers import AsyncQuery,job_accepted,job_runner
 
 router = APIRouter(tags=["Epics"])
 
 @router.post("/projects/{project_id}/epics/batch", response_model=List[EpicResponse])
-def create_epics_batch(project_id: str, epics: List[Epic], archive_missing: bool = True):
+def create_epics_batch(
+    project_id: str,
+    epics: List[Epic],
+    archive_missing: bool = True,
+    report: bool = Query(False, description="Devolver {results, report} con el resultado de cada escritura"),
+    run_async: AsyncQuery = False
+):
+    if run_async:
+        # Importaciones grandes: se escriben en segundo plano y el resultado queda en /jobs/{id}
+        job = job_runner.submit(
+            "epics_batch",
+            lambda job: {"written": [item.id for item in create_epics_batch(project_id, epics, archive_missing, report=False)]},
+            params={"project_id": project_id, "items": len(epics)}
+        )
+        return job_accepted(job)
+
     project_ref = projects_ref.document(project_id)
     project = project_ref.get()
     
@@ -18,15 +35,19 @@ def create_epics_batch(project_id: str, epics: List[Epic], archive_missing: bool
             detail=f"Project with ID {project_id} not found"
         )
     
-    # Get existing epics for this project
+    # Get existing epics and requirements for this project (one projected query each)
     existing_epics = {doc.to_dict()["idTitle"]: doc.reference 
-                     for doc in epics_ref.where("projectRef", "==", project_id).stream()}
+                     for doc in epics_ref.where("projectRef", "==", project_id).select(["idTitle"]).stream()}
+    existing_reqs = {doc.to_dict().get("idTitle"): doc.reference
+                     for doc in req_ref.where("projectRef", "==", project_id).select(["idTitle"]).stream()}
     
     # Track which epics we're updating
     updated_epic_ids = set()
-    batch = db.batch()
+    writer = BulkWriter()
     created_epics = []
-    requirements_to_update = []
+    # requirement idTitle -> epic idTitle; if several epics list it, the last one wins
+    requirement_links = {}
+    indexed = []
     
     for epic in epics:
         if epic.projectRef != project_id:
@@ -39,51 +60,43 @@ def create_epics_batch(project_id: str, epics: List[Epic], archive_missing: bool
         if epic.idTitle in existing_epics:
             # Update existing
             epic_ref = existing_epics[epic.idTitle]
-            batch.update(epic_ref, epic_dict)
+            writer.update(epic_ref, epic_dict)
             created_epics.append(EpicResponse(id=epic_ref.id, **epic_dict))
+            indexed.append((epic_ref.id, epic_dict))
         else:
             new_doc = epics_ref.document()
-            batch.set(new_doc, epic_dict)
+            writer.set(new_doc, epic_dict)
             created_epics.append(EpicResponse(id=new_doc.id, **epic_dict))
+            indexed.append((new_doc.id, epic_dict))
         
         updated_epic_ids.add(epic.idTitle)
         
         # Handle requirements
-        if epic.relatedRequirements:
-            for req in epic.relatedRequirements:
-                requirements_to_update.append({
-                    "epic_id": epic.idTitle,
-                    "req_id": req.idTitle,
-                    "description": req.description,
-                    "uuid": req.uuid
-                })
+        for req in epic.relatedRequirements or []:
+            requirement_links[req.idTitle] = epic.idTitle
     
     if archive_missing:
         for epic_id, epic_ref in existing_epics.items():
             if epic_id not in updated_epic_ids:
-                batch.update(epic_ref, {
+                writer.update(epic_ref, {
                     "status": "archived",
                     "lastUpdated": firestore.SERVER_TIMESTAMP
                 })
+                indexed.append((epic_ref.id, {"status": "archived"}))
     
-    # Commit all changes
-    batch.commit()
+    # Re-link requirements in the same write set; unknown idTitles are skipped as before
+    for req_id, epic_id in requirement_links.items():
+        req_doc = existing_reqs.get(req_id)
+        if req_doc is not None:
+            writer.update(req_doc, {"epicRef": epic_id}, key=f"requirement:{req_doc.id}")
     
-    # Update requirements
-    if requirements_to_update:
-        req_batch = db.batch()
-        for item in requirements_to_update:
-            req_query = req_ref.where("idTitle", "==", item["req_id"])\
-                               .where("projectRef", "==", project_id)\
-                               .limit(1).stream()
-            req_list = list(req_query)
-            
-            if req_list:
-                req_doc = req_ref.document(req_list[0].id)
-                req_batch.update(req_doc, {"epicRef": item["epic_id"]})
-        req_batch.commit()
-    
-    return created_epics
+    # Commit in chunks of up to 500 writes, in parallel and with retries
+    outcome = writer.commit()
+    for doc_id, data in indexed:
+        if outcome.ok(doc_id):
+            index_search_document(project_id, "epic", doc_id, data, merge=True)
+    
+    return bulk_write_response([epic for epic in created_epics if outcome.ok(epic.id)], outcome, report)
 
 
 # Obtener todas las épicas de un proyecto
@@ -135,11 +148,13 @@ def upsert_epic(project_id: str, epic: Epic):
         # Actualizar
         epic_doc = epics_ref.document(existing[0].id)
         epic_doc.update(epic.dict())
+        index_search_document(project_id, "epic", epic_doc.id, epic.dict(), merge=True)
         return EpicResponse(id=epic_doc.id, **epic.dict())
     else:
         # Crear nuevo
         new_doc = epics_ref.document()
         new_doc.set(epic.dict())
+        index_search_document(project_id, "epic", new_doc.id, epic.dict())
         return EpicResponse(id=new_doc.id, **epic.dict())
 
 
@@ -162,7 +177,7 @@ def delete_epic(
                          .where("projectRef", "==", project_id)\
                          .stream()
     
-    batch = req_ref.firestore.batch()
+    batch = db.batch()
     for req in requirements:
         req_doc = req_ref.document(req.id)
         batch.update(req_doc, {"epicRef": None})
@@ -171,4 +186,5 @@ def delete_epic(
     
     # Eliminar la épica
     epics_ref.document(epic_list[0].id).delete()
+    index_search_document(project_id, "epic", epic_list[0].id, None)
     return {"message": "Epic deleted successfully and requirements unassigned"}
\ No newline at end of file
@@ -3,13 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 from typing import List, Optional
 from models.event_model import EventCreate, EventUpdate, EventResponse
-from firebase_admin import firestore
+from firebase import db
 
 router = APIRouter(tags=["Events"])
-db = firestore.client()
 
 @router.post("/projects/{project_id}/sprints/{sprint_id}/events", response_model=EventResponse)
-async def create_event(
+def create_event(
     project_id: str,
     sprint_id: str,
     event: EventCreate
@@ -42,7 +41,7 @@ async def create_event(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/projects/{project_id}/sprints/{sprint_id}/events", response_model=List[EventResponse])
-async def get_events(
+def get_events(
     project_id: str,
     sprint_id: str,
     start_date: Optional[datetime] = None,
@@ -81,7 +80,7 @@ async def get_events(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/projects/{project_id}/sprints/{sprint_id}/events/{event_id}", response_model=EventResponse)
-async def get_event(
+def get_event(
     project_id: str,
     sprint_id: str,
     event_id: str
@@ -108,7 +107,7 @@ async def get_event(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/projects/{project_id}/sprints/{sprint_id}/events/{event_id}", response_model=EventResponse)
-async def update_event(
+def update_event(
     project_id: str,
     sprint_id: str,
     event_id: str,
@@ -143,7 +142,7 @@ async def update_event(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/projects/{project_id}/sprints/{sprint_id}/events/{event_id}")
-async def delete_event(
+def delete_event(
     project_id: str,
     sprint_id: str,
     event_id: str
@@ -167,15 +166,14 @@ async def delete_event(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime
-from typing import List, Optional
-from models.event_model import EventCreate, EventUpdate, EventResponse
-from firebase_admin import firestore
+from datetime import timedelta
+from fastapi import Query
+from models.event_model import EventOccurrence
+from helpers import EVENT_WINDOW_MAX_DAYS,as_utc,get_window_events
 import pytz  # Add this import for timezone handling
 
-@router.get("/projects/{project_id}/events/today", response_model=List[EventResponse])
-async def get_project_today_events(project_id: str):
+@router.get("/projects/{project_id}/events/today", response_model=List[EventOccurrence])
+def get_project_today_events(project_id: str):
     """
     Get all events scheduled for today for a specific project.
     Uses UTC-6 timezone (Central Time) to determine "today".
@@ -184,7 +182,7 @@ async def get_project_today_events(project_id: str):
     - project_id: The ID of the project
     
     Returns:
-    - List of events that start today for the given project
+    - List of events (including recurring occurrences) that start today for the given project
     """
     try:
         # Verify project exists
@@ -198,51 +196,44 @@ async def get_project_today_events(project_id: str):
         now_utc = datetime.utcnow().replace(tzinfo=pytz.UTC)
         now_central = now_utc.astimezone(central_tz)
         
-        # Start of day in UTC-6, then convert back to UTC for comparison
-        today_central = now_central.replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow_central = today_central.replace(hour=23, minute=59, second=59)
-        
-        # Convert back to UTC for proper comparison with Firestore timestamps
-        today_utc = today_central.astimezone(pytz.UTC)
-        tomorrow_utc = tomorrow_central.astimezone(pytz.UTC)
-        
-        # Get ALL events from Firestore
-        events_query = db.collection("events").stream()
+        # Start of day in UTC-6; the window ends at the next local midnight
+        today_naive = datetime(now_central.year, now_central.month, now_central.day)
+        today_central = central_tz.localize(today_naive)
+        tomorrow_central = central_tz.localize(today_naive + timedelta(days=1))
 
-        # Check if the query returned any documents
-        if not events_query:
-            raise HTTPException(status_code=404, detail="No events found")
-                
-        # Process and filter by project and date in Python code
-        events = []
-        for doc in events_query:
-            event_data = doc.to_dict()
-            
-            # First check if the event belongs to any sprint of the project
-            event_sprint_id = event_data.get("sprint_id")
-            if not event_sprint_id:
-                continue
-                                
-            # Now check if the event is today in UTC-6
-            event_start = event_data.get("start_date")
-            
-            # Add timezone info if it's naive
-            if event_start and not event_start.tzinfo:
-                event_start = event_start.replace(tzinfo=pytz.UTC)
-            
-            # Only include if start_date is within today's range in UTC-6
-            if event_start and today_utc <= event_start <= tomorrow_utc:
-                events.append(EventResponse(
-                    id=doc.id,
-                    **event_data
-                ))
-        
-        return events
+        # Range-bounded queries on project_id + start_date, recurring series expanded for today
+        return [
+            EventOccurrence(**occurrence)
+            for occurrence in get_window_events(project_id, today_central, tomorrow_central)
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/projects/{project_id}/events", response_model=List[EventOccurrence])
+def get_project_events_window(
+    project_id: str,
+    start: datetime = Query(..., description="Inicio de la ventana (inclusive)"),
+    end: datetime = Query(..., description="Fin de la ventana (exclusivo)")
+):
+    """
+    Eventos del proyecto que empiezan en [start, end), con las series recurrentes
+    expandidas en una ocurrencia por fecha dentro de la ventana.
+    """
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=EVENT_WINDOW_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window cannot exceed {EVENT_WINDOW_MAX_DAYS} days")
+
+    if not db.collection("projects").document(project_id).get().exists:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    return [EventOccurrence(**occurrence) for occurrence in get_window_events(project_id, start, end)]
     
 @router.delete("/events/{event_id}")
-async def delete_event_by_id(event_id: str):
+def delete_event_by_id(event_id: str):
     """
     Delete an event using only its ID.
     
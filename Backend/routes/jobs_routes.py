@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from helpers import get_job, job_runner
+
+router = APIRouter(tags=["Jobs"])
+
+# Estado, progreso y resultado de un job lanzado con ?async=true
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
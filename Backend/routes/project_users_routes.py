@@ -2,24 +2,29 @@ from models.users_model import Users, UsersResponse
 from models.projects_model import Projects, ProjectsResponse
 from models.project_users_model import Project_Users, Project_UsersResponse, Project_UsersRef, ProjectUserFullResponse
 from firebase import project_users_ref, users_ref, projects_ref
-from fastapi import APIRouter, HTTPException, Body
+from helpers import DocumentLoader, ref_id, PageParams, invalidate_permissions, invalidate_project_members
+from fastapi import APIRouter, HTTPException, Body, Depends, Response
 from pydantic import BaseModel
 from typing import List, Optional
 
 router = APIRouter(tags=["ProjectUsers"])
 
 @router.get("/project_users", response_model=List[Project_UsersResponse])
-def get_all_project_users():
-    project_users = project_users_ref.stream()
+def get_all_project_users(response: Response, page: PageParams = Depends()):
+    docs = page.fetch(project_users_ref, response) if page.enabled else project_users_ref.stream()
+    project_users = [(pu.id, pu.to_dict()) for pu in docs]
+
+    # Solo se devuelven los ids de las referencias: no hace falta leer usuarios ni
+    # proyectos, y cada página trae todas sus relaciones (el cursor sigue siendo válido)
     return [
         Project_UsersResponse(
-            id=pu.id,
-            userRef=users_ref.document(pu.to_dict()["userRef"].id).get().to_dict(),
-            projectRef=projects_ref.document(pu.to_dict()["projectRef"].id).get().to_dict(),
-            joinedAt=pu.to_dict().get("joinedAt"),
-            role=pu.to_dict().get("role")
+            id=pu_id,
+            userRef=ref_id(pu["userRef"]),
+            projectRef=ref_id(pu["projectRef"]),
+            joinedAt=pu.get("joinedAt"),
+            role=pu.get("role")
         )
-        for pu in project_users
+        for pu_id, pu in project_users
     ]
 
 @router.get("/project_users/user/{user_id}", response_model=List[ProjectsResponse])
@@ -28,13 +33,11 @@ def get_projects_by_user(user_id: str):
     if not user_doc.exists:
         raise HTTPException(status_code=404, detail="User not found")
     project_users = project_users_ref.where("userRef", "==", user_doc.reference).stream()
-    projects = [
-        projects_ref.document(pu.to_dict()["projectRef"].id).get()
-        for pu in project_users
-    ]
+    project_ids = [ref_id(pu.to_dict()["projectRef"]) for pu in project_users]
+    projects = DocumentLoader(projects_ref).load_many(project_ids)
     return [
-        {"id": proj.id, **proj.to_dict()}
-        for proj in projects if proj.exists
+        {"id": proj_id, **proj}
+        for proj_id, proj in projects.items() if proj is not None
     ]
 
 @router.get(
@@ -46,19 +49,23 @@ def get_users_by_project(project_id: str):
     if not project_doc.exists:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    relations = [
+        (pu.id, pu.to_dict())
+        for pu in project_users_ref.where("projectRef", "==", project_doc.reference).stream()
+    ]
+    users = DocumentLoader(users_ref).load_many(ref_id(pu_data["userRef"]) for _, pu_data in relations)
+
     out = []
-    for pu in project_users_ref.where("projectRef", "==", project_doc.reference).stream():
-        pu_data = pu.to_dict()
-        user_ref = pu_data["userRef"]            # DocumentReference
-        user_doc = users_ref.document(user_ref.id).get()
-        if not user_doc.exists:
+    for pu_id, pu_data in relations:
+        user_id = ref_id(pu_data["userRef"])
+        user = users.get(user_id)
+        if user is None:
             continue
-        user = user_doc.to_dict()
 
         out.append({
             # datos de la relación
-            "id":         pu.id,
-            "userRef":    user_ref.id,
+            "id":         pu_id,
+            "userRef":    user_id,
             "projectRef": project_doc.id,
             "role":       pu_data.get("role"),
             "joinedAt":   pu_data.get("joinedAt"),
@@ -90,6 +97,8 @@ def create_project_user_relation(project_user: Project_UsersRef):
         "role": project_user.role,
         "joinedAt": project_user.joinedAt
     })
+    invalidate_permissions(user_doc.id, project_doc.id)
+    invalidate_project_members(project_doc.id)
 
     # Instead of returning the entire document's data, return just the IDs
     return Project_UsersResponse(
@@ -107,6 +116,9 @@ def delete_project_user_relation(project_user_id: str):
     if not project_user_doc.exists:
         raise HTTPException(status_code=404, detail="Project-user relation not found")
     project_users_ref.document(project_user_id).delete()
+    data = project_user_doc.to_dict() or {}
+    invalidate_permissions(ref_id(data.get("userRef")), ref_id(data.get("projectRef")))
+    invalidate_project_members(ref_id(data.get("projectRef")))
     return {"message": "Project-user relation deleted successfully"}
 
 @router.get("/project_users/relation", response_model=Project_UsersResponse)
@@ -183,6 +195,8 @@ def update_user_role(project_user_id: str, role_update: RoleUpdate):
     # Get updated document
     updated_doc = project_users_ref.document(project_user_id).get()
     updated_data = updated_doc.to_dict()
+    invalidate_permissions(updated_data["userRef"].id, updated_data["projectRef"].id)
+    invalidate_project_members(updated_data["projectRef"].id)
     
     # Construct response
     return Project_UsersResponse(
@@ -253,7 +267,9 @@ def delete_project_users_by_project(project_id: str):
         # Eliminar cada relación encontrada
         for doc in project_users_docs:
             project_users_ref.document(doc.id).delete()
+            invalidate_permissions(ref_id((doc.to_dict() or {}).get("userRef")), project_id)
 
+        invalidate_project_members(project_id)
         return {"message": f"{len(project_users_docs)} project-user relations deleted successfully."}
 
     except Exception as err:
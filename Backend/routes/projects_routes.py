@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List
-from firebase import projects_ref, project_users_ref
+from firebase import projects_ref
 from models.projects_model import Projects, ProjectsResponse
+from helpers import PageParams, ndjson_response, wants_ndjson
+from helpers import CascadeError, cascade_pending, project_cascade, run_cascade
+from helpers import AsyncQuery, job_accepted, job_runner
+from routes.app_routes import require_project_permission
 
 router = APIRouter(tags=["Projects"])
 
+# Bit de permiso para borrar un proyecto: de los roles por defecto solo Owner (1023)
+# lo tiene; Admin (510) es la administración "sin poder borrarlo"
+PROJECT_DELETE_BIT = 0
+
 @router.get("/projects", response_model=List[ProjectsResponse])
-def get_projects():
-    projects = projects_ref.stream()
+def get_projects(request: Request, response: Response, page: PageParams = Depends()):
+    projects = page.fetch(projects_ref, response) if page.enabled else projects_ref.stream()
+    if wants_ndjson(request):
+        return ndjson_response((ProjectsResponse(id=project.id, **project.to_dict()) for project in projects), headers=response.headers)
     return [ProjectsResponse(id=project.id, **project.to_dict()) for project in projects]
 
 @router.get("/projects/{project_id}", response_model=ProjectsResponse)
@@ -31,14 +41,22 @@ def update_project(project_id: str, project: Projects):
     project_doc.update(project.dict())
     return ProjectsResponse(id=project_id, **project.dict())
 
-@router.delete("/projects/{project_id}")
-def delete_project(project_id: str):
+@router.delete("/projects/{project_id}", dependencies=[Depends(require_project_permission(PROJECT_DELETE_BIT))])
+def delete_project(project_id: str, run_async: AsyncQuery = False):
     project_doc = projects_ref.document(project_id)
-    if not project_doc.get().exists:
+    if not project_doc.get().exists and not cascade_pending("project", project_id):
         raise HTTPException(status_code=404, detail="Project not found")
-    # Eliminar las relaciones en project_users relacionadas al proyecto
-    project_users_query = project_users_ref.where("projectRef", "==", project_doc).stream()
-    for pu in project_users_query:
-        project_users_ref.document(pu.id).delete()
-    project_doc.delete()
-    return {"message": "Project deleted successfully"}
+    if run_async:
+        job = job_runner.submit(
+            "project_delete",
+            lambda job: run_cascade("project", project_id, project_cascade(project_id), progress=job.progress),
+            params={"project_id": project_id}
+        )
+        return job_accepted(job)
+    # Borra tareas, historias, sprints, bugs, épicas, requerimientos, equipos,
+    # roadmaps, eventos y relaciones; si un borrado anterior quedó a medias, lo retoma
+    try:
+        cascade = run_cascade("project", project_id, project_cascade(project_id))
+    except CascadeError as err:
+        raise HTTPException(status_code=500, detail={"message": "Project deletion incomplete, retry to resume", "cascade": err.state})
+    return {"message": "Project deleted successfully", "cascade": cascade}
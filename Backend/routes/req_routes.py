@@ -1,9 +1,11 @@
 from firebase import db
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List
 from firebase import req_ref, epics_ref, projects_ref
 from firebase_admin import firestore
 from models.req_models import Requirement, RequirementResponse
+from helpers import BulkWriter,bulk_write_response,index_search_document
+from helpers import AsyncQuery,job_accepted,job_runner
 from typing import Optional
 
 router = APIRouter(tags=["Requirements"])
@@ -13,8 +15,19 @@ def create_requirements_batch(
     project_id: str,
     requirements: List[Requirement],
     epic_id: Optional[str] = None,
-    archive_missing: bool = True
+    archive_missing: bool = True,
+    report: bool = Query(False, description="Devolver {results, report} con el resultado de cada escritura"),
+    run_async: AsyncQuery = False
 ):
+    if run_async:
+        # Importaciones grandes: se escriben en segundo plano y el resultado queda en /jobs/{id}
+        job = job_runner.submit(
+            "requirements_batch",
+            lambda job: {"written": [item.id for item in create_requirements_batch(project_id, requirements, epic_id, archive_missing, report=False)]},
+            params={"project_id": project_id, "items": len(requirements)}
+        )
+        return job_accepted(job)
+
     project_ref = projects_ref.document(project_id)
     project = project_ref.get()
     
@@ -39,8 +52,9 @@ def create_requirements_batch(
     }
 
     updated_req_ids = set()
-    batch = db.batch()
+    writer = BulkWriter()
     created_reqs = []
+    indexed = []
 
     for req in requirements:
         if req.projectRef != project_id:
@@ -57,12 +71,14 @@ def create_requirements_batch(
 
         if req.idTitle in existing_reqs:
             ref = existing_reqs[req.idTitle]
-            batch.update(ref, req_dict)
+            writer.update(ref, req_dict)
             created_reqs.append(RequirementResponse(id=ref.id, **req_dict))
+            indexed.append((ref.id, req_dict))
         else:
             new_doc = req_ref.document()
-            batch.set(new_doc, req_dict)
+            writer.set(new_doc, req_dict)
             created_reqs.append(RequirementResponse(id=new_doc.id, **req_dict))
+            indexed.append((new_doc.id, req_dict))
 
         updated_req_ids.add(req.idTitle)
 
@@ -70,13 +86,18 @@ def create_requirements_batch(
     if archive_missing:
         for req_id, ref in existing_reqs.items():
             if req_id not in updated_req_ids:
-                batch.update(ref, {
+                writer.update(ref, {
                     "status": "archived",
                     "lastUpdated": firestore.SERVER_TIMESTAMP
                 })
+                indexed.append((ref.id, {"status": "archived"}))
 
-    batch.commit()
-    return created_reqs
+    # Batches de hasta 500 escrituras, en paralelo y con reintentos
+    outcome = writer.commit()
+    for doc_id, data in indexed:
+        if outcome.ok(doc_id):
+            index_search_document(project_id, "requirement", doc_id, data, merge=True)
+    return bulk_write_response([req for req in created_reqs if outcome.ok(req.id)], outcome, report)
 
 @router.get("/projects/{project_id}/requirements", response_model=List[RequirementResponse])
 def get_project_requirements(
@@ -167,11 +188,13 @@ def upsert_requirement(project_id: str, requirement: Requirement):
         # Actualizar
         req_doc = req_ref.document(existing[0].id)
         req_doc.update(requirement.dict())
+        index_search_document(project_id, "requirement", req_doc.id, requirement.dict(), merge=True)
         return RequirementResponse(id=req_doc.id, **requirement.dict())
     else:
         # Crear nuevo
         new_doc = req_ref.document()
         new_doc.set(requirement.dict())
+        index_search_document(project_id, "requirement", new_doc.id, requirement.dict())
         return RequirementResponse(id=new_doc.id, **requirement.dict())
 
 
@@ -190,4 +213,5 @@ def delete_requirement(
         raise HTTPException(status_code=404, detail="Requirement not found")
     
     req_ref.document(req_list[0].id).delete()
+    index_search_document(project_id, "requirement", req_list[0].id, None)
     return {"message": "Requirement deleted successfully"}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from firebase_admin import firestore
 from firebase import db, roadmap_ref
 from models.roadmap_model import (
@@ -10,6 +10,7 @@ from models.roadmap_model import (
     RoadmapPhase
 )
 from typing import List, Optional
+from helpers import not_modified, request_variant, versions_etag
 from datetime import datetime
 import uuid
 
@@ -48,12 +49,42 @@ def resolve_roadmap_phases(roadmap_data: dict) -> List[RoadmapPhase]:
     
     return [RoadmapPhase(**phase) if isinstance(phase, dict) else phase for phase in phases]
 
+def roadmaps_etag(query, variant: str) -> str:
+    """
+    ETag de los roadmaps de la consulta. Las copias sin modificar muestran las
+    phases de su roadmap origen, así que su update_time también cuenta.
+    """
+    docs = list(query.select(["sourceRoadmapId", "isDuplicate", "isModified"]).stream())
+    versions = [(doc.id, doc.update_time) for doc in docs]
+
+    source_ids = set()
+    for doc in docs:
+        data = doc.to_dict() or {}
+        if data.get("isDuplicate", False) and not data.get("isModified", True) and data.get("sourceRoadmapId"):
+            source_ids.add(data["sourceRoadmapId"])
+
+    if source_ids:
+        refs = [roadmap_ref.document(source_id) for source_id in source_ids]
+        versions.extend(
+            (f"source:{doc.id}", doc.update_time if doc.exists else None)
+            for doc in db.get_all(refs, field_paths=[])
+        )
+    return versions_etag(versions, variant)
+
 @router.get("/projects/{project_id}/roadmaps", response_model=List[RoadmapResponse])
-async def get_roadmaps_from_project(project_id: str):
+def get_roadmaps_from_project(project_id: str, request: Request, response: Response):
     """Obtiene todos los roadmaps de un proyecto"""
     try:
         # Buscar roadmaps por projectId (ajusta el campo según tu esquema)
         query = roadmap_ref.where("projectId", "==", project_id)
+
+        # Si el cliente ya tiene esta versión, 304 sin resolver phases ni serializar
+        etag = roadmaps_etag(query, request_variant(request))
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        response.headers["ETag"] = etag
+
         roadmaps = query.stream()
         
         result = []
@@ -93,7 +124,7 @@ async def get_roadmaps_from_project(project_id: str):
         )
 
 @router.post("/projects/roadmaps", response_model=RoadmapResponse)
-async def create_roadmap(roadmap_data: RoadmapCreate):
+def create_roadmap(roadmap_data: RoadmapCreate):
     """Crea un nuevo roadmap"""
     try:
         
@@ -156,7 +187,7 @@ async def create_roadmap(roadmap_data: RoadmapCreate):
         )
 
 @router.put("/projects/roadmaps/{roadmap_id}", response_model=RoadmapResponse)
-async def update_roadmap(roadmap_id: str, roadmap_data: RoadmapUpdate):
+def update_roadmap(roadmap_id: str, roadmap_data: RoadmapUpdate):
     """Actualiza un roadmap existente"""
     try:
         existing_roadmap = get_roadmap_by_id(roadmap_id)
@@ -222,7 +253,7 @@ async def update_roadmap(roadmap_id: str, roadmap_data: RoadmapUpdate):
         )
 
 @router.delete("/projects/roadmaps/{roadmap_id}")
-async def remove_roadmap_from_project(roadmap_id: str):
+def remove_roadmap_from_project(roadmap_id: str):
     """Elimina un roadmap"""
     try:
         # Verificar que el roadmap existe
@@ -256,7 +287,7 @@ async def remove_roadmap_from_project(roadmap_id: str):
         )
 
 @router.get("/projects/{project_id}/roadmaps/summary", response_model=List[RoadmapSummary])
-async def get_roadmaps_summary(project_id: str):
+def get_roadmaps_summary(project_id: str):
     """Obtiene un resumen de los roadmaps de un proyecto (para listas)"""
     try:
         query = roadmap_ref.where("projectId", "==", project_id)
@@ -292,7 +323,7 @@ async def get_roadmaps_summary(project_id: str):
         )
 
 @router.get("/roadmaps/{roadmap_id}", response_model=RoadmapResponse)
-async def get_roadmap_by_id_endpoint(roadmap_id: str):
+def get_roadmap_by_id_endpoint(roadmap_id: str):
     """Obtiene un roadmap específico por ID"""
     try:
         roadmap_data = get_roadmap_by_id(roadmap_id)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from firebase import projects_ref
+from models.search_model import SearchResponse
+from helpers import SEARCH_ENTITIES, get_project_search_index
+
+router = APIRouter(tags=["Search"])
+
+@router.get("/projects/{project_id}/search", response_model=SearchResponse)
+def search_project(
+    project_id: str,
+    q: str = Query(..., min_length=1, description="Términos de búsqueda"),
+    type: Optional[List[str]] = Query(None, description="Filtrar por tipo: task, bug, userstory, epic, requirement"),
+    status: Optional[List[str]] = Query(None, description="Filtrar por status_khanban"),
+    limit: int = Query(20, ge=1, le=100, description="Máximo de resultados")
+):
+    unknown = set(type or ()) - set(SEARCH_ENTITIES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown type: {', '.join(sorted(unknown))}")
+
+    if not projects_ref.document(project_id).get().exists:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Índice invertido del proyecto; se construye en la primera búsqueda
+    index = get_project_search_index(project_id)
+    return SearchResponse(query=q, **index.search(q, limit=limit, types=type, statuses=status))
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-from firebase_admin import firestore
+from firebase import db
+from helpers import get_sprint_task_docs
+from helpers import get_project_sprint_stats, rebuild_sprint_stats, parse_firestore_date
+from helpers import completed_per_day, cumulative, get_burndown_snapshots, recorded_remaining
+from helpers import add_rolling_series, get_project_velocity
+from helpers import AsyncQuery, job_accepted, job_runner
 from datetime import datetime, timezone, timedelta
 from models.task_model import GraphicsRequest
 
 router = APIRouter(tags=["Sprint Details"])
-db = firestore.client()
 
 def to_date(date_time):
     return date_time.date() if date_time else None
@@ -15,31 +19,9 @@ def get_value(obj, key, default=None):
         return obj.get(key, default)
     return getattr(obj, key, default)
 
-def parse_firestore_date(date_value):
-    if isinstance(date_value, str):
-        try:
-            date_value = date_value.replace("Z", "+00:00")
-            dt = datetime.fromisoformat(date_value)
-        except Exception:
-            return None
-    elif isinstance(date_value, datetime):
-        dt = date_value
-    elif hasattr(date_value, "timestamp"):
-        dt = datetime.fromtimestamp(date_value.timestamp())
-    elif hasattr(date_value, "seconds") and hasattr(date_value, "nanos"):
-        dt = datetime.fromtimestamp(date_value.seconds + date_value.nanos / 1e9)
-    else:
-        return None
-
-    # Asegurar que el datetime tenga zona horaria UTC
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-
-    return dt
-
 
 @router.get("/api/sprints/comparison", response_model=list)
-async def get_sprint_comparison(projectId: str):
+def get_sprint_comparison(projectId: str, run_async: AsyncQuery = False):
     """
     Obtiene la comparación de sprints para un proyecto, incluyendo:
     - Sprint actual (basado en fechas)
@@ -48,6 +30,8 @@ async def get_sprint_comparison(projectId: str):
     - Risk assessment
     - Quality metrics
     """
+    if run_async:
+        return job_accepted(job_runner.submit("sprint_comparison", lambda job: get_sprint_comparison(projectId), params={"projectId": projectId}))
     try:
         now = datetime.now(timezone.utc)
         
@@ -82,44 +66,25 @@ async def get_sprint_comparison(projectId: str):
 
         # 4. Procesar cada sprint para la comparación
         comparison_data = []
-        tasks_ref = db.collection("tasks")
-        bugs_ref = db.collection("bugs")
+
+        # Estadísticas materializadas (sprint_stats) de todos los sprints en una consulta
+        stats_by_sprint = get_project_sprint_stats(projectId)
         
         for sprint in sprints:
             # Saltar sprints futuros que no son el activo
             if sprint["end_date"] > now and sprint["id"] != active_sprint["id"]:
                 continue
 
-            # Obtener tareas del sprint
-            tasks = [
-                t.to_dict() for t in 
-                tasks_ref\
-                .where("sprint_id", "==", sprint["id"])\
-                .select(["story_points", "status_khanban", "created_at"])\
-                .stream()
-            ]
-
-            # Obtener bugs del sprint
-            bugs = [
-                b.to_dict() for b in 
-                bugs_ref\
-                .where("sprintId", "==", sprint["id"])\
-                .select(["severity"])\
-                .stream()
-            ]
-            total_bugs = len(bugs)
-
-            # Calcular métricas básicas
-            total_sp = sum(t.get("story_points", 0) for t in tasks)
-            completed_sp = sum(
-                t.get("story_points", 0) for t in tasks 
-                if t.get("status_khanban") == "Done"
-            )
-            
-            scope_changes = sum(
-                1 for t in tasks 
-                if parse_firestore_date(t.get("created_at")) > sprint["start_date"]
-            )
+            # Sin estadísticas completas todavía: se calculan una vez y quedan guardadas
+            stats = stats_by_sprint.get(sprint["id"])
+            if not stats or not stats.get("initialized"):
+                stats = rebuild_sprint_stats(projectId, sprint["id"], sprint["start_date"])
+
+            # Métricas básicas
+            total_sp = stats.get("total_story_points", 0)
+            completed_sp = stats.get("completed_story_points", 0)
+            scope_changes = stats.get("scope_changes", 0)
+            total_bugs = stats.get("bugs_total", 0)
 
             # Calcular días transcurridos en el sprint
             days_elapsed = (now - sprint["start_date"]).days if sprint["id"] == active_sprint["id"] else (sprint["end_date"] - sprint["start_date"]).days
@@ -149,6 +114,7 @@ async def get_sprint_comparison(projectId: str):
                 ),
                 "scope_changes": scope_changes,
                 "bugs_found": total_bugs,
+                "bugs_by_severity": {k: v for k, v in (stats.get("bugs_by_severity") or {}).items() if v},
                 "risk_assessment": risk_assessment,
                 "velocity": velocity,
                 "average_velocity": average_velocity,
@@ -172,14 +138,19 @@ async def get_sprint_comparison(projectId: str):
     
 
 @router.post("/api/burndown")
-async def get_burndown_data(payload: GraphicsRequest):
+def get_burndown_data(payload: GraphicsRequest, run_async: AsyncQuery = False):
+    if run_async:
+        return job_accepted(job_runner.submit("burndown", lambda job: get_burndown_data(payload), params={"projectId": payload.projectId}))
     project_id = payload.projectId
     tasks = payload.tasks or []
+    tasks_from_payload = bool(tasks)
 
     now = datetime.now(timezone.utc).date()
 
-    # Obtener el sprint activo
-    sprints_ref = db.collection("sprints").where("project_id", "==", project_id)
+    # Obtener el sprint activo (solo se descargan nombre y fechas)
+    sprints_ref = db.collection("sprints")\
+        .where("project_id", "==", project_id)\
+        .select(["name", "start_date", "end_date"])
     active_sprint = None
     
     for doc in sprints_ref.stream():
@@ -200,19 +171,15 @@ async def get_burndown_data(payload: GraphicsRequest):
 
     # Obtener todas las tareas del sprint
     if not tasks:
-        tasks_query = db.collection("tasks").where("sprint_id", "==", active_sprint["id"])
-        tasks = [t.to_dict() for t in tasks_query.stream()]
+        tasks = [t for _, t in get_sprint_task_docs(project_id, active_sprint["id"])]
 
     # Procesar datos para el burndown
     total_sp = sum(get_value(t, "story_points", 0) for t in tasks)
 
-    sprint_days = (active_sprint["end_date"] - active_sprint["start_date"]).days + 1
-    
-    # Calcular progreso diario
-    daily_progress = []
-    current_date = active_sprint["start_date"]
+    start = active_sprint["start_date"]
+    sprint_days = (active_sprint["end_date"] - start).days + 1
     
-    # Obtener fechas de completado de tareas
+    # Fechas de completado de tareas
     task_completion_dates = []
     for task in tasks:
         if get_value(task, "status_khanban", "").lower() == "done":
@@ -220,44 +187,47 @@ async def get_burndown_data(payload: GraphicsRequest):
                 get_value(task, "date_completed") or get_value(task, "date_modified")
             )
             if completed_at:
-                task_completion_dates.append({
-                    "date": completed_at.date(),
-                    "sp": get_value(task, "story_points", 0)
-                })
+                task_completion_dates.append((completed_at.date(), get_value(task, "story_points", 0)))
 
-    # Calcular SP completados por día
-    sp_completed_per_day = {}
-    for day in range(sprint_days):
-        current_date = active_sprint["start_date"] + timedelta(days=day)
-        sp_completed = sum(
-            t["sp"] for t in task_completion_dates 
-            if t["date"] == current_date
-        )
-        sp_completed_per_day[current_date] = sp_completed
+    # SP completados por día (cubetas) y su suma acumulada: O(días + tareas)
+    completed_daily = completed_per_day(start, sprint_days, task_completion_dates)
+    completed_cumulative = cumulative(completed_daily)
+
+    # Historial real: SP restante registrado en cada escritura de tareas del sprint
+    recorded = [None] * sprint_days
+    if not tasks_from_payload:
+        recorded = recorded_remaining(start, sprint_days, now, get_burndown_snapshots(active_sprint["id"]))
 
     # Generar datos para el chart
     chart_data = []
-    cumulative_completed = 0
     ideal_drop_per_day = total_sp / (sprint_days - 1) if sprint_days > 1 else total_sp
     
+    today_remaining = None
     for day in range(sprint_days):
-        current_date = active_sprint["start_date"] + timedelta(days=day)
-        day_label = f"Day {day+1}"
-        
-        # Calcular completado acumulado
-        daily_completed = sp_completed_per_day.get(current_date, 0)
-        cumulative_completed += daily_completed
+        current_date = start + timedelta(days=day)
         
-        remaining = max(total_sp - cumulative_completed, 0)
+        # Reconstruido desde date_completed salvo que haya un registro del día;
+        # los días futuros repiten el valor de hoy
+        reconstructed = max(total_sp - completed_cumulative[day], 0)
+        if recorded[day] is not None:
+            remaining = recorded[day]
+        elif current_date > now and today_remaining is not None:
+            remaining = today_remaining
+        else:
+            remaining = reconstructed
+        if current_date <= now:
+            today_remaining = remaining
         ideal = max(total_sp - (ideal_drop_per_day * day), 0)
         
         chart_data.append({
-            "day": day_label,
+            "day": f"Day {day+1}",
             "date": current_date.isoformat(),
             "Remaining": remaining,
+            "RemainingReconstructed": reconstructed,
+            "Recorded": recorded[day] is not None,
             "Ideal": round(ideal, 2),
-            "Completed": daily_completed,
-            "CompletedCumulative": cumulative_completed
+            "Completed": completed_daily[day],
+            "CompletedCumulative": completed_cumulative[day]
         })
 
     return {
@@ -273,28 +243,16 @@ async def get_burndown_data(payload: GraphicsRequest):
 
 
 @router.post("/api/velocitytrend")
-async def get_velocity_trend(payload: GraphicsRequest):
+def get_velocity_trend(payload: GraphicsRequest, run_async: AsyncQuery = False):
+    if run_async:
+        return job_accepted(job_runner.submit("velocity_trend", lambda job: get_velocity_trend(payload), params={"projectId": payload.projectId}))
     projectId = payload.projectId
     tasks_from_payload = payload.tasks or []
 
     now = datetime.now(timezone.utc)
-    
-    # 1. Obtener todos los sprints del proyecto y parsear fechas
-    sprints_snapshots = db.collection("sprints").where("project_id", "==", projectId).stream()
-    sprints_data = []
-    
-    for snap in sprints_snapshots:
-        data = snap.to_dict()
-        data["id"] = snap.id
-        
-        # Parsear fechas
-        data["start_date"] = parse_firestore_date(data.get("start_date"))
-        data["end_date"] = parse_firestore_date(data.get("end_date"))
-        
-        if not data["start_date"] or not data["end_date"]:
-            continue
-            
-        sprints_data.append(data)
+
+    # 1. Planned/Actual por sprint desde la caché de velocidad (sprint_stats, sin leer tareas)
+    sprints_data = get_project_velocity(projectId)
 
     if not sprints_data:
         return {"error": "No sprints found for this project"}
@@ -312,18 +270,19 @@ async def get_velocity_trend(payload: GraphicsRequest):
     # 4. Preparar estructura para velocity
     velocity = {
         sprint["id"]: {
-            "Planned": 0,
-            "Actual": 0,
-            "sprint": sprint.get("name") or f"Sprint {sprint.get('number', sprint['id'][:6])}",
+            "Planned": sprint["Planned"],
+            "Actual": sprint["Actual"],
+            "sprint": sprint.get("name") or f"Sprint {sprint.get('number') or sprint['id'][:6]}",
             "start_date": sprint["start_date"].isoformat(),
             "end_date": sprint["end_date"].isoformat()
         }
         for sprint in filtered_sprints
     }
 
-    # 5. Procesar tareas
+    # 5. Las tareas recibidas desde el frontend reemplazan los totales guardados
     if tasks_from_payload:
-        # Procesar las tareas recibidas desde el frontend
+        for entry in velocity.values():
+            entry["Planned"] = entry["Actual"] = 0
         for task in tasks_from_payload:
             sprint_id = task.sprint_id
             if sprint_id in velocity:
@@ -331,21 +290,9 @@ async def get_velocity_trend(payload: GraphicsRequest):
                 velocity[sprint_id]["Planned"] += sp
                 if task.status_khanban and task.status_khanban.strip().lower() == "done":
                     velocity[sprint_id]["Actual"] += sp
-    else:
-        # Obtener tareas desde Firestore si no se proporcionaron
-        tasks_snapshots = db.collection("tasks").where("project_id", "==", projectId).stream()
-        for snap in tasks_snapshots:
-            data = snap.to_dict()
-            sprint_id = data.get("sprint_id")
-            if sprint_id in velocity:
-                sp = data.get("story_points", 0)
-                if isinstance(sp, int):
-                    velocity[sprint_id]["Planned"] += sp
-                    if data.get("status_khanban", "").strip().lower() == "done":
-                        velocity[sprint_id]["Actual"] += sp
 
-    # Convertir a lista ordenada por fecha
+    # Convertir a lista ordenada por fecha, con promedio móvil y desviación estándar
     velocity_list = list(velocity.values())
     velocity_list.sort(key=lambda x: x["start_date"])
 
-    return velocity_list
\ No newline at end of file
+    return add_rolling_series(velocity_list)
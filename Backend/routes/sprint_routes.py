@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException,Body
-from typing import List
+from fastapi import APIRouter, HTTPException,Body,Query,Request,Response
+from typing import List, Optional
 from datetime import datetime
 from firebase import projects_ref, sprints_ref, db
 from models.sprint_model import SprintFormData, SprintResponse
+from helpers import parse_fields,sparse_response
+from helpers import not_modified,query_versions,request_variant,versions_etag
+from helpers import rebuild_sprint_stats,delete_sprint_stats,parse_firestore_date,invalidate_velocity
 
 router = APIRouter(
     prefix="/projects/{project_id}/sprints",
@@ -34,6 +37,7 @@ def create_sprint(
     # 3) Creamos el documento en batch o directo
     new_ref = sprints_ref.document()
     new_ref.set(data)
+    invalidate_velocity(project_id)
 
     # 4) Recuperamos lo que acabamos de escribir
     raw = new_ref.get().to_dict() or {}
@@ -86,12 +90,35 @@ def get_sprint(
     "",
     response_model=List[SprintResponse],
 )
-def list_sprints(project_id: str):
+def list_sprints(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma")
+):
+    selected = parse_fields(fields, SprintResponse)
     try:
-        query = sprints_ref.where("project_id", "==", project_id).stream()
+        query = sprints_ref.where("project_id", "==", project_id)
+
+        # Si el cliente ya tiene esta versión, 304 sin leer ni serializar los sprints
+        etag = versions_etag(query_versions(query), request_variant(request))
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        response.headers["ETag"] = etag
+
+        if selected is not None:
+            # Con proyección pueden faltar campos obligatorios: se arma sin validar
+            query = query.select(selected)
+            return sparse_response(
+                [SprintResponse.model_construct(id=doc.id, **(doc.to_dict() or {})) for doc in query.stream()],
+                selected,
+                response.headers
+            )
+
         results = []
 
-        for doc in query:
+        for doc in query.stream():
             raw = doc.to_dict() or {}
             results.append(SprintResponse(
                 id=doc.id,
@@ -131,9 +158,14 @@ def update_sprint(
     data["updated_at"] = now.isoformat()
 
     doc_ref.update(data)
+    invalidate_velocity(project_id)
 
     # 3) Obtener el documento actualizado
     updated = doc_ref.get().to_dict() or {}
+
+    # Los cambios de scope en sprint_stats dependen de la fecha de inicio
+    if updated.get("start_date") != (doc.to_dict() or {}).get("start_date"):
+        rebuild_sprint_stats(project_id, sprint_id, parse_firestore_date(updated.get("start_date")))
     proj_id = updated.pop("project_id")
     created_at = updated.pop("created_at")
     updated_at = updated.pop("updated_at")
@@ -162,3 +194,5 @@ def delete_sprint(
         raise HTTPException(404, "Sprint not found")
 
     doc_ref.delete()
+    delete_sprint_stats(sprint_id)
+    invalidate_velocity(project_id)
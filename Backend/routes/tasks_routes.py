@@ -1,20 +1,28 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import List, Optional,Dict,Set,Any,Tuple
-from firebase import db, projects_ref, userstories_ref, sprints_ref, tasks_ref
+from firebase import projects_ref, userstories_ref, sprints_ref, tasks_ref
 from firebase_admin import firestore
-from models.task_model import TaskFormData, TaskResponse,StatusUpdate,TaskPartialKhabanResponse
+from models.task_model import TaskFormData, TaskResponse,StatusUpdate,TaskPartialKhabanResponse,Comment
 from datetime import datetime
 from helpers import add_task_to_user_story,remove_task_from_user_story,sync_task_in_sprint
+from helpers import get_project_tasks_snapshot,peek_project_tasks_snapshot,invalidate_project_tasks,project_tasks_cache
+from helpers import project_tasks_etag,not_modified,query_versions,request_variant,versions_etag
+from helpers import index_search_document,record_task_change,record_task_changes
+from helpers import get_user_story_points as user_story_points,story_points_drift
+from helpers import parse_fields,sparse_response,PageParams,NEXT_CURSOR_HEADER,ndjson_response,wants_ndjson
+from helpers import TRUSTED_READS,fast_json_response
+from helpers import BulkWriter,bulk_write_response
+from helpers import AsyncQuery,job_accepted,job_runner
 
 router = APIRouter(tags=["Tasks"])
 
 def safe_iso(dt):
+    if isinstance(dt, str):
+        return dt
     if isinstance(dt, datetime):
         return dt.isoformat()
     if hasattr(dt, "isoformat"):
         return dt.isoformat()
-    if isinstance(dt, str):
-        return dt
     return ""
 
 def convert_assignee_format(data: Dict[str, Any]) -> List[Tuple[str, str]]:
@@ -39,8 +47,19 @@ def convert_assignee_format(data: Dict[str, Any]) -> List[Tuple[str, str]]:
 def batch_upsert_tasks(
     project_id: str,
     tasks: List[TaskFormData],
-    archive_missing: bool = False
+    archive_missing: bool = False,
+    report: bool = Query(False, description="Devolver {results, report} con el resultado de cada escritura"),
+    run_async: AsyncQuery = False
 ):
+    if run_async:
+        # Importaciones grandes: se escriben en segundo plano y el resultado queda en /jobs/{id}
+        job = job_runner.submit(
+            "tasks_batch",
+            lambda job: {"written": [item.id for item in batch_upsert_tasks(project_id, tasks, archive_missing, report=False)]},
+            params={"project_id": project_id, "items": len(tasks)}
+        )
+        return job_accepted(job)
+
     # 1️⃣ Verificar que el proyecto exista
     if not projects_ref.document(project_id).get().exists:
         raise HTTPException(status_code=404, detail="Project not found") 
@@ -56,11 +75,12 @@ def batch_upsert_tasks(
 
     # 3️⃣ Buscar las tareas que ya están en Firestore
     existing: Dict[str, any] = {
-        doc.id: doc.reference
+        doc.id: doc
         for doc in tasks_ref.where("project_id", "==", project_id).stream()
     }
+    changes = []
 
-    batch     = db.batch()
+    writer    = BulkWriter()
     seen_ids: Set[str] = set()
     now_iso   = datetime.utcnow().isoformat()
     output:   List[TaskResponse] = []
@@ -91,13 +111,16 @@ def batch_upsert_tasks(
         # 6️⃣ Decide si ACTUALIZA o CREA
         if t.id in existing:
             # actualizar campos en doc existente
-            ref = existing[t.id]
-            batch.update(ref, data)
+            ref = existing[t.id].reference
+            writer.update(ref, data)
+            old = existing[t.id].to_dict()
+            changes.append((t.id, old, {**old, **data}))
         else:
             # crea uno nuevo con el mismo ID
             data["created_at"] = now_iso
             ref = tasks_ref.document(t.id)
-            batch.set(ref, data)
+            writer.set(ref, data)
+            changes.append((t.id, None, data))
 
         seen_ids.add(t.id)
 
@@ -133,14 +156,147 @@ def batch_upsert_tasks(
 
     # Archivar las que ya no vienen en el payload
     if archive_missing:
-        for tid, ref in existing.items():
+        for tid, doc in existing.items():
             if tid not in seen_ids:
-                batch.update(ref, {
+                archived = {
                     "status_khanban": "Done",
                     "updated_at":     datetime.utcnow().isoformat()
-                })
+                }
+                writer.update(doc.reference, archived)
+                old = doc.to_dict()
+                changes.append((tid, old, {**old, **archived}))
 
-    batch.commit()
+    # Batches de hasta 500 escrituras, en paralelo y con reintentos
+    outcome = writer.commit()
+    record_task_changes(project_id, [change for change in changes if outcome.ok(change[0])])
+    return bulk_write_response([task for task in output if outcome.ok(task.id)], outcome, report)
+
+def _task_response(task_id: str, raw: Dict[str, Any]) -> TaskResponse:
+    return TaskResponse(
+        id=task_id,
+        title=raw.get("title", ""),
+        description=raw.get("description", ""),
+        user_story_id=raw.get("user_story_id", ""),
+        user_story_title=raw.get("user_story_title"),
+        assignee=convert_assignee_format(raw),
+        sprint_id=raw.get("sprint_id"),
+        sprint_name=raw.get("sprint_name"),
+        status_khanban=raw.get("status_khanban", "Backlog"),
+        priority=raw.get("priority", "Medium"),
+        story_points=raw.get("story_points", 0),
+        deadline=raw.get("deadline"),
+        comments=raw.get("comments", []),
+        created_at= safe_iso(raw.get("created_at")),
+        updated_at= safe_iso(raw.get("updated_at")),
+        created_by= tuple(raw.get("created_by") or ["", ""]),
+        modified_by= tuple(raw.get("modified_by") or ["", ""]),
+        finished_by= tuple(raw.get("finished_by") or ["", ""]),
+        date_created= safe_iso(raw.get("date_created")),
+        date_modified= safe_iso(raw.get("date_modified")),
+        date_completed= safe_iso(raw.get("date_completed")),
+    )
+
+_COMMENT_FIELDS = tuple(Comment.model_fields)
+_COMMENT_KEYS = set(_COMMENT_FIELDS)
+
+def _task_dict(task_id: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Lectura de confianza: la misma forma que _task_response(...).model_dump(),
+    armada directamente desde los datos de Firestore sin validar.
+    """
+    return {
+        "id": task_id,
+        "title": raw.get("title", ""),
+        "description": raw.get("description", ""),
+        "user_story_id": raw.get("user_story_id", ""),
+        "assignee": convert_assignee_format(raw),
+        "sprint_id": raw.get("sprint_id"),
+        "status_khanban": raw.get("status_khanban", "Backlog"),
+        "priority": raw.get("priority", "Medium"),
+        "story_points": raw.get("story_points", 0),
+        "deadline": raw.get("deadline"),
+        "comments": [
+            comment if comment.keys() == _COMMENT_KEYS
+            else {field: comment.get(field) for field in _COMMENT_FIELDS}
+            for comment in raw.get("comments") or []
+        ],
+        "created_by": tuple(raw.get("created_by") or ["", ""]),
+        "modified_by": tuple(raw.get("modified_by") or ["", ""]),
+        "finished_by": tuple(raw.get("finished_by") or ["", ""]),
+        "date_created": safe_iso(raw.get("date_created")),
+        "date_modified": safe_iso(raw.get("date_modified")),
+        "date_completed": safe_iso(raw.get("date_completed")),
+        "user_story_title": raw.get("user_story_title"),
+        "assignee_id": [],
+        "sprint_name": raw.get("sprint_name"),
+        "created_at": safe_iso(raw.get("created_at")),
+        "updated_at": safe_iso(raw.get("updated_at")),
+    }
+
+def _list_project_tasks(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str],
+    page: PageParams,
+    model
+):
+    selected = parse_fields(fields, model)
+    stream = wants_ndjson(request)
+
+    # 1) Validar que el proyecto exista
+    if not projects_ref.document(project_id).get().exists:
+        raise HTTPException(404, "Project not found")
+
+    # 2) Recuperar los documentos. El ETag sale siempre de lo mismo que el cuerpo.
+    snapshot = peek_project_tasks_snapshot(project_id)
+    if snapshot is None and selected is None and not page.enabled and not stream:
+        # Lista completa: se carga una vez y queda en caché
+        snapshot = get_project_tasks_snapshot(project_id)
+    if snapshot is not None:
+        # Caché o vista en vivo: se corta en memoria
+        docs = page.slice(snapshot.docs, response) if page.enabled else snapshot.docs
+        etag = project_tasks_etag(snapshot, request_variant(request))
+    else:
+        # Fallo de caché: solo los campos pedidos, solo la página, o en streaming
+        query = tasks_ref.where("project_id", "==", project_id)
+        if selected is not None:
+            query = query.select(selected)
+        if stream:
+            # NDJSON envía cada documento conforme llega: el ETag va antes, con una consulta de solo llaves
+            etag = versions_etag(query_versions(query), request_variant(request))
+            docs = ((doc.id, doc.to_dict() or {}) for doc in query.stream())
+        else:
+            found = page.fetch(query, response) if page.enabled else list(query.stream())
+            docs = [(doc.id, doc.to_dict() or {}) for doc in found]
+            # El cursor siguiente también es parte de la respuesta
+            variant = request_variant(request) + response.headers.get(NEXT_CURSOR_HEADER, "")
+            etag = versions_etag(((doc.id, doc.update_time) for doc in found), variant)
+
+    # 3) Si el cliente ya tiene esta versión, 304 sin serializar la lista
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+
+    # Al devolver una Response no se aplica response_model: se recorta aquí a sus campos
+    if selected is None and model is not TaskResponse:
+        selected = [f for f in model.model_fields if f != "id"]
+
+    # 4) Serializar: dicts de confianza + orjson, o modelos validados
+    if TRUSTED_READS:
+        tasks = (_task_dict(task_id, raw) for task_id, raw in docs)
+    else:
+        tasks = (_task_response(task_id, raw) for task_id, raw in docs)
+
+    if stream:
+        return ndjson_response(tasks, selected, response.headers)
+    if TRUSTED_READS:
+        return fast_json_response(tasks, selected, response.headers)
+
+    output: List[TaskResponse] = list(tasks)
+    if selected is not None:
+        return sparse_response(output, selected, response.headers)
     return output
 
 # 2) Listar todas las tasks de un proyecto
@@ -148,51 +304,27 @@ def batch_upsert_tasks(
     "/projects/{project_id}/tasks",
     response_model=List[TaskResponse]
 )
+def get_project_tasks(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma"),
+    page: PageParams = Depends()
+):
+    return _list_project_tasks(project_id, request, response, fields, page, TaskResponse)
 
 @router.get(
     "/projects/{project_id}/tasks/khanban",
     response_model=List[TaskFormData]
 )
-def get_project_tasks(project_id: str):
-    # 1) Validar que el proyecto exista
-    if not projects_ref.document(project_id).get().exists:
-        raise HTTPException(404, "Project not found")
-
-    # 2) Recuperar los documentos de Firestore
-    docs = tasks_ref.where("project_id", "==", project_id).stream()
-    output: List[TaskResponse] = []
-
-    for d in docs:
-        raw = d.to_dict() or {}
-        
-        # Convertir el formato de assignee
-        assigned_users = convert_assignee_format(raw)
-        
-        output.append(TaskResponse(
-            id=d.id,
-            title=raw.get("title", ""),
-            description=raw.get("description", ""),
-            user_story_id=raw.get("user_story_id", ""),
-            user_story_title=raw.get("user_story_title"),
-            assignee=assigned_users,
-            sprint_id=raw.get("sprint_id"),
-            sprint_name=raw.get("sprint_name"),
-            status_khanban=raw.get("status_khanban", "Backlog"),
-            priority=raw.get("priority", "Medium"),
-            story_points=raw.get("story_points", 0),
-            deadline=raw.get("deadline"),
-            comments=raw.get("comments", []),
-            created_at= safe_iso(raw.get("created_at")),
-            updated_at= safe_iso(raw.get("updated_at")),
-            created_by= tuple(raw.get("created_by", ["", ""])),
-            modified_by= tuple(raw.get("modified_by", ["", ""])),
-            finished_by= tuple(raw.get("finished_by", ["", ""])),
-            date_created= safe_iso(raw.get("date_created")),
-            date_modified= safe_iso(raw.get("date_modified")),
-            date_completed= safe_iso(raw.get("date_completed")),
-        ))
-
-    return output
+def get_project_tasks_khanban(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma"),
+    page: PageParams = Depends()
+):
+    return _list_project_tasks(project_id, request, response, fields, page, TaskFormData)
 
 
 # 3) Obtener una task por su ID
@@ -255,19 +387,41 @@ def get_tasks_by_story(project_id: str, user_story_id: str):
     "/projects/{project_id}/tasks_partial",
     response_model=List[TaskPartialKhabanResponse]
 )
-def get_tasks_partialdata(project_id: str):
+def get_tasks_partialdata(
+    project_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma")
+):
+    selected = parse_fields(fields, TaskPartialKhabanResponse)
+
     if not projects_ref.document(project_id).get().exists:
         raise HTTPException(404, "Project not found")
 
-    docs = tasks_ref.where("project_id", "==", project_id).stream()
+    snapshot = peek_project_tasks_snapshot(project_id)
+    if snapshot is not None:
+        docs = snapshot.docs
+        etag = project_tasks_etag(snapshot, request_variant(request))
+    else:
+        # Solo se descargan los campos del tablero (sin comments ni description)
+        partial_fields = [
+            f for f in TaskPartialKhabanResponse.model_fields if f != "id"
+        ]
+        query = tasks_ref.where("project_id", "==", project_id).select(selected or partial_fields)
+        found = list(query.stream())
+        docs = [(doc.id, doc.to_dict() or {}) for doc in found]
+        etag = versions_etag(((doc.id, doc.update_time) for doc in found), request_variant(request))
+
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
 
     result = []
 
-    for d in docs:
-        doc = d.to_dict() or {}
-
+    for task_id, doc in docs:
         result.append(TaskPartialKhabanResponse(
-            id=d.id,
+            id=task_id,
             user_story_title=doc.get("user_story_title"),
             assignee_id=doc.get("assignee_id", []),
             sprint_name=doc.get("sprint_name"),
@@ -275,6 +429,8 @@ def get_tasks_partialdata(project_id: str):
             updated_at= safe_iso(doc.get("updated_at")),
         ))
 
+    if selected is not None:
+        return sparse_response(result, selected, response.headers)
     return result 
 
 # 5) Listar tasks de un sprint
@@ -343,6 +499,7 @@ def upsert_task(project_id: str, t: TaskFormData):
     
     # Obtener el documento recién creado
     doc = new_ref.get().to_dict() or {}
+    record_task_change(project_id, new_ref.id, None, doc)
     
     # Convertir assignee para la respuesta
     assigned_users = convert_assignee_format(doc)
@@ -417,6 +574,7 @@ def update_task(project_id: str, task_id: str, t: TaskFormData):
     ref.update(data)
 
     updated = ref.get().to_dict() or {}
+    record_task_change(project_id, task_id, old_task, dict(updated))
 
     # Convertir updated_at a string si es necesario
     if 'updated_at' in updated and hasattr(updated['updated_at'], 'isoformat'):
@@ -478,6 +636,7 @@ def delete_task(project_id: str, task_id: str):
         )
 
     ref.delete()
+    record_task_change(project_id, task_id, task_data, None)
     return {"message": "Task deleted successfully"}
 
 
@@ -492,6 +651,9 @@ def add_comment(project_id: str, task_id: str, comment: dict):
 
     comment["timestamp"] = datetime.utcnow().isoformat()
     ref.update({ "comments": firestore.ArrayUnion([comment]) })
+    invalidate_project_tasks(project_id)
+    data = snap.to_dict()
+    index_search_document(project_id, "task", task_id, {**data, "comments": [*data.get("comments", []), comment]})
 
     return { "message": "Comment added successfully" }
 
@@ -506,6 +668,8 @@ def delete_comment(project_id: str, task_id: str, comment_id: str):
     data = doc.to_dict()
     updated_comments = [c for c in data.get("comments", []) if c["id"] != comment_id]
     doc_ref.update({"comments": updated_comments})
+    invalidate_project_tasks(project_id)
+    index_search_document(project_id, "task", task_id, {**data, "comments": updated_comments})
     return {"message": "Comment deleted"}
 
 
@@ -522,23 +686,26 @@ def update_task_status(project_id: str, task_id: str, payload: StatusUpdate):
     tasks_ref.document(task_id).update({
         "status_khanban": payload.status_khanban 
     })
+    old = task_doc.to_dict()
+    record_task_change(project_id, task_id, old, {**old, "status_khanban": payload.status_khanban})
 
     return {"message": f"Task {task_id} status updated to {payload.status_khanban}"}
 
 @router.get("/user/{user_id}/story_points")
 def get_user_story_points(user_id: str):
-    docs = (
-        tasks_ref
-        .where("status_khanban", "==", "Done")
-        .stream()
-    )
-
-    total = 0
-    for doc in docs:
-        task = doc.to_dict()
-        for user in task.get("assignee", []):
-            if isinstance(user, dict) and user.get("id") == user_id:
-                total += task.get("story_points", 0)
-                break
+    # Un solo get sobre el libro de story points, sin recorrer las tareas
+    ledger = user_story_points(user_id)
+    return {"user_id": user_id, "story_points": ledger["story_points"], "projects": ledger["projects"]}
+
+@router.get("/user/{user_id}/story_points/drift")
+def get_user_story_points_drift(
+    user_id: str,
+    repair: bool = Query(False, description="Reescribe el libro del usuario si no coincide")
+):
+    """Recalcula desde las tareas en Done y compara con el libro (diagnóstico, costoso)."""
+    return story_points_drift(user_id, repair)
 
-    return {"user_id": user_id, "story_points": total}
\ No newline at end of file
+@router.get("/tasks/cache/stats")
+def get_tasks_cache_stats():
+    """Contadores de la caché de tareas por proyecto (aciertos, fallos, desalojos)."""
+    return project_tasks_cache.stats()
@@ -1,63 +1,88 @@
 from fastapi import APIRouter, HTTPException
 from firebase_admin import firestore
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 from models.team_model import TeamResponse, TeamCreate, TeamUpdate, TeamMetricsResponse
 from firebase import db, teams_ref
+from helpers import DocumentLoader, get_project_task_docs, get_sprint_task_docs
 from datetime import datetime, timezone
 
 router = APIRouter(
     tags=["Teams"]
 )
 
-async def _calculate_user_metrics(user_id: str, project_id: str) -> dict:
-    # Obtener todas las tareas del proyecto
-    tasks_query = (
-        db.collection('tasks')
-        .where('project_id', '==', project_id)
-        .stream()
-    )
-    
-    current_tasks = 0
-    completed_tasks = 0
-    
-    for task in tasks_query:
-        task_data = task.to_dict()
-        assignees = task_data.get('assignee', [])
-        
-        # Verificar si el usuario está en los asignados
-        if any(assignee.get('id') == user_id for assignee in assignees):
-            if task_data.get('status_khanban') == 'Done':
-                completed_tasks += 1
+def _build_workload_index(project_id: str) -> Dict[str, dict]:
+    """
+    Recorre una sola vez las tareas del proyecto y acumula la carga de cada asignado
+    (tareas actuales, completadas y story points). Se comparte entre todos los
+    miembros de todos los equipos de la petición.
+    """
+    index: Dict[str, dict] = {}
+    for _, task_data in get_project_task_docs(project_id):
+        is_done = task_data.get('status_khanban') == 'Done'
+        story_points = task_data.get('story_points') or 0
+
+        assignee_ids = {
+            assignee.get('id')
+            for assignee in task_data.get('assignee') or []
+            if isinstance(assignee, dict)
+        }
+        for user_id in assignee_ids:
+            entry = index.setdefault(user_id, {
+                'currentTasks': 0,
+                'tasksCompleted': 0,
+                'storyPoints': 0,
+                'completedStoryPoints': 0
+            })
+            entry['storyPoints'] += story_points
+            if is_done:
+                entry['tasksCompleted'] += 1
+                entry['completedStoryPoints'] += story_points
             else:
-                current_tasks += 1
-    
+                entry['currentTasks'] += 1
+
+    return index
+
+def _calculate_user_metrics(user_id: str, workload: Dict[str, dict]) -> dict:
+    entry = workload.get(user_id, {})
+    current_tasks = entry.get('currentTasks', 0)
+
     # Calcular disponibilidad (80% base - 5% por cada tarea actual, mínimo 20%)
     availability = max(20, 80 - (current_tasks * 5))
-    
+
     return {
-        'tasksCompleted': completed_tasks,
+        'tasksCompleted': entry.get('tasksCompleted', 0),
         'currentTasks': current_tasks,
+        'storyPoints': entry.get('storyPoints', 0),
+        'completedStoryPoints': entry.get('completedStoryPoints', 0),
         'availability': availability
     }
 
-async def _get_user_details(user_id: str, project_id: str) -> dict:
-    user_doc = db.collection('users').document(user_id).get()
-    if not user_doc.exists:
+def _get_user_details(user_id: str, workload: Dict[str, dict], loader: DocumentLoader) -> dict:
+    user_data = loader.get(user_id)
+    if user_data is None:
         return None
 
-    user_data = user_doc.to_dict()
-    
-    # Calcular métricas basadas en tareas
-    metrics = await _calculate_user_metrics(user_id, project_id)
-    
     return {
         "id": user_id,
         "name": user_data.get("name", "Unknown"),
         "role": "Member",
-        "tasksCompleted": metrics['tasksCompleted'],
-        "currentTasks": metrics['currentTasks'],
-        "availability": metrics['availability']
+        **_calculate_user_metrics(user_id, workload)
+    }
+
+def _members_with_metrics(members: List[dict], workload: Dict[str, dict]) -> List[dict]:
+    return [
+        {**member, **_calculate_user_metrics(member["id"], workload)}
+        for member in members
+    ]
+
+def _team_response(team_id: str, team_data: dict, workload: Dict[str, dict]) -> dict:
+    team_data["members"] = _members_with_metrics(team_data.get("members", []), workload)
+    return {
+        "id": team_id,
+        **team_data,
+        "createdAt": team_data["createdAt"].isoformat(),
+        "updatedAt": team_data["updatedAt"].isoformat()
     }
 
 def parse_firestore_date(date_value):
@@ -80,11 +105,14 @@ def parse_firestore_date(date_value):
 
 # Crear equipo
 @router.post("/projects/{project_id}/teams", response_model=TeamResponse)
-async def create_team(project_id: str, team: TeamCreate):
+def create_team(project_id: str, team: TeamCreate):
     """Create a new team under a project"""
+    workload = _build_workload_index(project_id)
+    loader = DocumentLoader(db.collection('users'))
+    loader.load_many(team.members)
     members = []
     for user_id in team.members:
-        user_details = await _get_user_details(user_id, project_id)
+        user_details = _get_user_details(user_id, workload, loader)
         if user_details:
             members.append(user_details)
 
@@ -114,39 +142,24 @@ async def create_team(project_id: str, team: TeamCreate):
 
 # Obtener todos los equipos de un proyecto
 @router.get("/projects/{project_id}/teams", response_model=List[TeamResponse])
-async def get_all_teams(project_id: str):
+def get_all_teams(project_id: str):
     """Get all teams in a specific project with calculated metrics"""
     query = teams_ref.where("projectId", "==", project_id)
-    teams = []
+    team_docs = list(query.stream())
+    if not team_docs:
+        return []
 
-    for team_doc in query.stream():
-        team_data = team_doc.to_dict()
-        
-        # Actualizar métricas para cada miembro
-        updated_members = []
-        for member in team_data.get("members", []):
-            metrics = await _calculate_user_metrics(member["id"], project_id)
-            updated_member = {
-                **member,
-                "tasksCompleted": metrics['tasksCompleted'],
-                "currentTasks": metrics['currentTasks'],
-                "availability": metrics['availability']
-            }
-            updated_members.append(updated_member)
-        
-        team_data["members"] = updated_members
-        teams.append({
-            "id": team_doc.id,
-            **team_data,
-            "createdAt": team_data["createdAt"].isoformat(),
-            "updatedAt": team_data["updatedAt"].isoformat()
-        })
+    # Una sola pasada sobre las tareas para todos los miembros de todos los equipos
+    workload = _build_workload_index(project_id)
 
-    return teams
+    return [
+        _team_response(team_doc.id, team_doc.to_dict(), workload)
+        for team_doc in team_docs
+    ]
 
 # Obtener equipo por ID y proyecto
 @router.get("/projects/{project_id}/teams/{team_id}", response_model=TeamResponse)
-async def get_team(project_id: str, team_id: str):
+def get_team(project_id: str, team_id: str):
     """Get a specific team by ID within a project"""
     team_doc = teams_ref.document(team_id).get()
     if not team_doc.exists:
@@ -156,29 +169,11 @@ async def get_team(project_id: str, team_id: str):
     if team_data.get("projectId") != project_id:
         raise HTTPException(status_code=400, detail="Team does not belong to this project")
 
-    updated_members = []
-    for member in team_data.get("members", []):
-        metrics = await _calculate_user_metrics(member["id"], project_id)
-        updated_member = {
-            **member,
-            "tasksCompleted": metrics['tasksCompleted'],
-            "currentTasks": metrics['currentTasks'],
-            "availability": metrics['availability']
-        }
-        updated_members.append(updated_member)
-    
-    team_data["members"] = updated_members
-
-    return {
-        "id": team_id,
-        **team_data,
-        "createdAt": team_data["createdAt"].isoformat(),
-        "updatedAt": team_data["updatedAt"].isoformat()
-    }
+    return _team_response(team_id, team_data, _build_workload_index(project_id))
 
 # Actualizar equipo
 @router.put("/projects/{project_id}/teams/{team_id}", response_model=TeamResponse)
-async def update_team(project_id: str, team_id: str, team: TeamUpdate):
+def update_team(project_id: str, team_id: str, team: TeamUpdate):
     """Update a team's information"""
     team_ref = teams_ref.document(team_id)
     team_doc = team_ref.get()
@@ -198,10 +193,14 @@ async def update_team(project_id: str, team_id: str, team: TeamUpdate):
     if team.description is not None:
         update_data["description"] = team.description
 
+    workload = _build_workload_index(project_id)
+
     if team.members is not None:
+        loader = DocumentLoader(db.collection('users'))
+        loader.load_many(team.members)
         members = []
         for user_id in team.members:
-            user_details = await _get_user_details(user_id, project_id)
+            user_details = _get_user_details(user_id, workload, loader)
             if user_details:
                 members.append(user_details)
         if members:
@@ -209,11 +208,11 @@ async def update_team(project_id: str, team_id: str, team: TeamUpdate):
 
     team_ref.update(update_data)
 
-    return await get_team(project_id, team_id)
+    return _team_response(team_id, {**team_data, **update_data}, workload)
 
 # Eliminar equipo
 @router.delete("/projects/{project_id}/teams/{team_id}")
-async def delete_team(project_id: str, team_id: str):
+def delete_team(project_id: str, team_id: str):
     """Delete a team"""
     team_ref = teams_ref.document(team_id)
     team_doc = team_ref.get()
@@ -229,7 +228,7 @@ async def delete_team(project_id: str, team_id: str):
 
 # Buscar equipos por nombre dentro de un proyecto
 @router.get("/projects/{project_id}/teams/search")
-async def search_teams(project_id: str, query: str):
+def search_teams(project_id: str, query: str):
     """Search teams by name within a project"""
     teams_query = (
         teams_ref
@@ -250,7 +249,7 @@ async def search_teams(project_id: str, query: str):
     return results
 
 @router.get("/projects/{project_id}/teams/{team_id}/metrics", response_model=TeamMetricsResponse)
-async def get_team_metrics(project_id: str, team_id: str):
+def get_team_metrics(project_id: str, team_id: str):
     """Get metrics for a specific team based on active sprint"""
     # 1. Verificar que el equipo exista
     team_doc = teams_ref.document(team_id).get()
@@ -295,12 +294,7 @@ async def get_team_metrics(project_id: str, team_id: str):
     # 3. Obtener todas las tareas del sprint activo asignadas a miembros del equipo
     team_member_ids = [member['id'] for member in team_data.get('members', [])]
     
-    tasks_query = (
-        db.collection('tasks')
-        .where('project_id', '==', project_id)
-        .where('sprint_id', '==', active_sprint['id'])
-        .stream()
-    )
+    tasks_query = get_sprint_task_docs(project_id, active_sprint['id'])
     
     # 4. Calcular métricas
     total_tasks = 0
@@ -309,8 +303,7 @@ async def get_team_metrics(project_id: str, team_id: str):
     total_story_points = 0
     completed_story_points = 0
     
-    for task in tasks_query:
-        task_data = task.to_dict()
+    for _, task_data in tasks_query:
         assignees = task_data.get('assignee', [])
         
         # Verificar si algún miembro del equipo está asignado a esta tarea
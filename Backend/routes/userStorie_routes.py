@@ -1,12 +1,16 @@
 from firebase import db
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import List
 from firebase import userstories_ref, epics_ref, projects_ref
 from firebase_admin import firestore
 from models.userStorie_model import UserStory, UserStoryResponse,StatusUpdate
 from typing import Optional
 from datetime import datetime
-from helpers import delete_user_story_and_related
+from helpers import CascadeError,cascade_pending,delete_user_story_and_related,index_search_document
+from helpers import parse_fields,sparse_response,PageParams,ndjson_response,wants_ndjson
+from helpers import TRUSTED_READS,fast_json_response,trusted_dict
+from helpers import BulkWriter,bulk_write_response
+from helpers import AsyncQuery,job_accepted,job_runner
 
 router = APIRouter(tags=["UserStories"])
 
@@ -15,8 +19,19 @@ def create_userstories_batch(
     project_id: str,
     userstories: List[UserStory],
     epic_id: Optional[str] = None,  
-    archive_missing: bool = True    
+    archive_missing: bool = True,
+    report: bool = Query(False, description="Devolver {results, report} con el resultado de cada escritura"),
+    run_async: AsyncQuery = False
 ):
+    if run_async:
+        # Importaciones grandes: se escriben en segundo plano y el resultado queda en /jobs/{id}
+        job = job_runner.submit(
+            "userstories_batch",
+            lambda job: {"written": [item.id for item in create_userstories_batch(project_id, userstories, epic_id, archive_missing, report=False)]},
+            params={"project_id": project_id, "items": len(userstories)}
+        )
+        return job_accepted(job)
+
     project_ref = projects_ref.document(project_id)
     project = project_ref.get()
     
@@ -42,8 +57,9 @@ def create_userstories_batch(
     
     # Seguimiento de las historias que estamos actualizando
     updated_story_ids = set()
-    batch = db.batch()
+    writer = BulkWriter()
     created_stories = []
+    indexed = []
     
     # Actualizar o crear historias de usuario
     for story in userstories:
@@ -63,13 +79,15 @@ def create_userstories_batch(
         if story.idTitle in existing_stories:
             # Actualizar existente
             story_ref_doc = existing_stories[story.idTitle]
-            batch.update(story_ref_doc, story_dict)
+            writer.update(story_ref_doc, story_dict)
             created_stories.append(UserStoryResponse(id=story_ref_doc.id, **story_dict))
+            indexed.append((story_ref_doc.id, story_dict))
         else:
             # Crear nueva
             new_doc = userstories_ref.document()
-            batch.set(new_doc, story_dict)
+            writer.set(new_doc, story_dict)
             created_stories.append(UserStoryResponse(id=new_doc.id, **story_dict))
+            indexed.append((new_doc.id, story_dict))
         
         # Marcar esta historia como actualizada
         updated_story_ids.add(story.idTitle)
@@ -77,30 +95,56 @@ def create_userstories_batch(
     if archive_missing:
         for story_id, story_ref_doc in existing_stories.items():
             if story_id not in updated_story_ids:
-                batch.update(story_ref_doc, {
+                writer.update(story_ref_doc, {
                     "status": "archived",
                     "lastUpdated": firestore.SERVER_TIMESTAMP
                 })
+                indexed.append((story_ref_doc.id, {"status": "archived"}))
     
-    # Confirmar todos los cambios
-    batch.commit()
+    # Confirmar en batches de hasta 500 escrituras, en paralelo y con reintentos
+    outcome = writer.commit()
+    for doc_id, data in indexed:
+        if outcome.ok(doc_id):
+            index_search_document(project_id, "userstory", doc_id, data, merge=True)
     
-    return created_stories
+    return bulk_write_response([story for story in created_stories if outcome.ok(story.id)], outcome, report)
 
 
 # Obtener todas las user stories de un proyecto
 @router.get("/projects/{project_id}/userstories", response_model=List[UserStoryResponse])
 def get_project_userstories(
     project_id: str,
-    include_archived: bool = False  
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma"),
+    page: PageParams = Depends()
 ):
+    selected = parse_fields(fields, UserStoryResponse)
     query = userstories_ref.where("projectRef", "==", project_id)
     
     if not include_archived:
         query = query.where("status", "==", "active")
-    
-    userstories = query.stream()
-    return [UserStoryResponse(id=story.id, **story.to_dict()) for story in userstories]
+
+    if selected is not None:
+        query = query.select(selected)
+
+    userstories = page.fetch(query, response) if page.enabled else query.stream()
+
+    if TRUSTED_READS:
+        # Lectura de confianza: dicts con la forma de UserStoryResponse, sin validar
+        stories = (trusted_dict(UserStoryResponse, story.to_dict(), id=story.id) for story in userstories)
+    else:
+        stories = (UserStoryResponse(id=story.id, **story.to_dict()) for story in userstories)
+
+    if wants_ndjson(request):
+        return ndjson_response(stories, selected, response.headers)
+    if TRUSTED_READS:
+        return fast_json_response(stories, selected, response.headers)
+
+    if selected is not None:
+        return sparse_response(list(stories), selected, response.headers)
+    return list(stories)
 
 
 
@@ -188,11 +232,13 @@ def upsert_userstory(project_id: str, story: UserStory):
         # Actualizar
         story_doc = userstories_ref.document(existing[0].id)
         story_doc.update(story.dict())
+        index_search_document(project_id, "userstory", story_doc.id, story.dict(), merge=True)
         return UserStoryResponse(id=story_doc.id, **story.dict())
     else:
         # Crear nuevo
         new_doc = userstories_ref.document()
         new_doc.set(story.dict())
+        index_search_document(project_id, "userstory", new_doc.id, story.dict())
         return UserStoryResponse(id=new_doc.id, **story.dict())
     
 
@@ -211,6 +257,7 @@ def update_story(project_id: str, story_id: str, t: UserStory):
     ref.update(data)
 
     updated = ref.get().to_dict() or {}
+    index_search_document(project_id, "userstory", story_id, updated)
 
     updated_copy = {k: v for k, v in updated.items() 
                     if k not in ['id']}
@@ -226,12 +273,23 @@ def update_story(project_id: str, story_id: str, t: UserStory):
 
 # Eliminar user story
 @router.delete("/projects/{project_id}/userstories/{story_id}")
-def delete_userstory(project_id: str, story_id: str):
+def delete_userstory(project_id: str, story_id: str, run_async: AsyncQuery = False):
+    if run_async:
+        if not userstories_ref.document(story_id).get().exists and not cascade_pending("userstory", story_id):
+            raise HTTPException(status_code=404, detail="User story not found")
+        job = job_runner.submit(
+            "userstory_delete",
+            lambda job: delete_user_story_and_related(project_id, story_id, progress=job.progress),
+            params={"project_id": project_id, "story_id": story_id}
+        )
+        return job_accepted(job)
     try:
-        delete_user_story_and_related(project_id, story_id)
+        cascade = delete_user_story_and_related(project_id, story_id)
+    except CascadeError as err:
+        raise HTTPException(status_code=500, detail={"message": "User story deletion incomplete, retry to resume", "cascade": err.state})
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return {"message": "User story, tasks and related bugs deleted successfully"}
+    return {"message": "User story, tasks and related bugs deleted successfully", "cascade": cascade}
 
 
 
@@ -246,6 +304,8 @@ def add_comment(project_id: str, story_id: str, comment: dict):
 
     comment["timestamp"] = datetime.utcnow().isoformat()
     ref.update({ "comments": firestore.ArrayUnion([comment]) })
+    data = snap.to_dict()
+    index_search_document(project_id, "userstory", story_id, {**data, "comments": [*data.get("comments", []), comment]})
 
     return { "message": "Comment added successfully" }
 
@@ -260,6 +320,7 @@ def delete_comment(project_id: str, story_id: str, comment_id: str):
     data = doc.to_dict()
     updated_comments = [c for c in data.get("comments", []) if c["id"] != comment_id]
     doc_ref.update({"comments": updated_comments})
+    index_search_document(project_id, "userstory", story_id, {**data, "comments": updated_comments})
     return {"message": "Comment deleted"}
 
 
@@ -276,5 +337,6 @@ def update_story_status(project_id: str, story_id: str, payload: StatusUpdate):
     userstories_ref.document(story_id).update({
         "status_khanban": payload.status_khanban
     })
+    index_search_document(project_id, "userstory", story_id, {"status_khanban": payload.status_khanban}, merge=True)
 
     return {"message": f"Story {story_id} status updated to {payload.status_khanban}"}
\ No newline at end of file
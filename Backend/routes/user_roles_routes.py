@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status
-from models.user_roles import UserRolesDocument, UserRolesCreate, UserRolesUpdate, UserRolesResponse, RoleDefinition
+from models.user_roles import UserRolesDocument, UserRolesCreate, UserRolesUpdate, UserRolesResponse, RoleDefinition, DEFAULT_ROLES
 from firebase import user_roles_ref, project_users_ref
 from firebase_admin import firestore
 from typing import List, Optional
+from helpers import index_roles,lookup_role_bitmask,invalidate_permissions
 
 router = APIRouter(
     prefix="/user-roles",
@@ -10,33 +11,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Default roles with their bitmasks
-DEFAULT_ROLES = [
-    {
-        "idRole": "owner",
-        "name": "Owner",
-        "description": "Full access to all project functions",
-        "bitmask": 1023,
-        "is_default": True
-    },
-    {
-        "idRole": "admin",
-        "name": "Admin",
-        "description": "General project administration without the ability to delete it",
-        "bitmask": 510,
-        "is_default": True
-    },
-    {
-        "idRole": "developer",
-        "name": "Developer",
-        "description": "Doesnt have access to project management functions",
-        "bitmask": 0,
-        "is_default": True
-    }
-]
-
 @router.post("/initialize/{user_ref}", response_model=UserRolesResponse)
-async def initialize_default_roles(user_ref: str):
+def initialize_default_roles(user_ref: str):
     """
     Initialize the default user roles in the database for a specific user.
     Creates a single document with a list of all default roles.
@@ -64,6 +40,7 @@ async def initialize_default_roles(user_ref: str):
     doc_ref = user_roles_ref.document()
     user_roles_doc["id"] = doc_ref.id
     doc_ref.set(user_roles_doc)
+    index_roles(doc_ref.id, user_roles_doc["roles"])
     
     # Get the document after creation to get the proper timestamps
     created_doc = doc_ref.get().to_dict()
@@ -72,7 +49,7 @@ async def initialize_default_roles(user_ref: str):
     return UserRolesResponse(**created_doc)
 
 @router.get("/{user_ref}", response_model=UserRolesResponse)
-async def get_user_roles(user_ref: str):
+def get_user_roles(user_ref: str):
     """Get all roles for a specific user."""
     query = user_roles_ref.where("userRef", "==", user_ref).limit(1).get()
     
@@ -89,7 +66,7 @@ async def get_user_roles(user_ref: str):
     return UserRolesResponse(**role_data)
 
 @router.patch("/{document_id}", response_model=UserRolesResponse)
-async def update_user_roles(document_id: str, roles_update: UserRolesUpdate):
+def update_user_roles(document_id: str, roles_update: UserRolesUpdate):
     """Update roles for a user."""
     role_doc = user_roles_ref.document(document_id).get()
     
@@ -108,6 +85,10 @@ async def update_user_roles(document_id: str, roles_update: UserRolesUpdate):
     update_data["updatedAt"] = firestore.SERVER_TIMESTAMP
     
     user_roles_ref.document(document_id).update(update_data)
+    if "roles" in update_data:
+        index_roles(document_id, update_data["roles"], (role_doc.to_dict() or {}).get("roles") or [])
+        # Cambió lo que vale un rol: cualquier miembro con ese rol puede verse afectado
+        invalidate_permissions()
     
     # Get the updated document
     updated_doc = user_roles_ref.document(document_id).get()
@@ -117,7 +98,7 @@ async def update_user_roles(document_id: str, roles_update: UserRolesUpdate):
     return UserRolesResponse(**updated_data)
 
 @router.get("/bitmask/{role_id_or_name}", response_model=int)
-async def get_role_bitmask(role_id_or_name: str):
+def get_role_bitmask(role_id_or_name: str):
     """
     Get the bitmask value for a specific role by ID or name.
     Works with both idRole values and display names.
@@ -126,15 +107,10 @@ async def get_role_bitmask(role_id_or_name: str):
         if role["idRole"] == role_id_or_name or role["name"] == role_id_or_name:
             return role["bitmask"]
     
-    query = user_roles_ref.get()
-    
-    for doc in query:
-        roles_list = doc.to_dict().get("roles", [])
-        for role in roles_list:
-            # Check both idRole and name fields
-            if (role.get("idRole") == role_id_or_name or 
-                role.get("name") == role_id_or_name):
-                return role.get("bitmask", 0)
+    # Roles personalizados: índice role_index + caché en proceso, sin leer user_roles
+    bitmask = lookup_role_bitmask(role_id_or_name)
+    if bitmask is not None:
+        return bitmask
     
     raise HTTPException(
         status_code=404,
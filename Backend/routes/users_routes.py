@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List
-from firebase import users_ref, project_users_ref
+from firebase import users_ref
 from models.users_model import Users, UsersResponse
+from helpers import PageParams, ndjson_response, wants_ndjson, user_search_index
+from helpers import CascadeError, cascade_pending, run_cascade, user_cascade
+from helpers import AsyncQuery, job_accepted, job_runner
 from fastapi import Query
 
 
@@ -10,8 +13,10 @@ router = APIRouter(tags=["Users"])
 
 # Obtener todos los usuarios
 @router.get("/users", response_model=List[UsersResponse])
-def get_users():
-    users = users_ref.stream()
+def get_users(request: Request, response: Response, page: PageParams = Depends()):
+    users = page.fetch(users_ref, response) if page.enabled else users_ref.stream()
+    if wants_ndjson(request):
+        return ndjson_response((UsersResponse(id=user.id, **user.to_dict()) for user in users), headers=response.headers)
     return [UsersResponse(id=user.id, **user.to_dict()) for user in users]
 
 # Obtener un usuario por ID
@@ -30,6 +35,7 @@ def create_user(user: Users):
         raise HTTPException(status_code=400, detail="User already exists")
 
     user_doc.set(user.dict())
+    user_search_index.upsert(user.uid, user.dict())
     return UsersResponse(id=user.uid, **user.dict())
 
 # Actualizar un usuario
@@ -40,21 +46,23 @@ def update_user(user_id: str, user: Users):
         raise HTTPException(status_code=404, detail="User not found")
     
     user_doc.update(user.dict())
+    user_search_index.upsert(user_id, user_doc.get().to_dict() or {})
     return UsersResponse(id=user_id, **user.dict())
 
 # Eliminar un usuario y sus referencias en project_users
 @router.delete("/users/{user_id}")
-def delete_user(uid: str):
+def delete_user(uid: str, run_async: AsyncQuery = False):
     user_doc = users_ref.document(uid)
-    if not user_doc.get().exists:
+    if not user_doc.get().exists and not cascade_pending("user", uid):
         raise HTTPException(status_code=404, detail="User not found")
+    if run_async:
+        job = job_runner.submit("user_delete", lambda job: run_cascade("user", uid, user_cascade(uid), progress=job.progress), params={"user_id": uid})
+        return job_accepted(job)
     
-    # Eliminar referencias del usuario en project_users
-    project_users_query = project_users_ref.where("userRef", "==", user_doc).stream()
-    for project_user in project_users_query:
-        project_users_ref.document(project_user.id).delete()
-
-    # Eliminar usuario
-    user_doc.delete()
-    return {"message": "User deleted successfully"}
+    # Quitar al usuario de los equipos y borrar sus relaciones, roles y story points
+    try:
+        cascade = run_cascade("user", uid, user_cascade(uid))
+    except CascadeError as err:
+        raise HTTPException(status_code=500, detail={"message": "User deletion incomplete, retry to resume", "cascade": err.state})
+    return {"message": "User deleted successfully", "cascade": cascade}
 
@@ -0,0 +1,26 @@
+"""
+Reconstruye el libro de story points por usuario (colección user_story_points)
+a partir de las tareas en Done. La primera lectura del libro lo hace sola si
+falta la marca _meta; el script sirve para adelantarlo al desplegar o para
+corregir una deriva detectada con GET /user/{user_id}/story_points/drift.
+
+Se corre desde Backend/:
+    python scripts/backfill_story_points.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import backfill_story_points  # noqa: E402
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__).parse_args()
+    written = backfill_story_points()
+    print(f"{written} usuarios escritos en user_story_points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import warnings
+
+# Las pruebas corren siempre contra el backend en memoria, sin credenciales
+os.environ["FIRESTORE_BACKEND"] = "memory"
+os.environ.setdefault("JOB_PROGRESS_INTERVAL_SECONDS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.simplefilter("ignore")
+
+import pytest
+from fastapi.testclient import TestClient
+
+import helpers.story_points_helper as story_points_helper
+from firebase import db
+from helpers import (
+    permission_cache, project_search_indexes, project_tasks_cache, role_bitmask_cache,
+    user_search_index, velocity_cache, verified_tokens
+)
+from helpers.user_search_helper import project_members_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Cada prueba empieza con la base y las cachés de proceso vacías."""
+    db.clear()
+    db.latency_ms = 0
+    for cache in (permission_cache, project_search_indexes, project_tasks_cache, role_bitmask_cache,
+                  velocity_cache, verified_tokens, project_members_cache):
+        cache.clear()
+    with user_search_index._lock:
+        user_search_index._reset()
+    story_points_helper._ledger_built = False
+    yield db
+
+
+@pytest.fixture
+def client():
+    from main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def project_id(client):
+    response = client.post("/projects", json=dict(
+        title="P", description="d", status="Active", priority="High", progress=0,
+        startDate="x", endDate="y", invitationCode="c", tasksCompleted=0,
+        totalTasks=0, team="t", teamSize=1
+    ))
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def make_task(task_id: str, **fields) -> dict:
+    task = dict(id=task_id, title=f"Task {task_id}", description="d", user_story_id="us1",
+                status_khanban="To Do", priority="High", story_points=1, assignee=[])
+    task.update(fields)
+    return task
+
+
+@pytest.fixture
+def story(client, project_id):
+    client.post(f"/projects/{project_id}/userstories/batch", json=[
+        dict(uuid="us1", idTitle="US-1", title="Story", projectRef=project_id, description="x")
+    ]).raise_for_status()
+    return "us1"
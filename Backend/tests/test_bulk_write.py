@@ -0,0 +1,45 @@
+from firebase import db, tasks_ref
+from helpers import BulkWriter
+
+
+def test_splits_chunks_and_isolates_failing_writes():
+    writer = BulkWriter(chunk_size=10)
+    for i in range(35):
+        if i in (3, 27):
+            # update sobre un documento que no existe: falla solo esa escritura
+            writer.update(tasks_ref.document(f"missing-{i}"), {"x": 1})
+        else:
+            writer.set(tasks_ref.document(f"k{i}"), {"i": i})
+
+    report = writer.commit()
+
+    assert report.chunks == 4
+    assert [item["id"] for item in report.failed] == ["missing-3", "missing-27"]
+    assert sum(1 for _ in tasks_ref.stream()) == 33
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    make_batch = db.batch
+    failures = [ConnectionError("unavailable")]
+
+    def flaky_batch():
+        batch = make_batch()
+        commit = batch.commit
+
+        def maybe_fail(**kwargs):
+            if failures:
+                raise failures.pop()
+            return commit(**kwargs)
+
+        batch.commit = maybe_fail
+        return batch
+
+    monkeypatch.setattr(db, "batch", flaky_batch)
+    writer = BulkWriter(backoff_seconds=0)
+    writer.set(tasks_ref.document("a"), {"i": 1})
+
+    report = writer.commit()
+
+    assert report.retries == 1
+    assert not report.failed
+    assert tasks_ref.document("a").get().exists
@@ -0,0 +1,51 @@
+import threading
+
+from helpers.cache_helper import TTLCache
+
+
+def test_get_or_load_caches_until_invalidated():
+    cache = TTLCache(10, 60)
+    calls = []
+    load = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_load("k", load) == 1
+    assert cache.get_or_load("k", load) == 1
+    cache.invalidate("k")
+    assert cache.get_or_load("k", load) == 2
+
+
+def test_expired_entries_are_reloaded():
+    cache = TTLCache(10, 0)
+    cache.set("k", "old")
+    assert cache.get("k") is None
+
+
+def test_invalidate_during_load_discards_stale_value():
+    cache = TTLCache(10, 60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return "stale"
+
+    thread = threading.Thread(target=lambda: cache.get_or_load("k", slow))
+    thread.start()
+    started.wait()
+    cache.invalidate("k")
+    release.set()
+    thread.join()
+
+    assert cache.get("k") is None
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
+
+
+def test_failed_load_leaves_no_bookkeeping():
+    cache = TTLCache(10, 60)
+    for i in range(100):
+        cache.invalidate(f"token{i}")
+    try:
+        cache.get_or_load("boom", lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert not cache._versions and not cache._loading
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from firebase import events_ref
+from helpers import expand_occurrences, get_window_events
+
+UTC = timezone.utc
+WINDOW = (datetime(2026, 3, 2, 8, tzinfo=UTC), datetime(2026, 3, 3, tzinfo=UTC))
+
+
+def _event(start, frequency=None, until=None, excluded=()):
+    return dict(
+        project_id="p", title="e", start_date=start, end_date=start + timedelta(hours=1),
+        is_recurring=bool(frequency),
+        recurrence=dict(frequency=frequency, end_date=until, excluded_dates=list(excluded)) if frequency else None,
+    )
+
+
+def test_daily_series_jumps_to_the_window():
+    event = _event(datetime(2000, 1, 1, 9, tzinfo=UTC), "daily")
+    assert list(expand_occurrences(event, *WINDOW)) == [
+        (datetime(2026, 3, 2, 9, tzinfo=UTC), datetime(2026, 3, 2, 10, tzinfo=UTC))
+    ]
+
+
+def test_monthly_series_clamps_to_the_end_of_the_month():
+    event = _event(datetime(2026, 1, 31, 9, tzinfo=UTC), "monthly")
+    window = (datetime(2026, 2, 1, tzinfo=UTC), datetime(2026, 3, 1, tzinfo=UTC))
+    assert [start.day for start, _ in expand_occurrences(event, *window)] == [28]
+
+
+def test_excluded_dates_and_series_end_are_respected():
+    excluded = _event(datetime(2026, 1, 1, 9, tzinfo=UTC), "daily", excluded=[datetime(2026, 3, 2, tzinfo=UTC)])
+    ended = _event(datetime(2026, 1, 1, 9, tzinfo=UTC), "daily", until=datetime(2026, 3, 1, tzinfo=UTC))
+    assert list(expand_occurrences(excluded, *WINDOW)) == []
+    assert list(expand_occurrences(ended, *WINDOW)) == []
+
+
+def test_window_query_returns_only_overlapping_series():
+    events_ref.document("one").set(_event(datetime(2026, 3, 2, 9, tzinfo=UTC)))
+    events_ref.document("open").set(_event(datetime(2025, 1, 1, 10, tzinfo=UTC), "daily"))
+    events_ref.document("ended").set(_event(datetime(2020, 1, 1, 9, tzinfo=UTC), "weekly", datetime(2021, 1, 1, tzinfo=UTC)))
+    events_ref.document("future").set(_event(datetime(2027, 1, 1, 9, tzinfo=UTC), "daily"))
+
+    assert [event["id"] for event in get_window_events("p", *WINDOW)] == ["one", "open"]
@@ -0,0 +1,54 @@
+import pytest
+
+import helpers.cascade_helper as cascade_helper
+from firebase import db, projects_ref, tasks_ref
+from helpers import CascadeError, get_cascade_state, project_cascade, run_cascade
+
+
+def _seed(project_id, tasks=25):
+    projects_ref.document(project_id).set({"title": "P"})
+    for i in range(tasks):
+        tasks_ref.document(f"t{i:02d}").set({"project_id": project_id, "status_khanban": "To Do"})
+    db.collection("bugs").document("b1").set({"projectId": project_id})
+
+
+def test_project_cascade_deletes_everything(clean_db):
+    _seed("p1")
+    state = run_cascade("project", "p1", project_cascade("p1"))
+
+    assert state["status"] == "done"
+    assert state["processed"]["tasks"] == 25
+    assert not list(tasks_ref.stream())
+    assert not projects_ref.document("p1").get().exists
+
+
+def test_failed_cascade_resumes_where_it_stopped(monkeypatch):
+    _seed("p1")
+    monkeypatch.setattr(cascade_helper, "CASCADE_PAGE_SIZE", 10)
+    make_batch = db.batch
+
+    def failing_batch():
+        batch = make_batch()
+        commit = batch.commit
+
+        def fail_on_t15(**kwargs):
+            if any(write[1].id == "t15" for write in batch._writes):
+                raise ValueError("boom")
+            return commit(**kwargs)
+
+        batch.commit = fail_on_t15
+        return batch
+
+    monkeypatch.setattr(db, "batch", failing_batch)
+    with pytest.raises(CascadeError):
+        run_cascade("project", "p1", project_cascade("p1"))
+    assert get_cascade_state("project", "p1")["status"] == "failed"
+    assert projects_ref.document("p1").get().exists
+
+    monkeypatch.setattr(db, "batch", make_batch)
+    state = run_cascade("project", "p1", project_cascade("p1"))
+
+    assert state["status"] == "done"
+    assert state["attempts"] == 2
+    assert not list(tasks_ref.stream())
+    assert not projects_ref.document("p1").get().exists
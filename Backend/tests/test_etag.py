@@ -0,0 +1,40 @@
+from firebase import tasks_ref
+from tests.conftest import make_task
+
+
+def test_unchanged_listing_is_304(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[make_task("t1")]).raise_for_status()
+    path = f"/projects/{project_id}/tasks"
+
+    etag = client.get(path).headers["etag"]
+    assert etag.startswith("W/")
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_write_through_the_api_changes_the_etag(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[make_task("t1")]).raise_for_status()
+    path = f"/projects/{project_id}/tasks"
+    etag = client.get(path).headers["etag"]
+
+    client.post(f"/projects/{project_id}/tasks/batch", json=[make_task("t2")]).raise_for_status()
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_etag_always_matches_the_body_it_was_sent_with(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[make_task("t1")]).raise_for_status()
+    path = f"/projects/{project_id}/tasks"
+    first = client.get(path)
+
+    # Escritura directa: el snapshot cacheado sigue vigente hasta su TTL
+    tasks_ref.document("direct").set(dict(make_task("direct"), project_id=project_id))
+    second = client.get(path)
+    assert (second.headers["etag"] == first.headers["etag"]) == (second.json() == first.json())
+
+
+def test_variants_get_different_etags(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[make_task("t1")]).raise_for_status()
+    path = f"/projects/{project_id}/tasks"
+    assert client.get(path).headers["etag"] != client.get(path, params={"fields": "title"}).headers["etag"]
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from firebase import jobs_ref
+from helpers import get_job
+from helpers.job_helper import JobRunner
+
+
+@pytest.fixture
+def runner():
+    job_runner = JobRunner(max_workers=2)
+    job_runner.start()
+    yield job_runner
+    job_runner.shutdown()
+
+
+def _wait(job_id, status=("succeeded", "failed", "cancelled")):
+    for _ in range(250):
+        job = get_job(job_id)
+        if job["status"] in status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+def _loop_until_cancelled(started: threading.Event):
+    def function(job):
+        started.set()
+        for step in range(500):
+            job.progress({"step": step})
+            time.sleep(0.01)
+        return "finished"
+    return function
+
+
+def test_job_result_is_stored(runner):
+    job = runner.submit("sum", lambda job: {"total": 3})
+    assert job["status"] == "queued"
+    assert _wait(job["id"])["result"] == {"total": 3}
+
+
+def test_running_job_stops_on_cancel(runner):
+    started = threading.Event()
+    job = runner.submit("loop", _loop_until_cancelled(started))
+    started.wait(2)
+
+    assert runner.cancel(job["id"])["cancel_requested"]
+    assert _wait(job["id"])["status"] == "cancelled"
+
+
+def test_cancel_from_another_process_is_seen(runner):
+    started = threading.Event()
+    job = runner.submit("loop", _loop_until_cancelled(started))
+    started.wait(2)
+
+    # Otro proceso solo puede marcar el registro
+    jobs_ref.document(job["id"]).update({"cancel_requested": True})
+    assert _wait(job["id"])["status"] == "cancelled"
+
+
+def test_restart_fails_jobs_left_by_the_same_worker():
+    previous = JobRunner()
+    jobs_ref.document("stale").set({"status": "running", "worker": previous.worker_id})
+    jobs_ref.document("other").set({"status": "running", "worker": "elsewhere:1"})
+
+    restarted = JobRunner()
+    restarted.start()
+    try:
+        assert get_job("stale")["status"] == "failed"
+        assert get_job("stale")["error"]["status_code"] == 503
+        assert get_job("other")["status"] == "running"
+    finally:
+        restarted.shutdown()
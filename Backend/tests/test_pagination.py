@@ -0,0 +1,49 @@
+import pytest
+from fastapi import HTTPException
+
+from helpers.pagination_helper import decode_cursor, encode_cursor
+from tests.conftest import make_task
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("task-42")) == "task-42"
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor("")])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as err:
+        decode_cursor(cursor)
+    assert err.value.status_code == 400
+
+
+def test_task_pages_cover_the_project_once(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch",
+                json=[make_task(f"t{i:02d}") for i in range(7)]).raise_for_status()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"/projects/{project_id}/tasks", params=params)
+        assert response.status_code == 200
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == sorted(f"t{i:02d}" for i in range(7))
+
+
+def test_project_users_pages_are_full(client, project_id):
+    from firebase import project_users_ref, projects_ref, users_ref
+    users_ref.document("u1").set({"name": "U"})
+    for i in range(4):
+        # r1 apunta a un usuario que ya no existe: igual ocupa su lugar en la página
+        user = "u1" if i != 1 else "gone"
+        project_users_ref.document(f"r{i}").set({
+            "userRef": users_ref.document(user), "projectRef": projects_ref.document(project_id)
+        })
+
+    first = client.get("/project_users", params={"limit": 2})
+    assert [pu["id"] for pu in first.json()] == ["r0", "r1"]
+    second = client.get("/project_users", params={"limit": 2, "cursor": first.headers["x-next-cursor"]})
+    assert [pu["id"] for pu in second.json()] == ["r2", "r3"]
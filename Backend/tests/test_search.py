@@ -0,0 +1,37 @@
+from helpers import project_search_indexes
+from helpers.search_helper import ProjectSearchIndex
+from tests.conftest import make_task
+
+
+def test_bm25_ranks_title_matches_first():
+    index = ProjectSearchIndex()
+    index.upsert("task", "body", {"title": "Reporte", "description": "pantalla de login"})
+    index.upsert("task", "title", {"title": "Login con Google", "description": "oauth"})
+    index.upsert("task", "none", {"title": "Migrar base", "description": "datos"})
+
+    result = index.search("login")
+
+    assert [hit["id"] for hit in result["results"]] == ["title", "body"]
+    assert result["facets"]["type"] == {"task": 2}
+
+
+def test_search_ignores_accents_and_archived_documents():
+    index = ProjectSearchIndex()
+    index.upsert("epic", "e1", {"title": "Autenticación"})
+    index.upsert("epic", "e2", {"title": "Autenticacion vieja", "status": "archived"})
+    assert [hit["id"] for hit in index.search("autenticacion")["results"]] == ["e1"]
+
+
+def test_incremental_index_matches_a_rebuild(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[
+        make_task("t0", title="Pantalla de login"), make_task("t1", title="Reporte mensual")
+    ]).raise_for_status()
+    client.get(f"/projects/{project_id}/search", params={"q": "login"}).raise_for_status()
+    client.put(f"/projects/{project_id}/tasks/t1", json={"title": "Login de kerberos"}).raise_for_status()
+
+    incremental = client.get(f"/projects/{project_id}/search", params={"q": "login kerberos"}).json()
+    project_search_indexes.clear()
+    rebuilt = client.get(f"/projects/{project_id}/search", params={"q": "login kerberos"}).json()
+
+    assert incremental == rebuilt
+    assert incremental["results"][0]["id"] == "t1"
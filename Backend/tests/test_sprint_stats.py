@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from firebase import sprint_stats_ref, sprints_ref
+from helpers import rebuild_sprint_stats
+from tests.conftest import make_task
+
+STATS_FIELDS = ("task_count", "total_story_points", "completed_story_points")
+
+
+def _stats(sprint_id):
+    data = sprint_stats_ref.document(sprint_id).get().to_dict() or {}
+    return {field: data.get(field, 0) for field in STATS_FIELDS}
+
+
+def test_task_writes_increment_sprint_stats(client, project_id, story):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    sprints_ref.document("s1").set({"project_id": project_id, "name": "S1", "start_date": start})
+    client.post(f"/projects/{project_id}/tasks/batch", json=[
+        make_task("t1", sprint_id="s1", story_points=3),
+        make_task("t2", sprint_id="s1", story_points=5),
+    ]).raise_for_status()
+    assert _stats("s1") == {"task_count": 2, "total_story_points": 8, "completed_story_points": 0}
+
+    client.patch(f"/projects/{project_id}/tasks/t2/status", json={"status_khanban": "Done"}).raise_for_status()
+    client.delete(f"/projects/{project_id}/tasks/t1").raise_for_status()
+    incremental = _stats("s1")
+
+    assert incremental == {"task_count": 1, "total_story_points": 5, "completed_story_points": 5}
+    rebuilt = rebuild_sprint_stats(project_id, "s1", start)
+    assert incremental == {field: rebuilt[field] for field in STATS_FIELDS}
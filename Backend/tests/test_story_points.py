@@ -0,0 +1,35 @@
+from firebase import tasks_ref, user_story_points_ref
+from tests.conftest import make_task
+
+
+def test_ledger_follows_done_tasks(client, project_id, story):
+    client.post(f"/projects/{project_id}/tasks/batch", json=[
+        make_task("t1", story_points=3, assignee=[["u1", "User 1"]]),
+        make_task("t2", story_points=5, assignee=[["u1", "User 1"]], status_khanban="Done"),
+    ]).raise_for_status()
+    assert client.get("/user/u1/story_points").json()["story_points"] == 5
+
+    client.patch(f"/projects/{project_id}/tasks/t1/status", json={"status_khanban": "Done"}).raise_for_status()
+    assert client.get("/user/u1/story_points").json()["story_points"] == 8
+    assert client.get("/user/u1/story_points/drift").json()["in_sync"]
+
+
+def test_backfill_covers_tasks_written_before_the_ledger(client):
+    for i in range(3):
+        tasks_ref.document(f"old{i}").set(dict(project_id="p1", status_khanban="Done", story_points=2, assignee=[["u9", "U"]]))
+
+    assert client.get("/user/u9/story_points").json()["story_points"] == 6
+    assert user_story_points_ref.document("_meta").get().exists
+
+
+def test_drift_is_reported_and_repaired(client):
+    tasks_ref.document("t1").set(dict(project_id="p1", status_khanban="Done", story_points=2, assignee=[["u1", "U"]]))
+    client.get("/user/u1/story_points").raise_for_status()
+    # Escritura fuera de la API: el libro no se entera
+    tasks_ref.document("t2").set(dict(project_id="p1", status_khanban="Done", story_points=4, assignee=[["u1", "U"]]))
+
+    drift = client.get("/user/u1/story_points/drift").json()
+    assert not drift["in_sync"] and drift["drift"] == {"p1": -4}
+
+    client.get("/user/u1/story_points/drift", params={"repair": True}).raise_for_status()
+    assert client.get("/user/u1/story_points").json()["story_points"] == 6
@@ -0,0 +1,47 @@
+from helpers.user_search_helper import UserSearchIndex
+
+
+def _index():
+    index = UserSearchIndex()
+    index.build([
+        ("a", {"name": "José Pérez", "email": "jp@tec.mx"}),
+        ("b", {"name": "Ana López", "email": "ana.lopez@gmail.com"}),
+        ("c", {"name": "Anabel Ruiz", "email": "anabel@tec.mx"}),
+    ])
+    return index
+
+
+def _ids(results):
+    return [uid for uid, _, _ in results]
+
+
+def test_matches_ignore_case_and_accents():
+    assert _ids(_index().search("PEREZ")) == ["a"]
+
+
+def test_name_prefix_ranks_before_substring():
+    assert _ids(_index().search("ana")) == ["b", "c"]
+
+
+def test_fuzzy_match_tolerates_typos():
+    assert "b" in _ids(_index().search("lopes"))
+
+
+def test_upsert_and_remove_keep_the_index_current():
+    index = _index()
+    index.upsert("a", {"name": "Josefina Ruiz", "email": "jr@tec.mx"})
+    index.remove("b")
+
+    assert _ids(index.search("perez")) == []
+    assert "a" in _ids(index.search("ruiz"))
+    assert "b" not in _ids(index.search("lopez"))
+
+
+def test_search_endpoint(client):
+    from firebase import users_ref
+    from helpers import user_search_index
+    users_ref.document("a").set({"name": "José Pérez", "email": "jp@tec.mx", "role": "user"})
+    user_search_index.upsert("a", users_ref.document("a").get().to_dict())
+
+    response = client.get("/users/users/search", params={"search": "jose"})
+    assert [user["id"] for user in response.json()] == ["a"]